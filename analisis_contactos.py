@@ -0,0 +1,307 @@
+# 🔍 Análisis de contactos
+# Lectura del Excel, validación de teléfonos, filtro de tipos de plaza y
+# consolidación de duplicados, sin interfaz: lo usan la ventana (en su hilo
+# de análisis) y la línea de comandos.
+
+import os
+
+import pandas as pd
+
+from consolidacion import consolidar_reservas
+from contactos import crear_contactos
+from errores import AnalysisCancelledError, FileProcessingError
+from procesamiento_excel import (extraer_campos_formato_normal, extraer_campos_formato_especial,
+                                 CacheLibrosExcel, FORMATO_ESPECIAL, detectar_formato,
+                                 usar_lectura_progresiva, iterar_bloques_excel, contar_filas_excel, FILAS_POR_BLOQUE,
+                                 resolver_esquema)
+from telefonos import analizar_telefonos, extraer_telefonos_vuelo
+
+# Filas procesadas entre avisos de progreso (archivos leídos completos)
+FILAS_POR_BLOQUE_ANALISIS = 5000
+
+# Constantes de filtros
+TIPOS_PLAZA_EXCLUIDOS = ['PREMIUM', 'SUPERIOR']
+
+# Constantes para consolidación de contactos
+CONSOLIDAR_DUPLICADOS = True  # Habilitar consolidación por defecto
+
+
+def _sin_log(*args, **kwargs):
+    pass
+
+
+class AnalisisExcel:
+    """
+    Extracción de los contactos con teléfono válido de un archivo Excel.
+
+    Attributes:
+        ruta: Archivo Excel
+        recogidas: Buscar el teléfono en la columna de vuelo (plantilla Recogidas)
+        numeros_extranjeros: Aceptar teléfonos extranjeros
+        consolidar: Agrupar reservas del mismo cliente por día
+        cache: Caché de libros Excel (compartida con los diálogos de columnas)
+        log: log(mensaje, nivel="INFO", *args), como log_message de la ventana
+    """
+
+    def __init__(self, ruta, cache=None, recogidas=False, numeros_extranjeros=True,
+                 consolidar=CONSOLIDAR_DUPLICADOS, log=_sin_log):
+        self.ruta = ruta
+        self.recogidas = recogidas
+        self.numeros_extranjeros = numeros_extranjeros
+        self.consolidar = consolidar
+        self.cache = cache if cache is not None else CacheLibrosExcel()
+        self.log = log
+
+    def obtener_contactos_con_telefono(self, progreso=None, cancelado=None):
+        """
+        Extrae solo los contactos que tienen teléfono válido del archivo Excel.
+
+        Soporta dos formatos:
+        - Formato especial: Todas las columnas en una sola columna separada por tabs
+        - Formato normal: Columnas separadas de Excel
+
+        Si la consolidación de duplicados está habilitada, agrupa múltiples
+        reservas del mismo cliente por día en un solo contacto consolidado.
+
+        Los archivos .xlsx grandes se leen de forma progresiva (ver
+        iterar_contactos_excel) para no cargar el libro entero en memoria.
+        Las filas se procesan por bloques, lo que permite informar del
+        progreso y cancelar entre un bloque y el siguiente.
+
+        Args:
+            progreso (callable): progreso(filas_procesadas, total_filas, contactos) tras
+                cada bloque; total_filas es None si no se conoce
+            cancelado (threading.Event): Si se activa, el análisis se detiene al
+                terminar el bloque actual
+
+        Returns:
+            list: Contactos válidos (Contacto)
+
+        Raises:
+            FileProcessingError: Si hay error al procesar el archivo Excel
+            AnalysisCancelledError: Si se activó cancelado
+        """
+        try:
+            contactos = []
+            for filas, total, nuevos in self._iterar_bloques_contactos():
+                if cancelado is not None and cancelado.is_set():
+                    raise AnalysisCancelledError("Análisis cancelado")
+                contactos.extend(nuevos)
+                if progreso is not None:
+                    progreso(filas, total, contactos)
+
+            # Aplicar consolidación de duplicados si está habilitada
+            if self.consolidar and contactos:
+                self.log("🔗 Aplicando consolidación de reservas duplicadas...")
+                contactos_originales = len(contactos)
+                contactos = consolidar_reservas(contactos, log=self.log)
+                self.log(f"✅ Consolidación completada: {contactos_originales} → {len(contactos)} contactos")
+
+            return contactos
+
+        except AnalysisCancelledError:
+            raise
+        except FileNotFoundError:
+            self.log(f"❌ No se encontró el archivo: {self.ruta}")
+            raise FileProcessingError(f"Archivo no encontrado: {self.ruta}")
+        except Exception as e:
+            self.log(f"❌ Error leyendo Excel: {e}")
+            raise FileProcessingError(f"Error procesando archivo Excel: {str(e)}")
+
+    def _iterar_bloques_contactos(self):
+        """
+        Recorrer el archivo por bloques de filas.
+
+        Yields:
+            tuple: (filas procesadas hasta ahora, total de filas o None, contactos válidos del bloque)
+        """
+        if usar_lectura_progresiva(self.ruta):
+            tamano_mb = os.path.getsize(self.ruta) / (1024 * 1024)
+            self.log(f"📥 Archivo grande ({tamano_mb:.1f} MB): lectura progresiva en modo solo lectura")
+            self._log_configuracion_numeros()
+
+            total = contar_filas_excel(self.ruta)
+            for filas, contactos in self._iterar_bloques_progresivos():
+                yield filas, total, contactos
+            return
+
+        libro = self.leer_libro_excel()
+        df = libro.df
+
+        self.log(f"📊 Procesando {len(df)} filas...")
+        self._log_configuracion_numeros()
+
+        # Procesar según el formato del archivo (detectado al leerlo)
+        if libro.formato == FORMATO_ESPECIAL:
+            self.log("📋 Detectado formato especial de archivo...")
+        else:
+            self.log("📋 Detectado formato normal de Excel...")
+
+        for inicio in range(0, len(df), FILAS_POR_BLOQUE_ANALISIS):
+            bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE_ANALISIS]
+            if libro.formato == FORMATO_ESPECIAL:
+                # Se salta la primera fila (encabezados) solo en el primer bloque
+                contactos = self.procesar_formato_especial(bloque, 1 if inicio == 0 else 0)
+            else:
+                contactos = self.procesar_formato_normal(bloque, libro.esquema)
+            yield inicio + len(bloque), len(df), contactos
+
+    def leer_libro_excel(self):
+        """
+        Obtener el archivo Excel a través de la caché de libros.
+
+        Solo se vuelve a leer del disco si el archivo ha cambiado (ruta, fecha
+        de modificación o tamaño).
+
+        Returns:
+            LibroExcel: Libro con el DataFrame (solo lectura) y su formato
+        """
+        return self.cache.obtener(self.ruta)
+
+    def leer_muestra_excel(self):
+        """Hoja completa desde la caché o, en archivos grandes, solo el primer bloque de filas"""
+        if not usar_lectura_progresiva(self.ruta):
+            return self.leer_libro_excel().df
+
+        bloques = iterar_bloques_excel(self.ruta)
+        try:
+            return next(bloques, pd.DataFrame())
+        finally:
+            bloques.close()
+
+    def iterar_contactos_excel(self, filas_por_bloque=FILAS_POR_BLOQUE):
+        """
+        Leer el archivo Excel de forma progresiva y devolver los contactos válidos uno a uno.
+
+        Usa el lector de solo lectura de openpyxl, así que la memoria no crece
+        con el tamaño del archivo: solo se mantiene un bloque de filas a la vez.
+        No aplica la consolidación de duplicados.
+
+        Args:
+            filas_por_bloque (int): Filas leídas antes de procesar cada bloque
+
+        Yields:
+            Contacto: Contacto válido, en el orden del archivo
+        """
+        for _, contactos in self._iterar_bloques_progresivos(filas_por_bloque):
+            yield from contactos
+
+    def _iterar_bloques_progresivos(self, filas_por_bloque=FILAS_POR_BLOQUE):
+        """
+        Lectura progresiva por bloques (ver iterar_contactos_excel).
+
+        Yields:
+            tuple: (filas leídas hasta ahora, contactos válidos del bloque)
+        """
+        formato = None
+        filas = 0
+        for bloque in iterar_bloques_excel(self.ruta, filas_por_bloque):
+            if formato is None:
+                # Formato y columnas se resuelven una vez con la cabecera del primer bloque
+                formato = detectar_formato(bloque)
+                esquema = resolver_esquema(bloque.columns, self.cache.alias)
+                if formato == FORMATO_ESPECIAL:
+                    self.log("📋 Detectado formato especial de archivo...")
+                else:
+                    self.log("📋 Detectado formato normal de Excel...")
+
+            filas += len(bloque)
+            if formato == FORMATO_ESPECIAL:
+                # Como en la lectura completa, se salta la primera fila tras la cabecera
+                inicio = 1 if bloque.index[0] == 0 else 0
+                yield filas, self.procesar_formato_especial(bloque, inicio)
+            else:
+                yield filas, self.procesar_formato_normal(bloque, esquema)
+
+    def _log_configuracion_numeros(self):
+        """Registrar configuración de números en el log"""
+        if self.numeros_extranjeros:
+            self.log("🌍 Reconocimiento de números extranjeros: HABILITADO")
+        else:
+            self.log("🇪🇸 Solo números españoles: HABILITADO")
+
+        # Informar sobre la columna de teléfono según la plantilla
+        if self.recogidas:
+            self.log("📞 Plantilla de recogida detectada: Buscando números en columna 'Nº Vuelo VUELTA'")
+        else:
+            self.log("📞 Plantilla normal: Buscando números en columna 'NIF'")
+
+    def mostrar_info_columnas_vuelo(self):
+        """Registrar en el log las columnas de vuelo disponibles"""
+        try:
+            df = self.leer_muestra_excel()
+
+            # Buscar columnas que contengan "VUELTA" o "VUELO"
+            columnas_vuelo = [col for col in df.columns if "VUELTA" in col.upper() or "VUELO" in col.upper()]
+
+            if columnas_vuelo:
+                self.log(f"📋 Columnas de vuelo encontradas: {', '.join(columnas_vuelo)}")
+                columna_usada = resolver_esquema(df.columns, self.cache.alias)['vuelo']
+                self.log(f"    📞 Se usará la columna '{columna_usada}'")
+
+                # Mostrar algunos ejemplos de valores
+                for columna in columnas_vuelo[:2]:  # Solo las primeras 2 columnas
+                    valores_ejemplo = df[columna].dropna().head(3).tolist()
+                    self.log(f"    📊 Ejemplos en '{columna}': {valores_ejemplo}")
+            else:
+                self.log("⚠️ No se encontraron columnas con 'VUELTA' o 'VUELO'")
+                self.log("    🔄 Se usará la columna 'NIF' como respaldo")
+
+        except Exception as e:
+            self.log(f"⚠️ Error analizando columnas de vuelo: {str(e)}")
+
+    def procesar_formato_especial(self, df, inicio=1):
+        """Procesar archivo con formato especial (todas las columnas en una sola, separadas por tabs)"""
+        # Empezar desde 1 para saltar la fila de encabezados
+        campos = extraer_campos_formato_especial(
+            df,
+            inicio,
+            recogidas=self.recogidas,
+            extraer_telefonos_vuelo=self.extraer_telefonos_vuelo,
+            log=self.log
+        )
+        return self.filtrar_contactos(campos)
+
+    def procesar_formato_normal(self, df, esquema=None):
+        """Procesar archivo con formato normal de Excel (extracción por columnas con el esquema resuelto)"""
+        campos = extraer_campos_formato_normal(
+            df,
+            recogidas=self.recogidas,
+            extraer_telefonos_vuelo=self.extraer_telefonos_vuelo,
+            log=self.log,
+            esquema=esquema
+        )
+        return self.filtrar_contactos(campos)
+
+    def extraer_telefonos_vuelo(self, valores_vuelo):
+        """Extraer los teléfonos de una columna completa de campos de vuelo (ver extraer_telefonos_vuelo)"""
+        return extraer_telefonos_vuelo(valores_vuelo, self.numeros_extranjeros)
+
+    def filtrar_contactos(self, campos):
+        """
+        Validar los teléfonos y descartar los tipos de plaza excluidos de todas las filas extraídas.
+
+        Args:
+            campos (DataFrame): Campos de contacto con las columnas de COLUMNAS_CONTACTO
+
+        Returns:
+            list: Contactos válidos (Contacto), en el orden del archivo
+        """
+        # Verificar si el NIF es realmente un teléfono (español o extranjero), en una sola pasada
+        telefonos = analizar_telefonos(campos['telefono'], self.numeros_extranjeros)
+        validos = telefonos['valido'].to_numpy()
+
+        # FILTRO: No enviar si Tipo de Plaza está en la lista de excluidos
+        excluidos = campos['tipo_plaza'].str.upper().isin(TIPOS_PLAZA_EXCLUIDOS).to_numpy()
+
+        for nombre, telefono, tipo_numero, tipo_plaza, excluido in zip(campos['nombre'][validos],
+                                                                       campos['telefono'][validos],
+                                                                       telefonos['tipo'][validos],
+                                                                       campos['tipo_plaza'][validos],
+                                                                       excluidos[validos]):
+            if excluido:
+                self.log("    ⏭️ Saltando %s - Tipo de Plaza: %s", "INFO", nombre, tipo_plaza)
+            else:
+                self.log("    ✅ %s: %s (%s)", "INFO", nombre, telefono, tipo_numero)
+
+        return crear_contactos(campos[validos & ~excluidos])
@@ -0,0 +1,190 @@
+# 📬 Bandeja de salida
+# Todos los mensajes del envío (texto, URL de WhatsApp y teléfono normalizado)
+# se preparan antes de abrir Chrome y se guardan en un archivo JSONL. El bucle
+# de envío solo lee de la bandeja y añade una línea con el resultado de cada
+# mensaje, así un envío interrumpido se reanuda sin volver a leer el Excel ni
+# a rellenar la plantilla.
+
+import json
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+from urllib.parse import quote
+
+from cola_envio import llegada_reserva
+from telefonos import formatear_telefonos_whatsapp
+
+BANDEJA_SALIDA_FILE = "bandeja_salida.jsonl"
+URL_ENVIO_WHATSAPP = "https://web.whatsapp.com/send?phone={telefono}&text={texto}"
+# Mismo enlace en el formato que WhatsApp Web abre dentro de la página, sin recargarla
+URL_CHAT_EN_APP = "https://api.whatsapp.com/send?"
+
+# Resultados que se registran para cada mensaje
+ENVIADO = "enviado"
+ERROR = "error"
+
+
+class EntradaBandeja(namedtuple('EntradaBandeja', ['indice', 'nombre', 'telefono', 'mensaje', 'url',
+                                                   'reservas_count', 'llegada'], defaults=(None,))):
+    """
+    Mensaje preparado para un contacto.
+
+    Attributes:
+        indice: Posición del contacto en el envío
+        nombre: Nombre del contacto
+        telefono: Teléfono normalizado en formato E.164
+        mensaje: Texto del mensaje (None si la plantilla no se pudo rellenar)
+        url: URL de WhatsApp Web que abre el chat con el mensaje escrito (None sin mensaje)
+        reservas_count: Reservas agrupadas en el contacto
+        llegada: Fecha y hora de entrada en formato ISO (None si no se conoce o la bandeja
+            es anterior a este campo)
+    """
+    __slots__ = ()
+
+
+def url_whatsapp(telefono, mensaje):
+    """URL de WhatsApp Web para un teléfono E.164 y un mensaje"""
+    return URL_ENVIO_WHATSAPP.format(telefono=telefono.lstrip('+'), texto=quote(mensaje))
+
+
+def url_chat_en_app(url):
+    """Enlace para abrir dentro de WhatsApp Web el chat de una URL de url_whatsapp()"""
+    return URL_CHAT_EN_APP + url.split('?', 1)[1]
+
+
+def preparar_entradas(contactos, mensajes):
+    """
+    Entradas de la bandeja para unos contactos y sus mensajes ya rellenados.
+
+    Args:
+        contactos (list): Contactos del envío
+        mensajes (list): Un mensaje por contacto (None si no se pudo rellenar)
+
+    Returns:
+        list: Una EntradaBandeja por contacto, en el mismo orden
+    """
+    telefonos = formatear_telefonos_whatsapp([c.telefono for c in contactos]).tolist()
+    return [EntradaBandeja(indice, contacto.nombre, telefono, mensaje,
+                           url_whatsapp(telefono, mensaje) if mensaje is not None else None,
+                           contacto.reservas_count,
+                           llegada_reserva(contacto.fecha_entrada, contacto.hora_entrada))
+            for indice, (contacto, telefono, mensaje) in enumerate(zip(contactos, telefonos, mensajes))]
+
+
+class BandejaSalida:
+    """
+    Bandeja de salida de un envío guardada en un archivo JSONL.
+
+    La primera línea describe el envío (archivo de origen, plantilla, fecha),
+    después va una línea por mensaje y, a medida que se envían, una línea
+    por resultado. El archivo solo crece: registrar un resultado es añadir
+    una línea, y una línea a medio escribir (corte de luz, cierre forzado)
+    se quita del archivo al cargarlo.
+
+    Attributes:
+        ruta: Archivo de la bandeja
+        entradas: Lista de EntradaBandeja
+        origen: Datos del envío guardados en la cabecera
+        resultados: Resultado registrado de cada índice ya procesado
+    """
+
+    def __init__(self, ruta, entradas, origen, resultados=None):
+        self.ruta = ruta
+        self.entradas = entradas
+        self.origen = origen
+        self.resultados = resultados or {}
+        self._bloqueo = threading.Lock()
+
+    def __len__(self):
+        return len(self.entradas)
+
+    @classmethod
+    def crear(cls, ruta, entradas, **origen):
+        """
+        Escribir una bandeja nueva (sustituye a la anterior).
+
+        Args:
+            ruta (str): Archivo de la bandeja
+            entradas (list): Entradas de preparar_entradas()
+            **origen: Datos del envío para la cabecera (archivo, plantilla...)
+
+        Returns:
+            BandejaSalida: La bandeja creada, sin resultados
+        """
+        origen = dict(origen, fecha=datetime.now().isoformat(), total=len(entradas))
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"tipo": "cabecera", **origen}, ensure_ascii=False) + "\n")
+            for entrada in entradas:
+                f.write(json.dumps({"tipo": "mensaje", **entrada._asdict()}, ensure_ascii=False) + "\n")
+        # Sustituir de una vez: nunca queda una bandeja a medias
+        os.replace(temporal, ruta)
+        return cls(ruta, entradas, origen)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """
+        Leer una bandeja guardada.
+
+        Returns:
+            BandejaSalida: La bandeja con sus resultados, o None si no existe o no es válida
+        """
+        if not os.path.exists(ruta):
+            return None
+        origen = None
+        entradas = []
+        resultados = {}
+        with open(ruta, "rb") as f:
+            datos = f.read()
+        # Última línea cortada al interrumpirse el envío: se quita del archivo para
+        # que el siguiente resultado empiece en una línea nueva y no se pierda con ella
+        completo = datos.rfind(b"\n") + 1
+        if completo < len(datos):
+            with open(ruta, "r+b") as f:
+                f.truncate(completo)
+            datos = datos[:completo]
+        for linea in datos.decode("utf-8", errors="replace").split("\n"):
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                continue
+            tipo = registro.pop("tipo", None)
+            if tipo == "cabecera":
+                origen = registro
+            elif tipo == "mensaje":
+                entradas.append(EntradaBandeja(**registro))
+            elif tipo == "resultado":
+                resultados[registro["indice"]] = registro["resultado"]
+        if origen is None or len(entradas) != origen.get("total"):
+            return None
+        return cls(ruta, entradas, origen, resultados)
+
+    def pendientes(self):
+        """Entradas sin resultado registrado, en orden"""
+        return [entrada for entrada in self.entradas if entrada.indice not in self.resultados]
+
+    def contar(self, resultado):
+        """Número de mensajes con un resultado (ENVIADO o ERROR)"""
+        return sum(1 for valor in self.resultados.values() if valor == resultado)
+
+    def registrar(self, indice, resultado):
+        """
+        Añadir el resultado de un mensaje al final del archivo (se puede llamar
+        desde varios hilos a la vez, uno por cuenta).
+
+        Args:
+            indice (int): Índice de la entrada
+            resultado (str): ENVIADO o ERROR
+        """
+        linea = json.dumps({"tipo": "resultado", "indice": indice, "resultado": resultado,
+                            "fecha": datetime.now().isoformat()}) + "\n"
+        with self._bloqueo:
+            self.resultados[indice] = resultado
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(linea)
+
+    def borrar(self):
+        """Eliminar el archivo de la bandeja"""
+        if os.path.exists(self.ruta):
+            os.remove(self.ruta)
@@ -0,0 +1,498 @@
+# ⏱️ Benchmarks de rendimiento del WhatsApp Sender
+# Comparan las rutas optimizadas con la implementación anterior y verifican
+# que ambas producen exactamente el mismo resultado.
+#
+# Uso: python benchmark_rendimiento.py [filas]
+
+import re
+import sys
+import time
+import random
+import tracemalloc
+from datetime import time as hora_dia
+
+import pandas as pd
+
+from gobarajasmasivo import WhatsAppSenderGUIMejorado
+from consolidacion import consolidar_reservas
+from contactos import Contacto, crear_contactos
+from mensajes import EMOJI_RANGES, PlantillaCompilada, limpiar_mensaje
+from plantillas_mensajes import PLANTILLAS_DISPONIBLES
+from procesamiento_excel import extraer_campos_formato_normal
+from telefonos import (es_telefono_valido, analizar_telefonos, extraer_telefonos_vuelo, _interpretar_telefono,
+                       _cache_telefonos)
+
+
+class _Variable:
+    """Sustituto mínimo de tk.Variable para usar la aplicación sin ventana"""
+
+    def __init__(self, valor):
+        self._valor = valor
+
+    def get(self):
+        return self._valor
+
+
+def crear_app_sin_interfaz(plantilla="RecordatorioCita", numeros_extranjeros=True):
+    """Crear una instancia de la aplicación sin Tk para medir la lógica de procesamiento"""
+    app = WhatsAppSenderGUIMejorado.__new__(WhatsAppSenderGUIMejorado)
+    app.plantilla_actual = _Variable(plantilla)
+    app.numeros_extranjeros = _Variable(numeros_extranjeros)
+    app.consolidar_duplicados = _Variable(False)
+    app.excel_path = _Variable("")
+    app._cache_excel = None
+    app.log_message = lambda *args, **kwargs: None
+    return app
+
+
+def generar_reservas(filas, semilla=0):
+    """Generar una hoja de reservas sintética parecida a las exportaciones reales"""
+    aleatorio = random.Random(semilla)
+    telefonos = [
+        lambda: f"6{aleatorio.randint(10000000, 99999999)}",
+        lambda: f"7{aleatorio.randint(10000000, 99999999)}",
+        lambda: f"+44 7{aleatorio.randint(100000000, 999999999)}",
+        lambda: f"0049{aleatorio.randint(1000000000, 9999999999)}",
+        lambda: f"X{aleatorio.randint(1000000, 9999999)}Z",  # NIF real, no es teléfono
+        lambda: None,
+    ]
+    vuelos = [
+        lambda: f"T4-T4-IB{aleatorio.randint(1000, 99999)}-6{aleatorio.randint(10000000, 99999999)}",
+        lambda: f"T1 FR{aleatorio.randint(100, 9999)} 7{aleatorio.randint(10000000, 99999999)}",
+        lambda: f"T2-UX{aleatorio.randint(100, 9999)}",
+        lambda: None,
+    ]
+    # Un cliente de cada diez repite reserva para probar la consolidación
+    clientes = [f"Cliente Prueba {i}" for i in range(max(1, filas // 10))]
+
+    datos = {
+        'Agencia': [aleatorio.choice(["WEB", "BOOKING", "TELEFONO"]) for _ in range(filas)],
+        'Cliente': [aleatorio.choice(clientes) for _ in range(filas)],
+        'NIF': [aleatorio.choice(telefonos)() for _ in range(filas)],
+        'Matricula': [f"{aleatorio.randint(1000, 9999)}{aleatorio.choice(['BCD', 'KLM', 'XYZ'])}" for _ in range(filas)],
+        'Vehiculo': [aleatorio.choice(["SEAT LEON", "VW GOLF", "TOYOTA CHR"]) for _ in range(filas)],
+        'Ocup.': [aleatorio.choice([1, 2, 3, 4, None]) for _ in range(filas)],
+        'Nº Vuelo VUELTA': [aleatorio.choice(vuelos)() for _ in range(filas)],
+        'Hora entrada': [hora_dia(aleatorio.randint(0, 23), aleatorio.choice([0, 15, 30, 45])) for _ in range(filas)],
+        'Fecha entrada': [pd.Timestamp(2024, 7, aleatorio.randint(1, 31)) for _ in range(filas)],
+        'Tipo de Plaza': [aleatorio.choice(["ESTANDAR", "ESTANDAR", "PREMIUM", "Superior", "CUBIERTO"]) for _ in range(filas)],
+    }
+    return pd.DataFrame(datos)
+
+
+def generar_campos_vuelo(cantidad, semilla=0):
+    """Generar valores de vuelo variados: número al final, en medio, varios números, sin número..."""
+    aleatorio = random.Random(semilla)
+    movil = lambda: f"6{aleatorio.randint(10000000, 99999999)}"
+    formas = [
+        lambda: f"T4-T4-IB{aleatorio.randint(1000, 99999)}-{movil()}",
+        lambda: f"T1 FR{aleatorio.randint(100, 9999)} {movil()} llamar",
+        lambda: f"VUELO {movil()}/{aleatorio.randint(100000000, 999999999)}",
+        lambda: f"UX{aleatorio.randint(100, 9999)}{movil()}",
+        lambda: f"T2 {aleatorio.randint(10 ** 15, 10 ** 16)}-{movil()}X",
+        lambda: f"VUELTA 00{aleatorio.randint(10 ** 11, 10 ** 12)}",
+        lambda: f"T2-UX{aleatorio.randint(100, 9999)}",
+        lambda: aleatorio.randint(600000000, 799999999),
+        lambda: "",
+        lambda: None,
+        lambda: float('nan'),
+    ]
+    return pd.Series([aleatorio.choice(formas)() for _ in range(cantidad)], dtype=object)
+
+
+def _extraer_telefono_vuelo_por_patrones(valor_vuelo, numeros_extranjeros=True):
+    """Implementación anterior de la extracción de teléfonos de vuelo (valor a valor), como referencia"""
+    if not valor_vuelo or valor_vuelo == 'nan':
+        return ""
+
+    valor_limpio = str(valor_vuelo).strip()
+
+    match_final = re.search(r'(\d{9,})$', valor_limpio)
+    if match_final and es_telefono_valido(match_final.group(1), numeros_extranjeros):
+        return match_final.group(1)
+
+    match_espaciado = re.search(r'[-\s](\d{9,})', valor_limpio)
+    if match_espaciado and es_telefono_valido(match_espaciado.group(1), numeros_extranjeros):
+        return match_espaciado.group(1)
+
+    for numero in re.findall(r'(\d{9,})', valor_limpio):
+        if es_telefono_valido(numero, numeros_extranjeros):
+            return numero
+
+    todos_digitos = ''.join(filter(str.isdigit, valor_limpio))
+    if len(todos_digitos) >= 9:
+        for secuencia in re.findall(r'\d+', valor_limpio):
+            if len(secuencia) >= 9 and es_telefono_valido(secuencia, numeros_extranjeros):
+                return secuencia
+
+    return ""
+
+
+def generar_formato_especial(filas, semilla=0):
+    """Generar una hoja en formato especial: todos los campos en una columna separados por tabs"""
+    aleatorio = random.Random(semilla)
+    normal = generar_reservas(filas, semilla)
+    lineas = ["Agencia\tCliente\tNIF\tMatricula\tVehiculo\tOcup.\tVuelo IDA\tVuelo VUELTA"]
+    for fila in normal.itertuples(index=False):
+        vuelo = aleatorio.choice([f"VUELO {fila[6]}", f"{fila[6]}", "VUELTA sin numero"])
+        campos = [fila.Agencia, fila.Cliente, str(fila.NIF), fila.Matricula, fila.Vehiculo, str(fila[5]),
+                  "IB1234", vuelo, "", "", aleatorio.choice([f"{fila[7]}"[:5], "2024-07-15", ""]), "",
+                  fila[9]]
+        # Algunas filas llegan recortadas
+        lineas.append("\t".join(campos[:aleatorio.choice([4, 6, 8, 11, 13, 13, 13])]))
+    return pd.DataFrame({"Datos": lineas})
+
+
+def _procesar_especial_por_filas(app, df):
+    """Implementación anterior del formato especial (split fila a fila), como referencia"""
+    contactos = []
+    for index in range(1, len(df)):
+        try:
+            datos = str(df.iloc[index, 0]).split('\t')
+            if len(datos) < 6:
+                continue
+
+            nombre = datos[1].strip()
+            if app.plantilla_actual.get() == "Recogidas":
+                nif_campo = ""
+                for dato in datos:
+                    dato_limpio = dato.strip().upper()
+                    if "VUELTA" in dato_limpio or "VUELO" in dato_limpio:
+                        nif_campo = _extraer_telefono_vuelo_por_patrones(dato, app.numeros_extranjeros.get())
+                        if nif_campo:
+                            break
+                if not nif_campo:
+                    nif_campo = datos[2].strip() if len(datos) > 2 else ""
+            else:
+                nif_campo = datos[2].strip() if len(datos) > 2 else ""
+
+            matricula = datos[3].strip() if len(datos) > 3 else "Sin matrícula"
+            ocupantes = datos[5].strip() if len(datos) > 5 else "Sin especificar"
+
+            hora_entrada = None
+            fecha_entrada = "Desconocida"
+            if len(datos) > 10:
+                entrada = datos[10].strip()
+                if entrada and ':' in entrada:
+                    hora_entrada = entrada
+                if entrada and '-' in entrada:
+                    fecha_entrada = entrada
+
+            tipo_plaza = datos[12].strip() if len(datos) > 12 else "Sin especificar"
+
+            contacto = app._validar_y_crear_contacto(nombre, nif_campo, matricula, hora_entrada,
+                                                     fecha_entrada, tipo_plaza, ocupantes)
+            if contacto:
+                contactos.append(contacto)
+        except Exception:
+            continue
+    return contactos
+
+
+def generar_contactos(cantidad, semilla=0):
+    """Generar contactos ya validados con muchos clientes repetidos el mismo día"""
+    aleatorio = random.Random(semilla)
+    clientes = [(f"Cliente {i}", f"6{aleatorio.randint(10000000, 99999999)}") for i in range(max(1, cantidad // 3))]
+    contactos = []
+    for _ in range(cantidad):
+        nombre, telefono = aleatorio.choice(clientes)
+        contactos.append(Contacto.desde_dict({
+            'nombre': nombre,
+            'telefono': telefono,
+            'matricula': aleatorio.choice([f"{aleatorio.randint(1000, 1200)}BCD", "Sin matrícula"]),
+            'hora_entrada': "10:30",
+            'fecha_entrada': f"2024-07-{aleatorio.randint(1, 3):02d}",
+            'tipo_plaza': "ESTANDAR",
+            'ocupantes': aleatorio.choice(["1", "2", "4", "3 personas", "Sin especificar", "nan"]),
+        }))
+    return contactos
+
+
+def _consolidar_por_diccionario(contactos, log=lambda *args, **kwargs: None):
+    """Implementación anterior de la consolidación (diccionario de listas y set de matrículas), como referencia"""
+    grupos = {}
+    for contacto in contactos:
+        grupos.setdefault(f"{contacto['telefono']}_{contacto['fecha_entrada']}", []).append(contacto)
+
+    consolidados = []
+    for grupo in grupos.values():
+        if len(grupo) == 1:
+            consolidados.append(grupo[0])
+            continue
+
+        matriculas = list(set([c['matricula'] for c in grupo if c['matricula'] != 'Sin matrícula']))
+        ocupantes_total = 0
+        for contacto in grupo:
+            ocupantes = str(contacto['ocupantes']).strip()
+            if ocupantes.isdigit():
+                ocupantes_total += int(ocupantes)
+            elif 'persona' in ocupantes.lower():
+                match = re.search(r'(\d+)', ocupantes)
+                ocupantes_total += int(match.group(1)) if match else 1
+            else:
+                ocupantes_total += 1
+        consolidados.append(dict(grupo[0].a_dict(), matriculas=matriculas, ocupantes_total=ocupantes_total,
+                                 reservas_count=len(grupo), consolidado=True))
+        log(f"    🔗 Consolidado {len(grupo)} reservas para {grupo[0]['nombre']}")
+        log(f"       📋 Matrículas: {', '.join(matriculas)}")
+        log(f"       👥 Total ocupantes: {ocupantes_total}")
+    return consolidados
+
+
+def _limpiar_caracteres_por_caracter(texto):
+    """limpiar_caracteres_unicode anterior: concatenación carácter a carácter y rangos de emoji por carácter"""
+    if not isinstance(texto, str):
+        texto = str(texto)
+    texto_limpio = ""
+    for char in texto:
+        char_code = ord(char)
+        es_emoji = any(start <= char_code <= end for start, end in EMOJI_RANGES)
+        if char_code <= 0xFFFF or es_emoji:
+            texto_limpio += char
+        else:
+            if char == '\n':
+                texto_limpio += '\n'
+            elif char == '\t':
+                texto_limpio += ' '
+            elif char_code > 0x10FFFF:
+                texto_limpio += " "
+            else:
+                texto_limpio += char
+    return texto_limpio.strip()
+
+
+def _procesar_por_filas(app, df):
+    """Implementación anterior del formato normal (fila a fila con df.iloc), como referencia"""
+    contactos = []
+    for index in range(len(df)):
+        try:
+            nombre = str(df.iloc[index]['Cliente']).strip() if 'Cliente' in df.columns else f"Cliente {index+1}"
+
+            if app.plantilla_actual.get() == "Recogidas":
+                nif_campo = ""
+                columnas_vuelo = [col for col in df.columns if "VUELTA" in col.upper() or "VUELO" in col.upper()]
+                if columnas_vuelo:
+                    valor_vuelo = df.iloc[index][columnas_vuelo[0]]
+                    if pd.notna(valor_vuelo):
+                        nif_campo = _extraer_telefono_vuelo_por_patrones(str(valor_vuelo),
+                                                                             app.numeros_extranjeros.get())
+                if not nif_campo:
+                    nif_campo = str(df.iloc[index]['NIF']).strip() if 'NIF' in df.columns else ""
+            else:
+                nif_campo = str(df.iloc[index]['NIF']).strip() if 'NIF' in df.columns else ""
+
+            matricula = str(df.iloc[index]['Matricula']).strip() if 'Matricula' in df.columns else "Sin matrícula"
+
+            hora_entrada = None
+            if 'Hora entrada' in df.columns:
+                hora_raw = df.iloc[index]['Hora entrada']
+                if pd.notna(hora_raw):
+                    hora_str = str(hora_raw)
+                    if ':' in hora_str:
+                        hora_entrada = hora_str.split(':')[0] + ":" + hora_str.split(':')[1]
+                    else:
+                        hora_entrada = hora_str[:2] + ":00"
+
+            fecha_entrada = "Desconocida"
+            if 'Fecha entrada' in df.columns:
+                fecha_raw = df.iloc[index]['Fecha entrada']
+                if pd.notna(fecha_raw):
+                    fecha_str = str(fecha_raw)
+                    if '-' in fecha_str:
+                        fecha_entrada = fecha_str.split('-')[0] + "-" + fecha_str.split('-')[1] + "-" + fecha_str.split('-')[2]
+                    else:
+                        fecha_entrada = fecha_str[:4] + "-" + fecha_str[4:6] + "-" + fecha_str[6:]
+
+            tipo_plaza = str(df.iloc[index]['Tipo de Plaza']).strip() if 'Tipo de Plaza' in df.columns else "Sin especificar"
+
+            ocupantes = "Sin especificar"
+            if 'Ocup.' in df.columns:
+                ocupantes_raw = df.iloc[index]['Ocup.']
+                if pd.notna(ocupantes_raw):
+                    ocupantes = str(ocupantes_raw).strip()
+
+            contacto = app._validar_y_crear_contacto(nombre, nif_campo, matricula, hora_entrada,
+                                                     fecha_entrada, tipo_plaza, ocupantes)
+            if contacto:
+                contactos.append(contacto)
+        except Exception:
+            continue
+    return contactos
+
+
+def medir(funcion, *args):
+    """Ejecutar una función y devolver (segundos, resultado)"""
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+def benchmark_formato_normal(filas):
+    """Extracción del formato normal: fila a fila frente a columnas"""
+    print(f"\n📊 Formato normal ({filas} filas)")
+    df = generar_reservas(filas)
+
+    for plantilla in ("RecordatorioCita", "Recogidas"):
+        app = crear_app_sin_interfaz(plantilla)
+        t_filas, contactos_filas = medir(_procesar_por_filas, app, df)
+        t_columnas, contactos_columnas = medir(app._procesar_formato_normal, df)
+
+        assert contactos_filas == contactos_columnas, "Los contactos extraídos no coinciden"
+        print(f"  {plantilla:<17} fila a fila: {t_filas:7.3f}s | columnas: {t_columnas:7.3f}s | "
+              f"x{t_filas / t_columnas:.1f} | {len(contactos_columnas)} contactos idénticos")
+
+
+def benchmark_formato_especial(filas):
+    """Formato especial: split fila a fila frente a división de toda la columna"""
+    print(f"\n📋 Formato especial ({filas} filas)")
+    df = generar_formato_especial(filas)
+
+    for plantilla in ("RecordatorioCita", "Recogidas"):
+        app = crear_app_sin_interfaz(plantilla)
+        t_filas, contactos_filas = medir(_procesar_especial_por_filas, app, df)
+        t_columnas, contactos_columnas = medir(app._procesar_formato_especial, df)
+
+        assert contactos_filas == contactos_columnas, "Los contactos extraídos no coinciden"
+        print(f"  {plantilla:<17} fila a fila: {t_filas:7.3f}s | columnas: {t_columnas:7.3f}s | "
+              f"x{t_filas / t_columnas:.1f} | {len(contactos_columnas)} contactos idénticos")
+
+
+def benchmark_telefonos_vuelo(cantidad=100000):
+    """Teléfonos en campos de vuelo: patrones valor a valor frente a columna completa"""
+    print(f"\n✈️ Campos de vuelo ({cantidad} valores)")
+    valores = generar_campos_vuelo(cantidad)
+
+    for numeros_extranjeros in (True, False):
+        t_individual, numeros = medir(lambda: [_extraer_telefono_vuelo_por_patrones(v, numeros_extranjeros)
+                                               for v in valores])
+        t_columna, extraidos = medir(extraer_telefonos_vuelo, valores, numeros_extranjeros)
+
+        assert numeros == extraidos.tolist(), "Los teléfonos extraídos no coinciden"
+        print(f"  extranjeros={numeros_extranjeros!s:<5}    individual: {t_individual:7.3f}s | "
+              f"columna: {t_columna:7.3f}s | x{t_individual / t_columna:.1f} | resultados idénticos")
+
+
+def benchmark_consolidacion(cantidad=100000):
+    """Consolidación de reservas: diccionario de listas frente a arrays por columna"""
+    print(f"\n🔗 Consolidación ({cantidad} reservas)")
+    contactos = generar_contactos(cantidad)
+    # En la aplicación los teléfonos ya se analizaron al filtrar los contactos
+    analizar_telefonos([c.telefono for c in contactos])
+
+    t_diccionario, anteriores = medir(_consolidar_por_diccionario, contactos)
+    t_columnas, consolidados = medir(consolidar_reservas, contactos)
+
+    # Las matrículas salían en orden de set: se comparan ordenadas
+    clave = lambda c: (c['nombre'], c['fecha_entrada'], c.get('reservas_count', 1), c.get('ocupantes_total'),
+                       sorted(c.get('matriculas', [])))
+    assert [clave(c) for c in anteriores] == [clave(c) for c in consolidados], "La consolidación no coincide"
+    assert consolidados == consolidar_reservas(contactos), "La consolidación no es determinista"
+    print(f"  diccionario: {t_diccionario:7.3f}s | columnas: {t_columnas:7.3f}s | "
+          f"x{t_diccionario / t_columnas:.1f} | {len(consolidados)} contactos idénticos")
+
+
+def benchmark_memoria_contactos(filas=100000):
+    """Memoria de los contactos: diccionario por contacto frente a Contacto con campos compartidos"""
+    print(f"\n👤 Memoria de contactos ({filas} contactos)")
+    df = generar_reservas(filas)
+
+    def memoria(crear):
+        tracemalloc.start()
+        resultado = crear()
+        usada = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return usada, resultado
+
+    # Antes: to_dict sobre los campos extraídos, con una copia de cada texto por fila
+    m_dict, diccionarios = memoria(lambda: extraer_campos_formato_normal(df).to_dict('records'))
+    m_contactos, contactos = memoria(lambda: crear_contactos(extraer_campos_formato_normal(df)))
+    assert diccionarios == [c.a_dict() for c in contactos], "Los contactos no coinciden"
+    print(f"  diccionarios: {m_dict / 2**20:7.1f} MB | Contacto: {m_contactos / 2**20:7.1f} MB | "
+          f"x{m_dict / m_contactos:.1f} | {len(contactos)} contactos idénticos")
+
+
+def benchmark_telefonos(cantidad=100000):
+    """Validación, tipo y formato WhatsApp: número a número frente a columna completa con caché"""
+    print(f"\n📞 Teléfonos ({cantidad} números)")
+    telefonos = generar_reservas(cantidad)['NIF'].map(str)
+
+    for numeros_extranjeros in (True, False):
+        def uno_a_uno():
+            registros = [_interpretar_telefono(t) for t in telefonos]
+            return ([r.es_valido(numeros_extranjeros) for r in registros],
+                    [r.tipo for r in registros],
+                    [r.e164 for r in registros])
+
+        t_individual, (validos, tipos, formateados) = medir(uno_a_uno)
+        _cache_telefonos.invalidar()
+        t_frio, analisis = medir(analizar_telefonos, telefonos, numeros_extranjeros)
+        t_caliente, repetido = medir(analizar_telefonos, telefonos, numeros_extranjeros)
+
+        assert validos == analisis['valido'].tolist(), "La validación no coincide"
+        assert tipos == analisis['tipo'].tolist(), "La clasificación no coincide"
+        assert formateados == analisis['whatsapp'].tolist(), "El formato WhatsApp no coincide"
+        assert analisis.equals(repetido), "La caché no devuelve lo mismo"
+        print(f"  extranjeros={numeros_extranjeros!s:<5}    individual: {t_individual:7.3f}s | "
+              f"columna: {t_frio:7.3f}s | con caché: {t_caliente:7.3f}s | "
+              f"x{t_individual / t_caliente:.1f} | resultados idénticos")
+
+def benchmark_mensajes(cantidad=20000):
+    """Mensajes: format y limpieza por contacto frente a plantilla compilada una vez"""
+    print(f"\n✉️ Mensajes ({cantidad} reservas)")
+    contactos = consolidar_reservas(generar_contactos(cantidad))
+
+    for nombre, plantilla in PLANTILLAS_DISPONIBLES.items():
+        try:
+            compilada = PlantillaCompilada(plantilla)
+        except KeyError as e:
+            print(f"  {nombre:<17} variable no soportada: {e}")
+            continue
+
+        # Antes: format de la plantilla completa y limpieza del mensaje entero en cada contacto
+        def por_contacto():
+            return [_limpiar_caracteres_por_caracter(plantilla.format(
+                nombre=c.nombre, matricula=c.texto_matriculas(), hora=c.texto_hora(),
+                fecha_actual=compilada.fecha_actual, ocupantes=c.texto_ocupantes(),
+                reservas_count=c.reservas_count)) for c in contactos]
+
+        t_antes, antes = medir(por_contacto)
+        t_despues, despues = medir(compilada.render_todos, contactos)
+        assert antes == despues, f"Los mensajes de {nombre} no coinciden"
+        print(f"  {nombre:<17} por contacto: {t_antes:7.3f}s | compilada: {t_despues:7.3f}s | "
+              f"x{t_antes / t_despues:.1f} | {len(despues)} mensajes idénticos")
+
+def benchmark_limpieza_unicode(repeticiones=2000):
+    """Limpieza de mensajes: carácter a carácter y recuento aparte frente a una sola pasada"""
+    print(f"\n🧹 Limpieza Unicode ({repeticiones} mensajes por plantilla)")
+    contacto = Contacto("María García 😊", "612345678", "1234ABC", "14:30", "15-01-2024", "Normal", "3")
+
+    for nombre, plantilla in PLANTILLAS_DISPONIBLES.items():
+        try:
+            mensaje = PlantillaCompilada(plantilla).render(contacto)
+        except KeyError:
+            mensaje = plantilla
+        mensajes = [f"  {mensaje}\n"] * repeticiones
+
+        # Antes: limpieza y después otro recorrido para contar los emojis
+        def por_caracter():
+            limpios = [_limpiar_caracteres_por_caracter(m) for m in mensajes]
+            return limpios, [len([c for c in m if ord(c) > 0xFFFF]) for m in limpios]
+
+        t_antes, (limpios, emojis) = medir(por_caracter)
+        t_despues, resultados = medir(lambda: [limpiar_mensaje(m) for m in mensajes])
+        assert limpios == [texto for texto, _ in resultados], f"La limpieza de {nombre} no coincide"
+        assert emojis == [e.fuera_bmp for _, e in resultados], f"Los emojis de {nombre} no coinciden"
+        print(f"  {nombre:<17} ({len(mensaje):4d} car.) carácter a carácter: {t_antes:7.3f}s | "
+              f"una pasada: {t_despues:7.3f}s | x{t_antes / t_despues:.1f} | {resultados[0][1].total} emojis")
+
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    benchmark_formato_normal(filas)
+    benchmark_formato_especial(filas)
+    benchmark_telefonos_vuelo()
+    benchmark_telefonos()
+    benchmark_consolidacion()
+    benchmark_memoria_contactos()
+    benchmark_mensajes()
+    benchmark_limpieza_unicode()
@@ -0,0 +1,142 @@
+# 📅 Cola de envío por hora de llegada
+# Los mensajes salen por orden de llegada del cliente (fecha y hora de entrada
+# de la reserva), no por orden del Excel: primero el que entra antes. Con
+# antelación, cada mensaje se retiene hasta N horas antes de su entrada y una
+# misma sesión abierta va enviando los recordatorios a su hora. Los mensajes
+# sin fecha u hora de entrada no se retienen y aprovechan los huecos.
+
+import heapq
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from programador_envio import INTERVALO_COMPROBACION_ESPERA
+
+# Formatos de fecha de entrada que deja el análisis del Excel
+FORMATOS_FECHA_ENTRADA = ("%Y-%m-%d", "%d-%m-%Y")
+
+
+def llegada_reserva(fecha_entrada, hora_entrada):
+    """
+    Fecha y hora de entrada de una reserva.
+
+    Args:
+        fecha_entrada (str): Fecha de entrada ('YYYY-MM-DD', 'DD-MM-YYYY' o 'Desconocida')
+        hora_entrada (str): Hora de entrada ('HH:MM', None si la reserva no la indica)
+
+    Returns:
+        str: Fecha y hora en formato ISO ('2024-01-15T14:30:00'), o None si falta o no se puede
+            interpretar (el mensaje va entonces a la cola sin hora)
+    """
+    fecha = str(fecha_entrada or "").strip()[:10]
+    for formato in FORMATOS_FECHA_ENTRADA:
+        try:
+            dia = datetime.strptime(fecha, formato)
+            break
+        except ValueError:
+            continue
+    else:
+        return None
+    try:
+        hora = datetime.strptime(str(hora_entrada or "").strip()[:5], "%H:%M")
+    except ValueError:
+        return None
+    return dia.replace(hour=hora.hour, minute=hora.minute).isoformat()
+
+
+def _llegada(entrada):
+    return datetime.fromisoformat(entrada.llegada) if entrada.llegada else None
+
+
+class ColaEnvio:
+    """
+    Cola de prioridad de los mensajes de una cuenta por hora de llegada.
+
+    siguiente() entrega primero el mensaje ya liberado con la entrada más
+    próxima; si ninguno está liberado, entrega uno sin hora de entrada y, si
+    no queda ninguno, espera a que se libere el siguiente.
+
+    Attributes:
+        antelacion: Tiempo antes de la entrada en que se libera cada mensaje (None = sin retener)
+    """
+
+    def __init__(self, entradas, antelacion_horas=0, ahora=datetime.now, dormir=time.sleep):
+        self.antelacion = timedelta(hours=antelacion_horas) if antelacion_horas else None
+        self._ahora = ahora
+        self._dormir = dormir
+        self._programadas = []
+        self._sin_hora = deque()
+        for entrada in entradas:
+            llegada = _llegada(entrada)
+            if llegada is None:
+                self._sin_hora.append(entrada)
+            else:
+                self._programadas.append((self._liberacion(llegada), llegada, entrada.indice, entrada))
+        heapq.heapify(self._programadas)
+
+    def __len__(self):
+        return len(self._programadas) + len(self._sin_hora)
+
+    def _liberacion(self, llegada):
+        return llegada - self.antelacion if self.antelacion else datetime.min
+
+    def siguiente(self, continuar=lambda: True, avisar=None):
+        """
+        Siguiente mensaje a enviar, esperando a que se libere si hace falta.
+
+        Args:
+            continuar (callable): Se consulta durante la espera; si devuelve False se deja de esperar
+            avisar (callable): avisar(liberacion, entrada) antes de esperar a un mensaje retenido
+
+        Returns:
+            EntradaBandeja: La entrada, o None si la cola está vacía o se dejó de esperar
+        """
+        if not self._programadas:
+            return self._sin_hora.popleft() if self._sin_hora else None
+        liberacion = self._programadas[0][0]
+        if liberacion > self._ahora():
+            if self._sin_hora:
+                return self._sin_hora.popleft()
+            if avisar:
+                avisar(liberacion, self._programadas[0][3])
+            while True:
+                if not continuar():
+                    return None
+                restante = (liberacion - self._ahora()).total_seconds()
+                if restante <= 0:
+                    break
+                self._dormir(min(restante, INTERVALO_COMPROBACION_ESPERA))
+        return heapq.heappop(self._programadas)[3]
+
+    def fuera_de_plazo(self, segundos_por_mensaje):
+        """
+        Mensajes que no saldrán antes de la entrada del cliente a un ritmo dado.
+
+        Simula la cola completa sin modificarla: cada mensaje con texto ocupa
+        segundos_por_mensaje y los mensajes retenidos no salen antes de liberarse.
+
+        Args:
+            segundos_por_mensaje (float): Segundos medios entre mensajes de la cuenta
+
+        Returns:
+            list: (entrada, envío estimado como datetime) de cada mensaje que llega tarde
+        """
+        momento = self._ahora()
+        intervalo = timedelta(seconds=segundos_por_mensaje)
+        sin_hora = sum(1 for entrada in self._sin_hora if entrada.mensaje is not None)
+        fuera = []
+        programadas = sorted(self._programadas)
+        posicion = 0
+        while posicion < len(programadas):
+            liberacion, llegada, _, entrada = programadas[posicion]
+            if liberacion > momento and sin_hora:
+                sin_hora -= 1
+            else:
+                posicion += 1
+                if entrada.mensaje is None:
+                    continue
+                momento = max(momento, liberacion)
+                if momento > llegada:
+                    fuera.append((entrada, momento))
+            momento += intervalo
+        return fuera
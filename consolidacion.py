@@ -0,0 +1,136 @@
+# 🔗 Consolidación de reservas duplicadas
+# Agrupa las reservas del mismo cliente (teléfono normalizado) para la misma
+# fecha en un solo contacto, con operaciones por columnas sobre todas las
+# reservas a la vez
+
+import re
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+
+from contactos import Contacto
+from telefonos import formatear_telefonos_whatsapp
+
+SIN_MATRICULA = "Sin matrícula"
+PATRON_NUMERO_OCUPANTES = re.compile(r'(\d+)')
+
+# Campos de cada reserva que usa la consolidación
+_CAMPOS_RESERVA = ('telefono', 'fecha_entrada', 'matricula', 'ocupantes')
+
+
+def ocupantes_reserva(ocupantes):
+    """
+    Número de ocupantes de una reserva a partir del texto del campo.
+
+    Args:
+        ocupantes: Valor del campo (ej: '2', '3 personas', 'Sin especificar')
+
+    Returns:
+        int: Ocupantes indicados, o 1 si el campo no tiene un número reconocible
+    """
+    try:
+        ocupantes = str(ocupantes).strip()
+        if ocupantes.isdigit():
+            return int(ocupantes)
+        if 'persona' in ocupantes.lower():
+            # Extraer número de "X personas"
+            coincidencia = PATRON_NUMERO_OCUPANTES.search(ocupantes)
+            return int(coincidencia.group(1)) if coincidencia else 1
+        return 1
+    except Exception:
+        return 1
+
+
+def _ocupantes_por_reserva(ocupantes):
+    """Ocupantes de todas las reservas, interpretando cada texto distinto una sola vez"""
+    codigos, distintos = pd.factorize(pd.Series(ocupantes, dtype=object))
+    # Código 0: campo vacío (NaN/None), que cuenta como en ocupantes_reserva
+    valores = np.array([ocupantes_reserva(None)] + [ocupantes_reserva(valor) for valor in distintos], dtype=np.int64)
+    return valores[codigos + 1]
+
+
+def _telefonos_normalizados(telefonos):
+    """
+    Clave de teléfono de cada reserva: su número normalizado en formato E.164.
+
+    Así '612 345 678', '0034612345678' y '+34 612-345-678' son el mismo
+    cliente. Los números ya analizados salen de la caché de teléfonos.
+    """
+    return formatear_telefonos_whatsapp([str(t) for t in telefonos]).tolist()
+
+
+def _codigos(valores):
+    """
+    Código entero de cada valor, con los valores vacíos en un código propio.
+
+    Returns:
+        tuple: (códigos, cantidad de códigos posibles)
+    """
+    codigos, distintos = pd.factorize(pd.Series(valores, dtype=object))
+    return codigos + 1, len(distintos) + 1
+
+
+def consolidar_reservas(contactos, log=None):
+    """
+    Consolidar las reservas del mismo cliente (teléfono normalizado) para la misma fecha.
+
+    Los campos de las reservas se sacan una sola vez a arrays y los grupos
+    salen de combinar los códigos de (teléfono en formato E.164, fecha de
+    entrada), numerados por orden de aparición. Cada contacto consolidado
+    ocupa el lugar de su primera reserva, toma de ella nombre, teléfono,
+    hora y tipo de plaza, suma los ocupantes de todas y lista sus
+    matrículas sin repetir en el orden en que aparecen. Solo se crea un
+    Contacto nuevo para los grupos con varias reservas.
+
+    Args:
+        contactos (list): Contactos válidos (Contacto), en el orden del archivo
+        log (callable): Función de log de la aplicación, log(mensaje, nivel, *args)
+
+    Returns:
+        list: Contactos sin duplicados; los de una sola reserva se devuelven tal cual
+    """
+    if not contactos:
+        return contactos
+    log = log or (lambda *args, **kwargs: None)
+
+    telefonos, fechas, matriculas, ocupantes = (list(map(attrgetter(campo), contactos)) for campo in _CAMPOS_RESERVA)
+    codigo_telefono, _ = _codigos(_telefonos_normalizados(telefonos))
+    codigo_fecha, num_fechas = _codigos(fechas)
+    grupo = pd.factorize(codigo_telefono * num_fechas + codigo_fecha)[0]
+
+    reservas_por_grupo = np.bincount(grupo)
+    ocupantes_total = np.bincount(grupo, weights=_ocupantes_por_reserva(ocupantes)).astype(np.int64)
+    primera_reserva = np.unique(grupo, return_index=True)[1]
+    consolidados = list(map(contactos.__getitem__, primera_reserva.tolist()))
+
+    varios = np.flatnonzero(reservas_por_grupo > 1)
+    if not len(varios):
+        return consolidados
+
+    # Matrículas sin repetir de los grupos con varias reservas, juntas por grupo y en orden de aparición
+    matriculas = np.array(matriculas, dtype=object)
+    filas = np.flatnonzero((reservas_por_grupo[grupo] > 1) & (matriculas != SIN_MATRICULA))
+    codigo_matricula, num_matriculas = _codigos(matriculas[filas])
+    filas = filas[np.sort(np.unique(grupo[filas] * num_matriculas + codigo_matricula, return_index=True)[1])]
+    filas = filas[np.argsort(grupo[filas], kind='stable')]
+    matriculas_filas = matriculas[filas].tolist()
+    inicios = np.searchsorted(grupo[filas], varios, side='left').tolist()
+    finales = np.searchsorted(grupo[filas], varios, side='right').tolist()
+
+    for numero_grupo, num_reservas, total, inicio, final in zip(varios.tolist(), reservas_por_grupo[varios].tolist(),
+                                                                ocupantes_total[varios].tolist(), inicios, finales):
+        base = consolidados[numero_grupo]
+        matriculas_grupo = tuple(matriculas_filas[inicio:final])
+        lista_matriculas = ', '.join(matriculas_grupo)
+        consolidados[numero_grupo] = Contacto(
+            base.nombre, base.telefono, lista_matriculas or SIN_MATRICULA,
+            base.hora_entrada, base.fecha_entrada, base.tipo_plaza, f"{total} personas",
+            matriculas=matriculas_grupo, ocupantes_total=total, reservas_count=num_reservas
+        )
+
+        log("    🔗 Consolidado %s reservas para %s", "INFO", num_reservas, base.nombre)
+        log("       📋 Matrículas: %s", "INFO", lista_matriculas)
+        log("       👥 Total ocupantes: %s", "INFO", total)
+
+    return consolidados
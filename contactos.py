@@ -0,0 +1,294 @@
+# 👤 Contactos de envío
+# Representación compacta de cada contacto (objeto con __slots__ en lugar de
+# diccionario) con los campos repetidos (fecha, hora, tipo de plaza,
+# ocupantes) compartidos entre contactos en lugar de copiados, e índices para
+# filtrar y ordenar la vista previa sin recorrer la tabla
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from procesamiento_excel import COLUMNAS_CONTACTO
+from telefonos import analizar_telefonos
+
+# Campos con pocos valores distintos que se repiten en miles de contactos
+CAMPOS_CATEGORICOS = ('hora_entrada', 'fecha_entrada', 'tipo_plaza', 'ocupantes')
+
+# Hora que se muestra (vista previa y mensajes) en las reservas sin hora de entrada
+HORA_DESCONOCIDA = "00:00"
+
+# Matrículas que se muestran en la vista previa antes de resumir el resto
+MAX_MATRICULAS_VISTA = 3
+
+# Columnas de la vista previa, en el orden de Contacto.valores_vista()
+COLUMNAS_VISTA = ('Nombre', 'Teléfono', 'Matrícula', 'Hora', 'Tipo Plaza', 'Ocupantes')
+
+
+def _internar(valor):
+    """Devolver la copia compartida de un texto (los demás valores tal cual)"""
+    return sys.intern(valor) if type(valor) is str else valor
+
+
+class Contacto:
+    """
+    Contacto listo para enviar: una reserva o varias consolidadas.
+
+    Los contactos consolidados llevan además la lista de matrículas, el total
+    de ocupantes y el número de reservas agrupadas. Para el código que aún
+    trabaja con diccionarios, contacto['campo'] y contacto.get('campo')
+    devuelven lo mismo que el diccionario anterior.
+
+    Attributes:
+        nombre, telefono, matricula, hora_entrada, fecha_entrada, tipo_plaza, ocupantes:
+            Campos de la reserva (en los consolidados, matrícula y ocupantes resumidos;
+            hora_entrada es None si la reserva no la indica)
+        matriculas: Tupla de matrículas de un contacto consolidado (None si no lo es)
+        ocupantes_total: Ocupantes sumados de un contacto consolidado (None si no lo es)
+        reservas_count: Número de reservas agrupadas en el contacto
+    """
+    __slots__ = ('nombre', 'telefono', 'matricula', 'hora_entrada', 'fecha_entrada', 'tipo_plaza',
+                 'ocupantes', 'matriculas', 'ocupantes_total', 'reservas_count')
+
+    def __init__(self, nombre, telefono, matricula, hora_entrada, fecha_entrada, tipo_plaza, ocupantes,
+                 matriculas=None, ocupantes_total=None, reservas_count=1):
+        self.nombre = nombre
+        self.telefono = telefono
+        self.matricula = matricula
+        self.hora_entrada = hora_entrada
+        self.fecha_entrada = fecha_entrada
+        self.tipo_plaza = tipo_plaza
+        self.ocupantes = ocupantes
+        self.matriculas = matriculas
+        self.ocupantes_total = ocupantes_total
+        self.reservas_count = reservas_count
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Crear un contacto a partir de un diccionario con las claves de COLUMNAS_CONTACTO"""
+        return cls(datos['nombre'], datos['telefono'], datos['matricula'],
+                   *(_internar(datos[campo]) for campo in CAMPOS_CATEGORICOS))
+
+    @property
+    def consolidado(self):
+        """Si el contacto agrupa varias reservas"""
+        return self.reservas_count > 1
+
+    # ----- Compatibilidad con el diccionario anterior -----
+
+    def a_dict(self):
+        """Diccionario con las mismas claves que tenía el contacto antes"""
+        datos = {campo: getattr(self, campo) for campo in COLUMNAS_CONTACTO}
+        if self.consolidado:
+            datos.update(matriculas=list(self.matriculas), ocupantes_total=self.ocupantes_total,
+                         reservas_count=self.reservas_count, consolidado=True)
+        return datos
+
+    def get(self, campo, defecto=None):
+        """Equivalente a dict.get sobre a_dict()"""
+        if campo in COLUMNAS_CONTACTO:
+            return getattr(self, campo)
+        if self.consolidado and campo in ('matriculas', 'ocupantes_total', 'reservas_count', 'consolidado'):
+            return getattr(self, campo)
+        return defecto
+
+    def __getitem__(self, campo):
+        valor = self.get(campo, KeyError)
+        if valor is KeyError:
+            raise KeyError(campo)
+        return valor
+
+    def __eq__(self, otro):
+        if not isinstance(otro, Contacto):
+            return NotImplemented
+        return all(getattr(self, campo) == getattr(otro, campo) for campo in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        extra = f", {self.reservas_count} reservas" if self.consolidado else ""
+        return f"Contacto({self.nombre!r}, {self.telefono!r}{extra})"
+
+    # ----- Textos para la vista previa y los mensajes -----
+
+    def nombre_vista(self):
+        """Nombre con el indicador de consolidación"""
+        if self.consolidado:
+            return f"{self.nombre} (🔗 {self.reservas_count} reservas)"
+        return self.nombre
+
+    def resumen_matriculas(self, maximo=MAX_MATRICULAS_VISTA):
+        """Matrículas para la vista previa: las primeras y cuántas más hay"""
+        if not self.consolidado:
+            return self.matricula
+        resumen = ', '.join(self.matriculas[:maximo])
+        if len(self.matriculas) > maximo:
+            resumen += f" (+{len(self.matriculas) - maximo} más)"
+        return resumen
+
+    def resumen_ocupantes(self):
+        """Ocupantes para la vista previa"""
+        if self.consolidado:
+            return f"{self.ocupantes_total} total"
+        return self.ocupantes
+
+    def valores_vista(self):
+        """Fila de la tabla de vista previa"""
+        return (self.nombre_vista(), self.telefono, self.resumen_matriculas(), self.texto_hora(),
+                self.tipo_plaza, self.resumen_ocupantes())
+
+    def texto_hora(self):
+        """Hora de entrada para la vista previa y el mensaje (HORA_DESCONOCIDA si no la hay)"""
+        return self.hora_entrada if self.hora_entrada is not None else HORA_DESCONOCIDA
+
+    def texto_matriculas(self):
+        """Matrículas para el mensaje: 'A', 'A y B' o 'A, B y C (3 vehículos)'"""
+        if not self.consolidado or not self.matriculas:
+            return self.matricula
+        matriculas = self.matriculas
+        if len(matriculas) == 1:
+            return matriculas[0]
+        texto = f"{', '.join(matriculas[:-1])} y {matriculas[-1]}"
+        return f"{texto} ({len(matriculas)} vehículos)"
+
+    def texto_ocupantes(self):
+        """Ocupantes para el mensaje"""
+        if self.consolidado:
+            return f"{self.ocupantes_total} personas total"
+        return self.ocupantes
+
+
+def _columna_internada(serie):
+    """Valores de una columna categórica, con una sola copia de cada valor distinto"""
+    codigos, distintos = pd.factorize(serie)
+    # Una posición más al final para el código -1 de los vacíos, que se quedan con su valor original
+    compartidos = np.empty(len(distintos) + 1, dtype=object)
+    compartidos[:-1] = [_internar(valor) for valor in distintos.tolist()]
+    valores = compartidos[codigos]
+    vacios = codigos == -1
+    if vacios.any():
+        valores[vacios] = serie.to_numpy(dtype=object)[vacios]
+    return valores.tolist()
+
+
+def crear_contactos(campos):
+    """
+    Crear los contactos de todas las filas de un DataFrame de campos.
+
+    Args:
+        campos (DataFrame): Campos de contacto con las columnas de COLUMNAS_CONTACTO
+
+    Returns:
+        list: Un Contacto por fila, en el mismo orden
+    """
+    columnas = [_columna_internada(campos[campo]) if campo in CAMPOS_CATEGORICOS else campos[campo].tolist()
+                for campo in COLUMNAS_CONTACTO]
+    return list(map(Contacto, *columnas))
+
+
+class IndiceContactos:
+    """
+    Índices de una lista de contactos para la vista previa paginada.
+
+    Filtrar, ordenar y buscar devuelve posiciones de la lista (array numpy),
+    así la tabla solo construye las filas de la ventana visible. Cada índice
+    (máscaras de consolidados y extranjeros, posiciones por hora, orden por
+    columna, textos de búsqueda) se calcula la primera vez que se usa y se
+    reutiliza en los siguientes filtros.
+
+    Attributes:
+        contactos: Lista de Contacto indexada (no se copia)
+    """
+
+    def __init__(self, contactos):
+        self.contactos = contactos
+        self._mascaras = {}
+        self._por_hora = None
+        self._rangos = {}
+        self._ordenes = {}
+        self._busqueda = None
+
+    def __len__(self):
+        return len(self.contactos)
+
+    def _mascara(self, nombre):
+        """Máscara booleana 'consolidados' o 'extranjeros'"""
+        if nombre not in self._mascaras:
+            if nombre == 'consolidados':
+                valores = [c.reservas_count > 1 for c in self.contactos]
+            else:
+                valores = analizar_telefonos([c.telefono for c in self.contactos])['pais'] == "Extranjero"
+            self._mascaras[nombre] = np.array(valores, dtype=bool)
+        return self._mascaras[nombre]
+
+    def horas(self):
+        """Horas de entrada distintas, ordenadas"""
+        return sorted(self._posiciones_por_hora())
+
+    def _posiciones_por_hora(self):
+        if self._por_hora is None:
+            codigos, horas = pd.factorize(pd.Series([c.texto_hora() for c in self.contactos], dtype=object))
+            orden = np.argsort(codigos, kind='stable')
+            limites = np.searchsorted(codigos[orden], np.arange(len(horas) + 1))
+            self._por_hora = {hora: orden[limites[i]:limites[i + 1]]
+                              for i, hora in enumerate(horas.tolist())}
+        return self._por_hora
+
+    def _orden(self, columna, descendente=False):
+        """
+        Posiciones ordenadas por el texto mostrado en una columna de la vista.
+
+        En los dos sentidos los empates quedan en el orden del archivo: el
+        descendente ordena de forma estable los rangos cambiados de signo.
+        """
+        if (columna, descendente) not in self._ordenes:
+            if columna not in self._rangos:
+                indice = COLUMNAS_VISTA.index(columna)
+                valores = np.array([str(c.valores_vista()[indice]).casefold() for c in self.contactos], dtype=object)
+                self._rangos[columna] = pd.factorize(valores, sort=True)[0]
+            rangos = self._rangos[columna]
+            self._ordenes[(columna, descendente)] = np.argsort(-rangos if descendente else rangos, kind='stable')
+        return self._ordenes[(columna, descendente)]
+
+    def _textos_busqueda(self):
+        if self._busqueda is None:
+            self._busqueda = [f"{c.nombre}\t{c.telefono}\t{c.matricula}".casefold() for c in self.contactos]
+        return self._busqueda
+
+    def filtrar(self, consolidados=False, extranjeros=False, hora=None, texto="", orden=None, descendente=False):
+        """
+        Posiciones de los contactos que cumplen los filtros, en el orden pedido.
+
+        Args:
+            consolidados (bool): Solo contactos con varias reservas
+            extranjeros (bool): Solo teléfonos extranjeros
+            hora (str): Solo contactos con esta hora de entrada (None = todas)
+            texto (str): Texto a buscar en nombre, teléfono o matrícula
+            orden (str): Columna de COLUMNAS_VISTA por la que ordenar (None = orden del archivo)
+            descendente (bool): Invertir el orden
+
+        Returns:
+            ndarray: Posiciones en self.contactos
+        """
+        total = len(self.contactos)
+        seleccion = np.ones(total, dtype=bool)
+        if consolidados:
+            seleccion &= self._mascara('consolidados')
+        if extranjeros:
+            seleccion &= self._mascara('extranjeros')
+        if hora is not None:
+            por_hora = np.zeros(total, dtype=bool)
+            por_hora[self._posiciones_por_hora().get(hora, [])] = True
+            seleccion &= por_hora
+        texto = texto.strip().casefold()
+        if texto:
+            textos = self._textos_busqueda()
+            candidatos = np.flatnonzero(seleccion).tolist()
+            seleccion = np.zeros(total, dtype=bool)
+            seleccion[[i for i in candidatos if texto in textos[i]]] = True
+
+        if orden is not None:
+            posiciones = self._orden(orden, descendente)
+        else:
+            posiciones = np.arange(total)[::-1] if descendente else np.arange(total)
+        return posiciones[seleccion[posiciones]]
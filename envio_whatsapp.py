@@ -0,0 +1,932 @@
+# 📤 Envío por WhatsApp Web
+# Motor de envío con Selenium, sin interfaz: abre Chrome con el perfil de cada
+# cuenta, conecta WhatsApp Web y envía los mensajes de la bandeja de salida
+# respetando el programador de envíos y la cola por hora de llegada. Lo usan
+# la ventana (en su hilo de envío) y la línea de comandos.
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bandeja_salida import BandejaSalida, preparar_entradas, url_chat_en_app, BANDEJA_SALIDA_FILE, ENVIADO, ERROR
+from cola_envio import ColaEnvio
+from navegador_persistente import (MANTENER_NAVEGADOR_ABIERTO, puerto_depuracion, navegador_abierto,
+                                   esperar_cierre_navegador, ruta_chromedriver, soltar_navegador,
+                                   cerrar_navegador)
+from errores import ChromeInitializationError, WhatsAppConnectionError
+from programador_envio import PoliticaEnvio, ProgramadorEnvio, DEFAULT_DELAY_MIN, DEFAULT_DELAY_MAX
+from reparto_cuentas import perfiles_cuentas, repartir_entradas, MAX_CUENTAS_WHATSAPP
+from supervisor_navegador import SupervisorNavegador, RECICLAR_NAVEGADOR_CADA
+
+# Constantes para gestión de progreso y sesión
+PROGRESO_FILE = "progreso.json"
+SESSION_DIR = os.path.join(os.getcwd(), "whatsapp_session")
+
+# Mensajes fuera de plazo que se listan en el log
+MAX_AVISOS_FUERA_DE_PLAZO = 10
+
+URL_WHATSAPP_WEB = "https://web.whatsapp.com"
+
+# Constantes de tiempo (en segundos)
+TIMEOUT_WHATSAPP_CONNECTION = 30
+TIMEOUT_QR_SCAN = 120
+TIMEOUT_FIELD_SEARCH = 15
+TIMEOUT_FIRST_CONTACT = 15
+TIMEOUT_BETWEEN_MESSAGES_MAX = 25
+TIMEOUT_WHATSAPP_READY = 10  # Máximo tras conectar hasta que la lista de chats está cargada
+TIMEOUT_MESSAGE_SENT = 10  # Máximo tras pulsar Enter hasta que el mensaje sale del campo de texto
+
+# Esperas por condición: se sigue en cuanto la página está lista y los tiempos anteriores
+# (primer contacto, entre mensajes, búsqueda del campo) quedan solo como máximo
+INTERVALO_SONDEO_ESPERAS = 0.25
+XPATH_CAMPO_MENSAJE = '//div[@contenteditable="true"][@data-tab="10"]'
+XPATH_LISTA_CHATS_CARGADA = '//div[@id="pane-side"]//div[@role="listitem" or @role="row"]'
+# Ventana emergente con botón (p. ej. "número no válido"); la de "Iniciando chat" no lleva botón
+XPATH_POPUP_ERROR = '//div[@data-animate-modal-popup="true"][.//button or .//div[@role="button"]]'
+XPATH_MENSAJE_PENDIENTE = '//span[@data-icon="msg-time"]'
+
+# Apertura de chats sin recargar WhatsApp Web: se pulsa un enlace de envío dentro de la página
+ABRIR_CHATS_EN_APP = True
+# Máximo para que el chat se abra dentro de la página; si no se abre, ese contacto y los
+# siguientes del envío van por la URL directa (recargando la página)
+TIMEOUT_CHAT_EN_APP = 3
+SCRIPT_MARCAR_PAGINA = "window.__sesionGoBarajas = arguments[0];"
+SCRIPT_SESION_PAGINA = "return window.__sesionGoBarajas || null;"
+SCRIPT_ABRIR_CHAT_EN_APP = """
+const enlace = document.createElement('a');
+enlace.href = arguments[0];
+enlace.style.display = 'none';
+document.body.appendChild(enlace);
+enlace.click();
+enlace.remove();
+"""
+
+
+def _sin_log(*args, **kwargs):
+    pass
+
+
+# Cada cuenta guarda el progreso desde su hilo: se escribe de uno en uno
+_bloqueo_progreso = threading.Lock()
+
+
+def guardar_progreso(bandeja):
+    """
+    Guardar en PROGRESO_FILE cuántos mensajes de la bandeja tienen ya resultado.
+
+    Se cuenta dentro del bloqueo, así el archivo nunca vuelve a un número
+    menor aunque varias cuentas terminen un mensaje a la vez.
+
+    Args:
+        bandeja (BandejaSalida): Bandeja del envío en curso
+    """
+    with _bloqueo_progreso:
+        with open(PROGRESO_FILE, "w") as f:
+            json.dump({"procesados": len(bandeja.resultados), "total": len(bandeja),
+                       "fecha": datetime.now().isoformat()}, f)
+
+
+def borrar_progreso():
+    """
+    Borrar el archivo de progreso y la bandeja de salida.
+
+    Returns:
+        bool: True si había un progreso guardado
+    """
+    if os.path.exists(BANDEJA_SALIDA_FILE):
+        os.remove(BANDEJA_SALIDA_FILE)
+    if os.path.exists(PROGRESO_FILE):
+        os.remove(PROGRESO_FILE)
+        return True
+    return False
+
+
+class EnvioWhatsApp:
+    """
+    Envío de una bandeja de salida por WhatsApp Web.
+
+    Toda la configuración se fija al crearlo; enviar() bloquea hasta el final
+    y detener() (desde otro hilo) lo corta antes del siguiente mensaje.
+
+    Attributes:
+        log: log(mensaje, nivel="INFO", *args), como log_message de la ventana
+        politica: PoliticaEnvio de cada cuenta
+        antelacion_horas: Horas antes de la entrada en que sale cada mensaje (0 = sin esperar)
+        num_cuentas: Cuentas de WhatsApp que envían a la vez
+        directorio_sesion: Perfil de Chrome de la primera cuenta
+        bandeja: Bandeja del envío (la preparada o la que se reanuda)
+        persistente: Dejar Chrome abierto al terminar y usar el que quedó abierto
+            de un envío anterior (ver navegador_persistente)
+        reciclar_cada: Mensajes de cada cuenta tras los que se reinicia Chrome (0 = nunca)
+        activo: Si el envío sigue en marcha
+        progreso_cuentas: Estado y contadores de cada cuenta
+    """
+
+    def __init__(self, log=_sin_log, politica=None, antelacion_horas=0, num_cuentas=1,
+                 directorio_sesion=SESSION_DIR, bandeja=None, persistente=MANTENER_NAVEGADOR_ABIERTO,
+                 reciclar_cada=RECICLAR_NAVEGADOR_CADA):
+        self.log = log
+        self.politica = politica or PoliticaEnvio.desde_delays(DEFAULT_DELAY_MIN, DEFAULT_DELAY_MAX)
+        self.antelacion_horas = antelacion_horas
+        self.num_cuentas = num_cuentas
+        self.directorio_sesion = directorio_sesion
+        self.bandeja = bandeja
+        self.persistente = persistente
+        self.reciclar_cada = reciclar_cada
+        self.activo = False
+        self.progreso_cuentas = {}
+
+        # Navegación entre chats sin recargar la página (ver _abrir_chat_en_app); cada
+        # cuenta del envío tiene su hilo y su navegador, así que el estado es por hilo
+        self._navegacion = threading.local()
+
+    def detener(self):
+        """Detener el envío (la cuenta termina el mensaje en curso)"""
+        self.activo = False
+
+    def _guardar_progreso(self, bandeja):
+        try:
+            guardar_progreso(bandeja)
+        except Exception as e:
+            self.log(f"⚠️ Error guardando progreso: {str(e)}")
+
+    def preparar_bandeja(self, plantilla, contactos, origen):
+        """
+        Preparar todos los mensajes del envío y guardarlos en la bandeja de salida.
+
+        Args:
+            plantilla (PlantillaCompilada): Plantilla compilada
+            contactos (list): Contactos a enviar
+            origen (dict): Archivo y nombre de plantilla para la cabecera de la bandeja
+
+        Returns:
+            BandejaSalida: Bandeja nueva, o None si no se pudo guardar
+        """
+        mensajes = plantilla.render_todos(contactos)
+        for posicion, error in plantilla.errores.items():
+            self.log(f"⚠️ No se pudo preparar el mensaje de {contactos[posicion].nombre}: {error}",
+                     "WARNING")
+
+        try:
+            bandeja = BandejaSalida.crear(BANDEJA_SALIDA_FILE, preparar_entradas(contactos, mensajes), **origen)
+        except OSError as e:
+            self.log(f"❌ No se pudo guardar la bandeja de salida: {str(e)}")
+            return None
+        self.log(f"📬 {len(bandeja)} mensajes preparados en {BANDEJA_SALIDA_FILE} "
+                 f"(variables: {', '.join(plantilla.variables) or 'ninguna'}, {plantilla.emojis} emojis)")
+        return bandeja
+
+    def _hilo_preparacion(self, preparar, resultado):
+        """Preparar la bandeja en segundo plano y dejarla en resultado['bandeja']"""
+        try:
+            resultado["bandeja"] = preparar()
+        except Exception as e:
+            self.log(f"❌ Error preparando los mensajes: {str(e)}")
+        finally:
+            resultado["duracion"] = time.monotonic() - resultado["inicio"]
+
+    def enviar(self, preparar=None):
+        """
+        Envío completo con Selenium (bloquea hasta terminar o detener()).
+
+        Esta función ejecuta el proceso completo de envío de mensajes:
+        1. Inicializa Chrome con configuración robusta
+        2. Conecta a WhatsApp Web
+        3. Procesa todos los contactos y envía mensajes
+        4. Maneja errores y actualiza progreso
+
+        Mientras se hacen los pasos 1 y 2, otro hilo prepara la bandeja de
+        salida (espera al análisis si sigue en curso y rellena la plantilla);
+        el primer mensaje sale en cuanto las dos cosas están listas.
+
+        Con varias cuentas, los pasos 1 a 3 se hacen en un hilo por cuenta
+        (_hilo_cuenta), cada uno con su perfil de Chrome y su parte de los
+        contactos, y todas registran sus resultados en la misma bandeja.
+
+        Los errores se registran en el log: si una cuenta no se conecta, sus
+        contactos quedan pendientes en la bandeja para reanudar.
+
+        Args:
+            preparar (callable): Devuelve la bandeja del envío (p. ej. con preparar_bandeja);
+                None al reanudar desde self.bandeja
+
+        Returns:
+            BandejaSalida: Bandeja con los resultados, o None si no se llegó a preparar
+        """
+        self.activo = True
+        self.progreso_cuentas = {}
+        bandeja = self.bandeja
+        try:
+            # Los mensajes se preparan en otro hilo mientras se abre Chrome y se conecta WhatsApp Web
+            resultado = {"bandeja": self.bandeja, "inicio": time.monotonic()}
+            hilo_preparacion = None
+            if preparar is not None:
+                hilo_preparacion = threading.Thread(target=self._hilo_preparacion, args=(preparar, resultado),
+                                                    daemon=True)
+                hilo_preparacion.start()
+
+            self._log_inicio_envio()
+            perfiles = perfiles_cuentas(self.num_cuentas, self.directorio_sesion)
+            if len(perfiles) == 1:
+                self._hilo_cuenta(perfiles[0], perfiles, hilo_preparacion, resultado)
+            else:
+                # Una cuenta por hilo, cada una con su Chrome y su perfil
+                self.log(f"👥 Envío con {len(perfiles)} cuentas de WhatsApp")
+                hilos = [threading.Thread(target=self._hilo_cuenta, name=perfil.nombre, daemon=True,
+                                          args=(perfil, perfiles, hilo_preparacion, resultado))
+                         for perfil in perfiles]
+                for hilo in hilos:
+                    hilo.start()
+                for hilo in hilos:
+                    hilo.join()
+
+            bandeja = resultado["bandeja"]
+            if bandeja is not None:
+                self.log(f"✅ Envío completado: {bandeja.contar(ENVIADO)} mensajes enviados, "
+                         f"{bandeja.contar(ERROR)} errores, {len(bandeja.pendientes())} pendientes")
+
+        except Exception as e:
+            self.log(f"❌ Error en el envío: {str(e)}")
+        finally:
+            self.activo = False
+        return bandeja
+
+    def _hilo_cuenta(self, perfil, perfiles, hilo_preparacion, resultado):
+        """
+        Envío de una cuenta: abrir su Chrome, conectar WhatsApp Web y enviar su parte.
+
+        Args:
+            perfil (PerfilCuenta): Cuenta de este hilo
+            perfiles (list): Todas las cuentas del envío (para el reparto)
+            hilo_preparacion (Thread): Hilo que prepara la bandeja, o None si ya está lista
+            resultado (dict): Bandeja preparada y tiempos, compartido entre las cuentas
+        """
+        from selenium.common.exceptions import TimeoutException
+
+        multicuenta = len(perfiles) > 1
+        self._navegacion.etiqueta = f"[{perfil.nombre}] " if multicuenta else ""
+        progreso = self.progreso_cuentas[perfil.nombre] = {"estado": "conectando", "enviados": 0,
+                                                              "errores": 0, "total": 0}
+        driver = None
+        supervisor = None
+        try:
+            driver = self._abrir_navegador(perfil)
+            self._conectar_whatsapp(driver)
+            duracion_navegador = time.monotonic() - resultado["inicio"]
+
+            if hilo_preparacion is not None:
+                if hilo_preparacion.is_alive():
+                    self.log("⏳ WhatsApp Web listo, esperando a que terminen de prepararse los mensajes...")
+                hilo_preparacion.join()
+                self.log(f"⏱️ {self._navegacion.etiqueta}WhatsApp Web listo en {duracion_navegador:.1f}s, "
+                         f"mensajes listos en {resultado['duracion']:.1f}s")
+            self.bandeja = bandeja = resultado["bandeja"]
+            if bandeja is None:
+                self.log("❌ No hay mensajes preparados para enviar")
+                progreso["estado"] = "sin mensajes"
+                return
+
+            # Reparto por hash consistente del teléfono: cada cuenta envía solo su parte
+            entradas = bandeja.pendientes()
+            if multicuenta:
+                entradas = repartir_entradas(entradas, perfiles)[perfil.nombre]
+                self.log(f"👥 {perfil.nombre}: {len(entradas)} contactos")
+            progreso.update(estado="enviando", total=len(entradas))
+
+            # Durante el envío Chrome lo vigila el supervisor: si deja de responder o toca
+            # reciclarlo, se abre otro con el mismo perfil y se sigue con los pendientes
+            supervisor = SupervisorNavegador(driver, lambda: self._reabrir_navegador(perfil),
+                                             lambda caido: self._cerrar_navegador_caido(caido, perfil),
+                                             self._navegador_responde, self._log_cuenta, self.reciclar_cada)
+            self._procesar_contactos(supervisor, entradas, progreso)
+            progreso["estado"] = "terminada" if supervisor.driver is not None else "error"
+
+        except TimeoutException:
+            progreso["estado"] = "sin conexión"
+            self.log(f"⏰ {self._navegacion.etiqueta}Tiempo de espera agotado. No se pudo conectar a WhatsApp Web")
+        except Exception as e:
+            progreso["estado"] = "error"
+            self.log(f"❌ {self._navegacion.etiqueta}Error en el envío: {str(e)}")
+        finally:
+            if progreso["estado"] in ("sin conexión", "error") and multicuenta:
+                self.log(f"⚠️ Los contactos de {perfil.nombre} quedan pendientes en la bandeja para reanudar")
+            if supervisor is not None:
+                driver = supervisor.driver
+            if driver:
+                self._terminar_navegador(driver, progreso["estado"])
+
+    def abrir_navegadores(self):
+        """
+        Dejar abierto el Chrome de cada cuenta con WhatsApp Web conectado, sin enviar nada.
+
+        Sirve para tener la sesión lista antes del envío (p. ej. escanear el QR
+        al empezar el día); si Chrome ya está abierto solo se comprueba.
+
+        Returns:
+            int: Cuentas con WhatsApp Web conectado
+        """
+        from selenium.common.exceptions import TimeoutException
+
+        conectadas = 0
+        for perfil in perfiles_cuentas(self.num_cuentas, self.directorio_sesion):
+            self._navegacion.etiqueta = f"[{perfil.nombre}] "
+            driver = None
+            estado = "error"
+            try:
+                driver = self._abrir_navegador(perfil)
+                self._conectar_whatsapp(driver)
+                estado = "conectada"
+                conectadas += 1
+            except TimeoutException:
+                estado = "sin conexión"
+                self.log(f"⏰ [{perfil.nombre}] Tiempo de espera agotado. No se pudo conectar a WhatsApp Web")
+            except Exception as e:
+                self.log(f"❌ [{perfil.nombre}] Error abriendo el navegador: {str(e)}")
+            finally:
+                if driver:
+                    self._terminar_navegador(driver, estado)
+        return conectadas
+
+    def navegadores_abiertos(self):
+        """Cuentas (PerfilCuenta, puerto) con Chrome abierto de un envío anterior"""
+        return [(perfil, puerto_depuracion(perfil))
+                for perfil in perfiles_cuentas(MAX_CUENTAS_WHATSAPP, self.directorio_sesion)
+                if navegador_abierto(puerto_depuracion(perfil))]
+
+    def cerrar_navegadores(self):
+        """
+        Cerrar el Chrome que quedó abierto de cada cuenta.
+
+        Returns:
+            int: Navegadores cerrados
+        """
+        cerrados = 0
+        for perfil, puerto in self.navegadores_abiertos():
+            try:
+                cerrar_navegador(self._adjuntar_chrome(puerto))
+                self.log(f"🌐 Chrome de {perfil.nombre} cerrado")
+                cerrados += 1
+            except Exception as e:
+                self.log(f"⚠️ No se pudo cerrar el Chrome de {perfil.nombre}: {str(e)}")
+        return cerrados
+
+    def _abrir_navegador(self, perfil, adjuntar=True):
+        """
+        Chrome de una cuenta: el que quedó abierto de un envío anterior o uno nuevo.
+
+        Con persistente, el Chrome nuevo se abre con el puerto de depuración de
+        la cuenta para que el siguiente envío se conecte a él.
+
+        Args:
+            perfil (PerfilCuenta): Cuenta
+            adjuntar (bool): Conectarse al Chrome que escucha en el puerto, si lo hay;
+                con False se abre siempre uno nuevo
+        """
+        self._navegacion.persistente = False
+        if not self.persistente:
+            return self._inicializar_chrome(perfil.directorio)
+
+        puerto = puerto_depuracion(perfil)
+        self._navegacion.persistente = True
+        if adjuntar and navegador_abierto(puerto):
+            try:
+                driver = self._adjuntar_chrome(puerto)
+                self.log(f"♻️ {self._navegacion.etiqueta}Usando el Chrome que quedó abierto (puerto {puerto})")
+                return driver
+            except Exception as e:
+                self.log(f"⚠️ No se pudo usar el Chrome abierto en el puerto {puerto}: {str(e)}")
+        return self._inicializar_chrome(perfil.directorio, puerto)
+
+    def _adjuntar_chrome(self, puerto):
+        """Conectar Selenium al Chrome abierto en un puerto de depuración"""
+        from selenium.webdriver.chrome.options import Options
+
+        opciones = Options()
+        opciones.add_experimental_option("debuggerAddress", f"127.0.0.1:{puerto}")
+        return self._crear_driver(opciones)
+
+    def _reabrir_navegador(self, perfil):
+        """Chrome nuevo de una cuenta con WhatsApp Web conectado, tras un reinicio del supervisor"""
+        # Si el Chrome anterior no soltó el puerto no se vuelve a conectar a él
+        adjuntar = not getattr(self._navegacion, "puerto_ocupado", False)
+        self._navegacion.puerto_ocupado = False
+        driver = self._abrir_navegador(perfil, adjuntar)
+        try:
+            self._conectar_whatsapp(driver)
+        except Exception:
+            self._cerrar_navegador_caido(driver, perfil)
+            raise
+        self._marcar_pagina(driver)
+        return driver
+
+    def _cerrar_navegador_caido(self, driver, perfil):
+        """
+        Cerrar del todo un Chrome que no responde o se recicla (también si se conectó por puerto).
+
+        Primero se pide a Chrome que se cierre (CDP Browser.close) y después se
+        termina la sesión de Selenium: tras quit() ya no hay conexión para
+        pedírselo y un Chrome conectado por puerto seguiría abierto. Con puerto
+        se espera a que lo deje libre; si no lo hace, el siguiente Chrome se
+        abre nuevo en lugar de conectarse otra vez al que no responde.
+        """
+        try:
+            driver.execute_cdp_cmd("Browser.close", {})
+        except Exception:
+            pass
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        if getattr(self._navegacion, "persistente", False):
+            puerto = puerto_depuracion(perfil)
+            if not esperar_cierre_navegador(puerto):
+                self._navegacion.puerto_ocupado = True
+                self.log(f"⚠️ {self._navegacion.etiqueta}Chrome sigue escuchando en el puerto {puerto} "
+                         f"tras cerrarlo: se abrirá uno nuevo")
+
+    @staticmethod
+    def _navegador_responde(driver):
+        """Comprobación del supervisor: Chrome sigue abierto y ejecuta scripts en la página"""
+        try:
+            driver.execute_script("return 1")
+            return bool(driver.window_handles)
+        except Exception:
+            return False
+
+    def _log_cuenta(self, mensaje):
+        """Log con la etiqueta de la cuenta tras el icono (para el supervisor)"""
+        icono, _, texto = mensaje.partition(" ")
+        self.log(f"{icono} {self._navegacion.etiqueta}{texto}")
+
+    def _terminar_navegador(self, driver, estado):
+        """Dejar Chrome abierto para el siguiente envío (persistente) o cerrarlo"""
+        if getattr(self._navegacion, "persistente", False) and estado != "error":
+            soltar_navegador(driver)
+            self.log(f"🌐 {self._navegacion.etiqueta}Chrome queda abierto para el siguiente envío")
+        else:
+            driver.quit()
+
+    def _log_inicio_envio(self):
+        """Registrar mensajes de inicio del envío"""
+        self.log("🚀 Iniciando envío automático con send_keys() y Keys.ENTER...")
+        self.log("ℹ️ Usando método natural de Selenium: send_keys() para escribir y Keys.ENTER para enviar")
+        self.log("ℹ️ Soporte completo para Unicode, emojis y caracteres especiales")
+        self.log("ℹ️ Emojis preservados automáticamente en todas las plantillas")
+        self.log("ℹ️ Detectando envío automático de WhatsApp Web para evitar escritura duplicada")
+        self.log("📱 Configurando Chrome...")
+
+    def _crear_driver(self, opciones):
+        """
+        Iniciar ChromeDriver con la ruta guardada de envíos anteriores.
+
+        Si no hay ruta guardada se busca con webdriver-manager; si la guardada
+        falla (p. ej. Chrome se actualizó) se busca de nuevo una vez.
+        """
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+
+        ruta, guardada = ruta_chromedriver()
+        try:
+            return webdriver.Chrome(service=Service(ruta), options=opciones)
+        except Exception as e:
+            if not guardada:
+                raise
+            self.log(f"⚠️ El ChromeDriver guardado falló, se busca de nuevo: {str(e)}")
+            ruta, _ = ruta_chromedriver(renovar=True)
+            return webdriver.Chrome(service=Service(ruta), options=opciones)
+
+    def _inicializar_chrome(self, directorio_perfil=SESSION_DIR, puerto=None):
+        """
+        Inicializar Chrome con configuración robusta y el perfil (sesión) de una cuenta.
+
+        Con puerto, Chrome se abre con ese puerto de depuración y no se cierra
+        al terminar el proceso (ver navegador_persistente).
+        """
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+
+        # Configurar opciones de Chrome
+        chrome_options = self._configurar_opciones_chrome(directorio_perfil, puerto)
+
+        # Inicializar driver con configuración robusta
+        driver = None
+        try:
+            self.log("🔧 Configurando Chrome...")
+
+            # Método 1: ChromeDriver guardado o, la primera vez, el de webdriver-manager
+            try:
+                driver = self._crear_driver(chrome_options)
+                self.log("✅ Chrome iniciado con webdriver-manager")
+            except Exception as e1:
+                self.log(f"⚠️ webdriver-manager falló: {str(e1)}")
+
+                # Método 2: Usar ChromeDriver directo
+                try:
+                    driver = webdriver.Chrome(options=chrome_options)
+                    self.log("✅ Chrome iniciado directamente")
+                except Exception as e2:
+                    self.log(f"⚠️ Chrome directo falló: {str(e2)}")
+
+                    # Método 3: Usar configuración mínima
+                    try:
+                        chrome_options_minimal = Options()
+                        chrome_options_minimal.add_argument("--no-sandbox")
+                        chrome_options_minimal.add_argument("--disable-dev-shm-usage")
+                        driver = webdriver.Chrome(options=chrome_options_minimal)
+                        # Sin perfil ni puerto: este Chrome se cierra al terminar
+                        self._navegacion.persistente = False
+                        self.log("✅ Chrome iniciado con configuración mínima")
+                    except Exception as e3:
+                        self.log(f"⚠️ Configuración mínima falló: {str(e3)}")
+                        raise ChromeInitializationError("No se pudo inicializar Chrome. Verifica la instalación.")
+
+            if driver:
+                driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+
+        except Exception as e:
+            self.log(f"❌ Error crítico inicializando Chrome: {str(e)}")
+            raise ChromeInitializationError(f"Error inicializando Chrome: {str(e)}")
+
+        return driver
+
+    def _configurar_opciones_chrome(self, directorio_perfil=SESSION_DIR, puerto=None):
+        """Configurar opciones de Chrome con persistencia de sesión (y del navegador, con puerto)"""
+        from selenium.webdriver.chrome.options import Options
+        import os
+
+        chrome_options = Options()
+
+        # Directorio para persistir la sesión de WhatsApp Web
+        user_data_dir = directorio_perfil
+        if not os.path.exists(user_data_dir):
+            os.makedirs(user_data_dir)
+
+        chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
+        chrome_options.add_argument("--start-maximized")
+        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--disable-web-security")
+        chrome_options.add_argument("--allow-running-insecure-content")
+        chrome_options.add_argument("--disable-features=VizDisplayCompositor")
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option('useAutomationExtension', False)
+        chrome_options.add_experimental_option("prefs", {
+            "profile.default_content_setting_values.notifications": 2,
+            "profile.default_content_settings.popups": 0
+        })
+
+        # Navegador persistente: Chrome sigue abierto cuando se para ChromeDriver y el
+        # siguiente envío se conecta a él por el puerto de depuración
+        if puerto is not None:
+            chrome_options.add_argument(f"--remote-debugging-port={puerto}")
+            chrome_options.add_experimental_option("detach", True)
+
+        return chrome_options
+
+    def _conectar_whatsapp(self, driver):
+        """Conectar a WhatsApp Web"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
+        # Chrome que quedó abierto de un envío anterior: WhatsApp Web ya está cargado y conectado
+        if self._whatsapp_ya_conectado(driver):
+            self.log("♻️ WhatsApp Web ya está abierto y conectado: se envía sin recargar la página")
+            return
+
+        self.log("🌐 Abriendo WhatsApp Web...")
+        driver.get(URL_WHATSAPP_WEB)
+
+        # Esperar a que se cargue WhatsApp Web y detectar si ya está conectado
+        self.log("🔍 Verificando estado de conexión...")
+
+        # Esperar a que aparezca el chat list o el código QR
+        wait = WebDriverWait(driver, TIMEOUT_WHATSAPP_CONNECTION)  # 30 segundos para verificar conexión
+
+        try:
+            # Intentar detectar si ya está conectado (chat list visible)
+            wait.until(EC.presence_of_element_located((By.ID, "pane-side")))
+            self.log("✅ WhatsApp Web ya está conectado! (sesión persistente)")
+            self.log("📱 No es necesario escanear el código QR")
+        except:
+            # Si no está conectado, mostrar código QR
+            self.log("📱 Código QR detectado - Escanea con tu teléfono")
+            self.log("⏳ Esperando escaneo del código QR...")
+
+            # Esperar hasta 2 minutos para escanear QR
+            wait_qr = WebDriverWait(driver, TIMEOUT_QR_SCAN)
+            try:
+                wait_qr.until(EC.presence_of_element_located((By.ID, "pane-side")))
+                self.log("✅ WhatsApp Web conectado exitosamente!")
+                self.log("💾 Sesión guardada para futuros usos")
+            except:
+                self.log("❌ Tiempo agotado para escanear código QR")
+                raise WhatsAppConnectionError("No se pudo conectar a WhatsApp Web - Tiempo agotado para escanear QR")
+
+        # Esperar a que la lista de chats esté cargada (como máximo TIMEOUT_WHATSAPP_READY)
+        self.log("⏳ Esperando a que WhatsApp Web esté completamente listo...")
+        try:
+            WebDriverWait(driver, TIMEOUT_WHATSAPP_READY, poll_frequency=INTERVALO_SONDEO_ESPERAS).until(
+                EC.presence_of_element_located((By.XPATH, XPATH_LISTA_CHATS_CARGADA)))
+        except Exception:
+            self.log(f"⚠️ La lista de chats no terminó de cargar en {TIMEOUT_WHATSAPP_READY}s, se continúa")
+        self.log("📤 Iniciando envío automático de mensajes...")
+
+    @staticmethod
+    def _whatsapp_ya_conectado(driver):
+        """Buscar una pestaña con WhatsApp Web conectado (lista de chats visible) y pasar a ella"""
+        from selenium.webdriver.common.by import By
+
+        try:
+            for pestana in driver.window_handles:
+                driver.switch_to.window(pestana)
+                if driver.current_url.startswith(URL_WHATSAPP_WEB):
+                    return bool(driver.find_elements(By.ID, "pane-side"))
+        except Exception:
+            pass
+        return False
+
+    def _procesar_contactos(self, supervisor, entradas, progreso):
+        """
+        Enviar los mensajes de una cuenta.
+
+        Si Chrome deja de responder (en un envío o en las comprobaciones
+        periódicas durante las esperas), el supervisor lo reinicia con el mismo
+        perfil y el envío sigue; el mensaje que estaba saliendo se reintenta una
+        vez. Si no se puede recuperar, los contactos que quedan siguen
+        pendientes en la bandeja para reanudar.
+
+        Args:
+            supervisor (SupervisorNavegador): Navegador de la cuenta, ya conectado
+            entradas (list): Entradas de la bandeja que envía esta cuenta
+            progreso (dict): Contadores de la cuenta (self.progreso_cuentas)
+        """
+        # Ritmo, límites y horas de silencio de la cuenta: se espera antes de cada
+        # mensaje lo justo para cumplirlos (el tiempo del propio envío ya cuenta)
+        programador = ProgramadorEnvio(self.politica)
+
+        # Las esperas (ritmo, límites, antelación) también comprueban el navegador
+        continuar = lambda: self.activo and supervisor.vigilar()
+
+        def avisar_espera(segundos, motivo):
+            reanudar = (datetime.now() + timedelta(seconds=segundos)).strftime("%d/%m %H:%M")
+            texto = {"silencio": "🌙 Horas de silencio", "hora": "⏸️ Límite por hora alcanzado",
+                     "dia": "⏸️ Límite diario alcanzado"}[motivo]
+            self.log(f"{texto} {self._navegacion.etiqueta}- siguiente envío: {reanudar}")
+            progreso["estado"] = f"en espera hasta {reanudar}"
+
+        # Orden por hora de entrada del cliente; con antelación cada mensaje se retiene hasta su hora
+        cola = ColaEnvio(entradas, self.antelacion_horas)
+        self._avisar_fuera_de_plazo(cola)
+
+        def avisar_retenido(liberacion, entrada):
+            self.log(f"📅 {self._navegacion.etiqueta}Siguiente mensaje ({entrada.nombre}, entrada "
+                     f"{datetime.fromisoformat(entrada.llegada):%d/%m %H:%M}) a las {liberacion:%d/%m %H:%M}")
+            progreso["estado"] = f"en espera hasta {liberacion:%d/%m %H:%M}"
+
+        # Contador de mensajes enviados
+        enviados = 0
+        errores = 0
+
+        bandeja = self.bandeja
+        self._navegacion.chats_en_app = ABRIR_CHATS_EN_APP
+        self._navegacion.estadisticas_chats = {"en_app": 0, "recargas": 0}
+        self._marcar_pagina(supervisor.driver)
+        reintento = None
+        reintentados = set()
+        while self.activo:
+            entrada = reintento or cola.siguiente(continuar, avisar_retenido)
+            reintento = None
+            if entrada is None:
+                break
+            i = entrada.indice
+            if entrada.mensaje is not None:
+                if not programador.esperar_turno(continuar, avisar_espera):
+                    break
+                progreso["estado"] = "enviando"
+
+            try:
+                resultado = self._enviar_mensaje_contacto(supervisor.driver, entrada)
+                if not resultado and entrada.mensaje is not None and supervisor.navegador_caido():
+                    raise WhatsAppConnectionError("Chrome no responde")
+                if resultado:
+                    # Solo los mensajes que salieron cuentan para los límites por hora y por día
+                    programador.registrar_envio()
+                    enviados += 1
+                else:
+                    errores += 1
+
+                # Log de progreso
+                self.log(f"    📊 {self._navegacion.etiqueta}Progreso: {enviados} enviados, {errores} errores")
+                progreso.update(enviados=enviados, errores=errores)
+
+                # Guardar progreso (la ventana lo muestra desde la bandeja)
+                bandeja.registrar(i, ENVIADO if resultado else ERROR)
+                self._guardar_progreso(bandeja)
+
+                # Reciclar Chrome cada supervisor.reciclar_cada mensajes enviados
+                if resultado and not supervisor.registrar_envio():
+                    break
+
+            except Exception as e:
+                # Chrome caído: el supervisor abre otro con la sesión guardada y este contacto se reintenta
+                if supervisor.navegador_caido():
+                    self.log(f"⚠️ {self._navegacion.etiqueta}Chrome dejó de responder con {entrada.nombre}: {str(e)}")
+                    progreso["estado"] = "reiniciando navegador"
+                    if not supervisor.reiniciar("no responde"):
+                        break
+                    progreso["estado"] = "enviando"
+                    if i not in reintentados:
+                        reintentados.add(i)
+                        reintento = entrada
+                        continue
+
+                errores += 1
+                progreso.update(errores=errores)
+                self.log(f"❌ Error con {entrada.nombre}: {str(e)}")
+                bandeja.registrar(i, ERROR)
+                self._guardar_progreso(bandeja)
+                continue
+
+        if supervisor.driver is None:
+            self.log(f"⚠️ {self._navegacion.etiqueta}No se pudo recuperar Chrome: "
+                     f"los contactos que quedan siguen pendientes en la bandeja para reanudar")
+
+        self.log(f"✅ {self._navegacion.etiqueta}Envío terminado: {enviados} mensajes enviados, {errores} errores")
+        self.log(f"💬 {self._navegacion.etiqueta}Chats abiertos sin recargar: "
+                 f"{self._navegacion.estadisticas_chats['en_app']}, "
+                 f"con recarga completa: {self._navegacion.estadisticas_chats['recargas']}")
+        if supervisor.reinicios:
+            self.log(f"🔄 {self._navegacion.etiqueta}Chrome reiniciado {supervisor.reinicios} veces durante el envío")
+
+    def _avisar_fuera_de_plazo(self, cola):
+        """Avisar en el log de los mensajes que no saldrán antes de la entrada del cliente al ritmo actual"""
+        fuera = cola.fuera_de_plazo(self.politica.segundos_por_mensaje())
+        if not fuera:
+            return
+        self.log(f"⚠️ {self._navegacion.etiqueta}{len(fuera)} mensajes no saldrán antes de la hora "
+                 f"de entrada al ritmo actual:")
+        for entrada, estimado in fuera[:MAX_AVISOS_FUERA_DE_PLAZO]:
+            self.log(f"    • {entrada.nombre}: entrada {datetime.fromisoformat(entrada.llegada):%d/%m %H:%M}, "
+                     f"envío estimado {estimado:%d/%m %H:%M}")
+        if len(fuera) > MAX_AVISOS_FUERA_DE_PLAZO:
+            self.log(f"    ... y {len(fuera) - MAX_AVISOS_FUERA_DE_PLAZO} más")
+
+    def _enviar_mensaje_contacto(self, driver, entrada):
+        """Enviar el mensaje preparado de una entrada de la bandeja de salida"""
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+        import time
+
+        indice = entrada.indice
+        self.log(f"📤 {self._navegacion.etiqueta}[{indice+1}/{len(self.bandeja)}] Enviando mensaje a {entrada.nombre}")
+
+        # Verificar si es un contacto consolidado
+        if entrada.reservas_count > 1:
+            self.log(f"    🔗 Enviando mensaje consolidado ({entrada.reservas_count} reservas)")
+
+        # Mensaje y URL preparados antes de abrir Chrome (ver _preparar_bandeja)
+        if entrada.mensaje is None:
+            self.log(f"    ❌ Sin mensaje para {entrada.nombre}: la plantilla no se pudo rellenar")
+            return False
+
+        # Abrir el chat dentro de la página ya cargada; si no es posible, con la URL directa
+        inicio = time.monotonic()
+        estado, elemento = self._abrir_chat_en_app(driver, entrada)
+        if estado is None:
+            # Método mejorado: Usar URL directa de WhatsApp y envío automático
+            self.log(f"    🌐 Abriendo chat directo para {entrada.nombre}")
+            driver.get(entrada.url)
+            self._navegacion.estadisticas_chats["recargas"] += 1
+
+            # Esperar a que el campo de texto tenga el mensaje o WhatsApp muestre un error;
+            # los tiempos fijos anteriores (más la búsqueda del campo) son ahora el máximo
+            if indice == 0:
+                self.log("    ⏳ Esperando más tiempo para el primer contacto...")
+                limite = TIMEOUT_FIRST_CONTACT + TIMEOUT_FIELD_SEARCH
+            else:
+                limite = TIMEOUT_BETWEEN_MESSAGES_MAX + TIMEOUT_FIELD_SEARCH
+            inicio = time.monotonic()
+            try:
+                estado, elemento = WebDriverWait(driver, limite, poll_frequency=INTERVALO_SONDEO_ESPERAS,
+                                                 ignored_exceptions=(StaleElementReferenceException,)
+                                                 ).until(self._estado_chat)
+            except TimeoutException:
+                self.log(f"    ❌ No se pudo enviar el mensaje a {entrada.nombre}: "
+                         f"el chat no estuvo listo en {limite}s")
+                return False
+            self._marcar_pagina(driver)
+        if estado == "error":
+            self.log(f"    ❌ WhatsApp Web no abrió el chat de {entrada.nombre}: "
+                     f"{' '.join(elemento.text.split()) or 'ventana de error'}")
+            # La ventana de error queda abierta: el siguiente contacto recarga la página
+            self._navegacion.sesion_pagina = None
+            return False
+        self.log(f"    ⚡ Chat listo en {time.monotonic() - inicio:.1f}s")
+
+        # Enviar y esperar a que el mensaje salga del campo de texto
+        try:
+            elemento.send_keys(Keys.ENTER)
+            WebDriverWait(driver, TIMEOUT_MESSAGE_SENT, poll_frequency=INTERVALO_SONDEO_ESPERAS,
+                          ignored_exceptions=(StaleElementReferenceException,)).until(self._mensaje_salido)
+        except TimeoutException:
+            self.log(f"    ⚠️ Sin confirmación de salida en {TIMEOUT_MESSAGE_SENT}s para {entrada.nombre}")
+        except Exception as e:
+            self.log(f"    ❌ No se pudo enviar el mensaje a {entrada.nombre}: {e}")
+            return False
+        self.log(f"    ✅ Mensaje enviado automáticamente a {entrada.nombre}")
+        return True
+
+    def _marcar_pagina(self, driver):
+        """Marcar la página cargada para detectar después si se ha recargado"""
+        try:
+            self._navegacion.sesion_pagina = f"{id(driver)}-{time.monotonic()}"
+            driver.execute_script(SCRIPT_MARCAR_PAGINA, self._navegacion.sesion_pagina)
+        except Exception:
+            self._navegacion.sesion_pagina = None
+
+    def _abrir_chat_en_app(self, driver, entrada):
+        """
+        Abrir el chat de una entrada sin recargar WhatsApp Web.
+
+        Se pulsa un enlace de envío (api.whatsapp.com/send) creado dentro de la
+        página, que WhatsApp Web abre como un chat más. Solo se intenta si la
+        página sigue siendo la marcada tras la última carga completa y el campo
+        de texto está vacío (así no se confunde con el chat anterior).
+
+        Returns:
+            tuple: Resultado de _estado_chat, o (None, None) si hay que abrir el chat
+                con la URL directa
+        """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+
+        if not self._navegacion.chats_en_app or self._navegacion.sesion_pagina is None:
+            return None, None
+        try:
+            if driver.execute_script(SCRIPT_SESION_PAGINA) != self._navegacion.sesion_pagina:
+                return None, None
+            if any(campo.text.strip() for campo in driver.find_elements(By.XPATH, XPATH_CAMPO_MENSAJE)):
+                return None, None
+
+            self.log(f"    💬 Abriendo chat de {entrada.nombre} sin recargar WhatsApp Web")
+            driver.execute_script(SCRIPT_ABRIR_CHAT_EN_APP, url_chat_en_app(entrada.url))
+            estado, elemento = WebDriverWait(driver, TIMEOUT_CHAT_EN_APP, poll_frequency=INTERVALO_SONDEO_ESPERAS,
+                                             ignored_exceptions=(StaleElementReferenceException,)).until(
+                lambda d: self._estado_chat(d, self._navegacion.sesion_pagina))
+        except TimeoutException:
+            estado, elemento = "sin respuesta", None
+        except StaleElementReferenceException:
+            return None, None
+
+        if estado in ("listo", "error"):
+            self._navegacion.estadisticas_chats["en_app"] += 1
+            return estado, elemento
+
+        # El enlace recargó la página o no abrió el chat: no se vuelve a intentar en este envío
+        self._navegacion.chats_en_app = False
+        self.log(f"    ⚠️ El chat no se abrió dentro de la página ({estado}): se usa la URL directa "
+                 f"en este y en el resto de contactos del envío")
+        return None, None
+
+    @staticmethod
+    def _estado_chat(driver, sesion=None):
+        """
+        Condición de espera del chat abierto por URL o dentro de la página.
+
+        Args:
+            driver: Navegador
+            sesion (str): Marca de la página; si deja de estar, la página se ha recargado
+
+        Returns:
+            tuple: ("listo", campo de texto) cuando el campo tiene el mensaje escrito,
+                ("error", ventana) si WhatsApp muestra un error, ("recargada", None) si
+                la página se recargó, o False si aún carga
+        """
+        from selenium.webdriver.common.by import By
+
+        if sesion is not None and driver.execute_script(SCRIPT_SESION_PAGINA) != sesion:
+            return ("recargada", None)
+        for popup in driver.find_elements(By.XPATH, XPATH_POPUP_ERROR):
+            if popup.is_displayed():
+                return ("error", popup)
+        for campo in driver.find_elements(By.XPATH, XPATH_CAMPO_MENSAJE):
+            if campo.text.strip():
+                return ("listo", campo)
+        return False
+
+    @staticmethod
+    def _mensaje_salido(driver):
+        """Condición de espera: campo de texto vacío y ningún mensaje con el reloj de pendiente"""
+        from selenium.webdriver.common.by import By
+
+        campos = driver.find_elements(By.XPATH, XPATH_CAMPO_MENSAJE)
+        if any(campo.text.strip() for campo in campos):
+            return False
+        return not driver.find_elements(By.XPATH, XPATH_MENSAJE_PENDIENTE)
@@ -0,0 +1,36 @@
+# ⚠️ Errores de la aplicación
+# Excepciones compartidas por la ventana, el análisis, el envío y la línea de comandos.
+
+
+# Clases de excepción específicas
+class WhatsAppSenderError(Exception):
+    """Excepción base para errores del WhatsApp Sender"""
+    pass
+
+class ChromeInitializationError(WhatsAppSenderError):
+    """Error al inicializar Chrome"""
+    pass
+
+class WhatsAppConnectionError(WhatsAppSenderError):
+    """Error al conectar con WhatsApp Web"""
+    pass
+
+class MessageSendError(WhatsAppSenderError):
+    """Error al enviar mensaje"""
+    pass
+
+class FileProcessingError(WhatsAppSenderError):
+    """Error al procesar archivo Excel"""
+    pass
+
+class AnalysisCancelledError(WhatsAppSenderError):
+    """Análisis del archivo Excel cancelado por el usuario"""
+    pass
+
+class TemplateError(WhatsAppSenderError):
+    """Error en plantilla de mensaje"""
+    pass
+
+class ElementNotFoundError(WhatsAppSenderError):
+    """Error al encontrar elemento en WhatsApp Web"""
+    pass
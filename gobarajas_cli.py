@@ -0,0 +1,299 @@
+# 💻 Línea de comandos
+# Análisis, vista de mensajes y envío sin ventana (p. ej. desde cron en un
+# equipo sin pantalla). Usa los mismos módulos que la ventana y no importa Tk;
+# el log sale por la salida estándar.
+#
+# Uso:
+#   python gobarajas_cli.py analyze --file reservas.xlsx
+#   python gobarajas_cli.py render --file reservas.xlsx --template RecordatorioCita
+#   python gobarajas_cli.py send --file reservas.xlsx --template RecordatorioCita
+#   python gobarajas_cli.py navegador iniciar|estado|detener
+
+import argparse
+import sys
+import threading
+
+from analisis_contactos import AnalisisExcel
+from bandeja_salida import BandejaSalida, preparar_entradas, BANDEJA_SALIDA_FILE
+from envio_whatsapp import EnvioWhatsApp, borrar_progreso, SESSION_DIR
+from errores import AnalysisCancelledError, FileProcessingError
+from mensajes import PlantillaCompilada
+from navegador_persistente import MANTENER_NAVEGADOR_ABIERTO
+from plantillas_mensajes import DEFAULT_PLANTILLA, obtener_plantilla, listar_plantillas
+from procesamiento_excel import CacheLibrosExcel, cargar_alias_columnas, ALIAS_COLUMNAS_FILE
+from programador_envio import PoliticaEnvio, DEFAULT_DELAY_MIN, DEFAULT_DELAY_MAX
+from registro import RegistroEventos, NIVELES_LOG
+from reparto_cuentas import MAX_CUENTAS_WHATSAPP
+from supervisor_navegador import RECICLAR_NAVEGADOR_CADA
+
+# Códigos de salida
+SALIDA_OK = 0
+SALIDA_ERROR = 1  # Error, archivo sin contactos o plantilla no válida
+SALIDA_PENDIENTES = 2  # El envío terminó con mensajes pendientes (se puede reanudar con --reanudar)
+SALIDA_INTERRUMPIDO = 130  # Ctrl+C
+
+
+class LogConsola:
+    """
+    Log por la salida estándar con el formato del registro de la ventana.
+
+    Se puede llamar desde varios hilos (uno por cuenta en el envío): cada
+    mensaje se formatea y se escribe en cuanto llega.
+    """
+
+    def __init__(self, nivel="INFO", ruta_archivo=None, salida=sys.stdout):
+        self._registro = RegistroEventos(nivel, ruta_archivo)
+        self._salida = salida
+        self._lock = threading.Lock()
+
+    def __call__(self, mensaje, nivel="INFO", *args):
+        if not self._registro.registrar(mensaje, nivel, *args):
+            return
+        with self._lock:
+            self._salida.write(''.join(self._registro.vaciar(None)))
+            self._salida.flush()
+
+    def cerrar(self):
+        with self._lock:
+            self._registro.vaciar(None)
+            self._registro.cerrar()
+
+
+def _analisis(args, log):
+    """Análisis del archivo con las opciones de la línea de comandos"""
+    try:
+        alias = cargar_alias_columnas(ALIAS_COLUMNAS_FILE)
+    except Exception as e:
+        log(f"⚠️ Error cargando alias de columnas: {str(e)}")
+        alias = None
+    return AnalisisExcel(args.file, CacheLibrosExcel(alias=alias),
+                         recogidas=args.template == "Recogidas",
+                         numeros_extranjeros=not args.solo_espanoles,
+                         consolidar=not args.sin_consolidar,
+                         log=log)
+
+
+def _plantilla(args, log):
+    """
+    Plantilla compilada: la de --template-file o la predefinida de --template.
+
+    Returns:
+        PlantillaCompilada: La plantilla, o None si no es válida (ya registrado en el log)
+    """
+    try:
+        if args.template_file:
+            with open(args.template_file, "r", encoding="utf-8") as f:
+                texto = f.read()
+        else:
+            texto = obtener_plantilla(args.template)
+        return PlantillaCompilada(texto)
+    except OSError as e:
+        log(f"❌ No se pudo leer la plantilla: {str(e)}")
+    except (KeyError, ValueError, IndexError) as e:
+        log(f"❌ Error en la plantilla: {str(e)}")
+    return None
+
+
+def _contactos(args, log):
+    """Contactos con teléfono válido del archivo, o None si el análisis falla"""
+    try:
+        contactos = _analisis(args, log).obtener_contactos_con_telefono()
+    except (FileProcessingError, AnalysisCancelledError):
+        return None
+    log(f"✅ {len(contactos)} contactos con teléfono válido")
+    return contactos
+
+
+def _preparar_bandeja(envio, args, plantilla, log):
+    """Analizar el archivo y crear la bandeja de un envío nuevo (None si no hay contactos)"""
+    contactos = _contactos(args, log)
+    if not contactos:
+        log("❌ El análisis no terminó con contactos para enviar")
+        return None
+    return envio.preparar_bandeja(plantilla, contactos,
+                                  {"archivo": args.file, "plantilla": args.template_file or args.template})
+
+
+def comando_analyze(args, log):
+    """Analizar el archivo y mostrar los contactos (una línea por contacto, separada por tabs)"""
+    contactos = _contactos(args, log)
+    if not contactos:
+        return SALIDA_ERROR
+    for contacto in contactos[:args.limite]:
+        print("\t".join(str(valor) for valor in contacto.valores_vista()))
+    return SALIDA_OK
+
+
+def comando_render(args, log):
+    """Rellenar la plantilla para cada contacto y mostrar los mensajes sin enviarlos"""
+    plantilla = _plantilla(args, log)
+    if plantilla is None:
+        return SALIDA_ERROR
+    contactos = _contactos(args, log)
+    if not contactos:
+        return SALIDA_ERROR
+
+    contactos = contactos[:args.limite]
+    mensajes = plantilla.render_todos(contactos)
+    for posicion, error in plantilla.errores.items():
+        log(f"⚠️ No se pudo preparar el mensaje de {contactos[posicion].nombre}: {error}", "WARNING")
+    for entrada in preparar_entradas(contactos, mensajes):
+        if entrada.mensaje is None:
+            continue
+        print(f"=== {entrada.nombre} ({entrada.telefono})")
+        print(entrada.mensaje)
+        print()
+    return SALIDA_ERROR if plantilla.errores else SALIDA_OK
+
+
+def comando_send(args, log):
+    """
+    Enviar por WhatsApp Web (o reanudar la bandeja pendiente con --reanudar).
+
+    Como en la ventana, el análisis y la preparación de los mensajes se hacen
+    en otro hilo mientras se abre Chrome y se conecta WhatsApp Web.
+    """
+    try:
+        politica = PoliticaEnvio.desde_delays(args.delay_min, args.delay_max, args.max_hora,
+                                              args.max_dia, args.silencio)
+        if args.antelacion < 0:
+            raise ValueError("La antelación no puede ser negativa")
+        if args.reciclar_cada < 0:
+            raise ValueError("--reciclar-cada no puede ser negativo")
+    except ValueError as e:
+        log(f"❌ Configuración de envío no válida: {str(e)}")
+        return SALIDA_ERROR
+
+    bandeja = None
+    if args.reanudar:
+        bandeja = BandejaSalida.cargar(BANDEJA_SALIDA_FILE)
+        if bandeja is None or not bandeja.pendientes():
+            log(f"❌ No hay un envío pendiente en {BANDEJA_SALIDA_FILE}")
+            return SALIDA_ERROR
+        log(f"🔄 Reanudando envío desde la bandeja de salida ({len(bandeja.pendientes())} mensajes pendientes)")
+    else:
+        if not args.file:
+            log("❌ Falta --file (o --reanudar para continuar el envío pendiente)")
+            return SALIDA_ERROR
+        plantilla = _plantilla(args, log)
+        if plantilla is None:
+            return SALIDA_ERROR
+        log("🚀 Iniciando nuevo envío")
+
+    envio = EnvioWhatsApp(log, politica, args.antelacion, args.cuentas, SESSION_DIR, bandeja,
+                          MANTENER_NAVEGADOR_ABIERTO and not args.cerrar_navegador, args.reciclar_cada)
+    preparar = (lambda: _preparar_bandeja(envio, args, plantilla, log)) if bandeja is None else None
+
+    try:
+        bandeja = envio.enviar(preparar)
+    except KeyboardInterrupt:
+        envio.detener()
+        log("⏹️ Envío interrumpido: los mensajes pendientes se pueden reanudar con --reanudar")
+        return SALIDA_INTERRUMPIDO
+
+    if bandeja is None:
+        return SALIDA_ERROR
+    if bandeja.pendientes():
+        return SALIDA_PENDIENTES
+    borrar_progreso()
+    return SALIDA_OK
+
+
+def comando_navegador(args, log):
+    """
+    Gestionar el Chrome que queda abierto entre envíos.
+
+    iniciar abre (o comprueba) el Chrome de cada cuenta con WhatsApp Web
+    conectado y lo deja abierto, estado lista los que hay abiertos y detener
+    los cierra.
+    """
+    envio = EnvioWhatsApp(log, num_cuentas=args.cuentas, persistente=True)
+    if args.accion == "iniciar":
+        conectadas = envio.abrir_navegadores()
+        log(f"🌐 {conectadas} de {args.cuentas} cuentas con WhatsApp Web conectado y Chrome abierto")
+        return SALIDA_OK if conectadas == args.cuentas else SALIDA_ERROR
+    if args.accion == "estado":
+        abiertos = envio.navegadores_abiertos()
+        for perfil, puerto in abiertos:
+            print(f"{perfil.nombre}\t{perfil.directorio}\t{puerto}")
+        log(f"🌐 {len(abiertos)} navegadores abiertos")
+        return SALIDA_OK
+    envio.cerrar_navegadores()
+    return SALIDA_OK
+
+
+def crear_parser():
+    """Parser de argumentos con los subcomandos analyze, render, send y navegador"""
+    registro = argparse.ArgumentParser(add_help=False)
+    registro.add_argument("--nivel-log", default="INFO", choices=list(NIVELES_LOG), help="Nivel mínimo del log")
+    registro.add_argument("--archivo-log", help="Escribir también el log en este archivo (con rotación)")
+
+    comun = argparse.ArgumentParser(add_help=False, parents=[registro])
+    comun.add_argument("--file", help="Archivo Excel de reservas")
+    comun.add_argument("--template", default=DEFAULT_PLANTILLA, choices=listar_plantillas(),
+                       help=f"Plantilla predefinida (por defecto {DEFAULT_PLANTILLA})")
+    comun.add_argument("--template-file", help="Archivo de texto con la plantilla (sustituye a --template)")
+    comun.add_argument("--solo-espanoles", action="store_true", help="Descartar teléfonos extranjeros")
+    comun.add_argument("--sin-consolidar", action="store_true",
+                       help="No agrupar reservas del mismo cliente por día")
+
+    parser = argparse.ArgumentParser(description="WhatsApp Sender sin ventana")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    analyze = subcomandos.add_parser("analyze", parents=[comun], help="Analizar el archivo y listar los contactos")
+    analyze.add_argument("--limite", type=int, help="Contactos a listar (por defecto todos)")
+    analyze.set_defaults(funcion=comando_analyze, requiere_archivo=True)
+
+    render = subcomandos.add_parser("render", parents=[comun], help="Mostrar los mensajes sin enviarlos")
+    render.add_argument("--limite", type=int, help="Mensajes a mostrar (por defecto todos)")
+    render.set_defaults(funcion=comando_render, requiere_archivo=True)
+
+    send = subcomandos.add_parser("send", parents=[comun], help="Enviar los mensajes por WhatsApp Web")
+    send.add_argument("--delay-min", type=int, default=DEFAULT_DELAY_MIN, help="Segundos mínimos entre mensajes")
+    send.add_argument("--delay-max", type=int, default=DEFAULT_DELAY_MAX, help="Segundos máximos entre mensajes")
+    send.add_argument("--max-hora", type=int, default=0, help="Máximo de mensajes por hora (0 = sin límite)")
+    send.add_argument("--max-dia", type=int, default=0, help="Máximo de mensajes por día (0 = sin límite)")
+    send.add_argument("--silencio", default="", help="Horas de silencio 'HH:MM-HH:MM'")
+    send.add_argument("--antelacion", type=int, default=0,
+                      help="Horas antes de la entrada en que sale cada mensaje (0 = sin esperar)")
+    send.add_argument("--cuentas", type=int, default=1, choices=range(1, MAX_CUENTAS_WHATSAPP + 1),
+                      help="Cuentas de WhatsApp que envían a la vez")
+    send.add_argument("--reanudar", action="store_true",
+                      help=f"Continuar el envío pendiente de {BANDEJA_SALIDA_FILE} (sin --file)")
+    send.add_argument("--reciclar-cada", type=int, default=RECICLAR_NAVEGADOR_CADA,
+                      help=f"Reiniciar Chrome cada N mensajes de cada cuenta (0 = nunca, por defecto "
+                           f"{RECICLAR_NAVEGADOR_CADA})")
+    send.add_argument("--cerrar-navegador", action="store_true",
+                      help="Cerrar Chrome al terminar en lugar de dejarlo abierto para el siguiente envío")
+    send.set_defaults(funcion=comando_send, requiere_archivo=False)
+
+    navegador = subcomandos.add_parser("navegador", parents=[registro],
+                                       help="Abrir, consultar o cerrar el Chrome que queda abierto entre envíos")
+    navegador.add_argument("accion", choices=["iniciar", "estado", "detener"])
+    navegador.add_argument("--cuentas", type=int, default=1, choices=range(1, MAX_CUENTAS_WHATSAPP + 1),
+                           help="Cuentas de WhatsApp a iniciar")
+    navegador.set_defaults(funcion=comando_navegador, requiere_archivo=False)
+    return parser
+
+
+def main(argv=None):
+    parser = crear_parser()
+    args = parser.parse_args(argv)
+    if args.requiere_archivo and not args.file:
+        parser.error("falta --file")
+
+    # Emojis del log en consolas sin UTF-8 (p. ej. cmd.exe o cron con LANG=C)
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+    log = LogConsola(args.nivel_log, args.archivo_log)
+    try:
+        return args.funcion(args, log)
+    except KeyboardInterrupt:
+        return SALIDA_INTERRUMPIDO
+    finally:
+        log.cerrar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
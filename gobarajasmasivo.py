@@ -2,14 +2,8 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
 import time
-import pandas as pd
-import random
 import os
 import json
-import subprocess
-import sys
-from datetime import datetime
-from urllib.parse import quote
 
 # Imports de Selenium (se importan cuando se necesitan para evitar errores si no están instalados)
 # from selenium import webdriver
@@ -23,70 +17,43 @@ from urllib.parse import quote
 # from selenium.common.exceptions import TimeoutException, NoSuchElementException
 # from webdriver_manager.chrome import ChromeDriverManager
 
-from plantillas_mensajes import PLANTILLAS_DISPONIBLES, obtener_plantilla, listar_plantillas
-
-# Constantes para gestión de progreso y sesión
-PROGRESO_FILE = "progreso.json"
-SESSION_DIR = os.path.join(os.getcwd(), "whatsapp_session")
+from plantillas_mensajes import PLANTILLAS_DISPONIBLES, DEFAULT_PLANTILLA, obtener_plantilla, listar_plantillas
+from analisis_contactos import AnalisisExcel, TIPOS_PLAZA_EXCLUIDOS, CONSOLIDAR_DUPLICADOS
+from consolidacion import consolidar_reservas
+from contactos import Contacto, IndiceContactos, COLUMNAS_VISTA
+from bandeja_salida import BandejaSalida, BANDEJA_SALIDA_FILE, ENVIADO, ERROR
+from envio_whatsapp import EnvioWhatsApp, borrar_progreso, PROGRESO_FILE, SESSION_DIR
+from errores import AnalysisCancelledError, TemplateError
+from mensajes import PlantillaCompilada, limpiar_caracteres_unicode, contar_emojis
+from navegador_persistente import MANTENER_NAVEGADOR_ABIERTO
+from procesamiento_excel import (CacheLibrosExcel, FILAS_POR_BLOQUE, cargar_alias_columnas, ALIAS_COLUMNAS,
+                                 ALIAS_COLUMNAS_FILE)
+from programador_envio import PoliticaEnvio, DEFAULT_DELAY_MIN, DEFAULT_DELAY_MAX
+from reparto_cuentas import directorios_sesion, MAX_CUENTAS_WHATSAPP
+from registro import RegistroEventos, INTERVALO_VOLCADO_LOG, MAX_LINEAS_WIDGET_LOG
+from telefonos import (es_telefono_valido, determinar_tipo_numero, formatear_telefono_whatsapp,
+                       normalizar_telefono, extraer_telefono_vuelo, extraer_telefonos_vuelo)
 
 # Constantes de configuración
-DEFAULT_DELAY_MIN = 3
-DEFAULT_DELAY_MAX = 5
-DEFAULT_PLANTILLA = "RecordatorioCita"
-
-# Constantes de tiempo (en segundos)
-TIMEOUT_WHATSAPP_CONNECTION = 30
-TIMEOUT_QR_SCAN = 120
-TIMEOUT_FIELD_SEARCH = 15
-TIMEOUT_FIRST_CONTACT = 15
-TIMEOUT_BETWEEN_MESSAGES_MIN = 20
-TIMEOUT_BETWEEN_MESSAGES_MAX = 25
-
-# Constantes de filtros
-TIPOS_PLAZA_EXCLUIDOS = ['PREMIUM', 'SUPERIOR']
-MIN_COLUMNAS_FORMATO_ESPECIAL = 6
-
-# Constantes para consolidación de contactos
-CONSOLIDAR_DUPLICADOS = True  # Habilitar consolidación por defecto
-
-# Constantes de rangos Unicode para emojis
-EMOJI_RANGES = [
-    (0x1F600, 0x1F64F),  # Emoticons
-    (0x1F300, 0x1F5FF),  # Misc Symbols and Pictographs
-    (0x1F680, 0x1F6FF),  # Transport and Map Symbols
-    (0x1F900, 0x1F9FF),  # Supplemental Symbols and Pictographs
-    (0x2600, 0x26FF),    # Miscellaneous Symbols
-    (0x2700, 0x27BF)     # Dingbats
-]
-
-# Clases de excepción específicas
-class WhatsAppSenderError(Exception):
-    """Excepción base para errores del WhatsApp Sender"""
-    pass
-
-class ChromeInitializationError(WhatsAppSenderError):
-    """Error al inicializar Chrome"""
-    pass
+DEFAULT_MAX_POR_HORA = 0  # 0 = sin límite
+DEFAULT_MAX_POR_DIA = 0  # 0 = sin límite
+DEFAULT_HORAS_SILENCIO = ""  # 'HH:MM-HH:MM', vacío = sin horas de silencio
+DEFAULT_ANTELACION_HORAS = 0  # horas antes de la entrada en que sale cada mensaje, 0 = sin esperar
 
-class WhatsAppConnectionError(WhatsAppSenderError):
-    """Error al conectar con WhatsApp Web"""
-    pass
+# Intervalo de refresco del progreso del envío (barra y estado de cada cuenta)
+INTERVALO_PROGRESO_ENVIO = 0.5
 
-class MessageSendError(WhatsAppSenderError):
-    """Error al enviar mensaje"""
-    pass
+# Intervalo mínimo entre refrescos de la vista previa durante el análisis
+INTERVALO_VISTA_PREVIA_PROGRESIVA = 0.5
 
-class FileProcessingError(WhatsAppSenderError):
-    """Error al procesar archivo Excel"""
-    pass
+# Análisis en segundo plano: frecuencia con que la interfaz consulta el progreso
+INTERVALO_PROGRESO_ANALISIS = 0.1
 
-class TemplateError(WhatsAppSenderError):
-    """Error en plantilla de mensaje"""
-    pass
+# Vista previa paginada: filas construidas en la tabla (solo la ventana visible)
+FILAS_VISTA_PREVIA = 15
+FILAS_POR_RUEDA_VISTA_PREVIA = 3
+TODAS_LAS_HORAS = "Todas las horas"
 
-class ElementNotFoundError(WhatsAppSenderError):
-    """Error al encontrar elemento en WhatsApp Web"""
-    pass
 
 class WhatsAppSenderGUIMejorado:
     """
@@ -108,8 +75,8 @@ class WhatsAppSenderGUIMejorado:
         plantilla_actual: Plantilla de mensaje seleccionada
         delay_min/max: Delays para envío de mensajes
         numeros_extranjeros: Configuración para números extranjeros
-        _element_cache: Cache para elementos de WhatsApp Web
-        _log_level: Nivel de logging actual
+        _cache_excel: Cache de archivos Excel ya leídos
+        _registro: Cola de log (nivel actual y archivo con rotación), volcada al widget por lotes
         _log_to_file: Si el logging a archivo está activado
         _log_file: Nombre del archivo de log
     """
@@ -134,22 +101,39 @@ class WhatsAppSenderGUIMejorado:
         self.plantilla_actual = tk.StringVar(value=DEFAULT_PLANTILLA)
         self.delay_min = tk.IntVar(value=DEFAULT_DELAY_MIN)
         self.delay_max = tk.IntVar(value=DEFAULT_DELAY_MAX)
+        self.max_por_hora = tk.IntVar(value=DEFAULT_MAX_POR_HORA)
+        self.max_por_dia = tk.IntVar(value=DEFAULT_MAX_POR_DIA)
+        self.horas_silencio = tk.StringVar(value=DEFAULT_HORAS_SILENCIO)
+        self.antelacion_horas = tk.IntVar(value=DEFAULT_ANTELACION_HORAS)
         self.numeros_extranjeros = tk.BooleanVar(value=True)  # Habilitar por defecto
         self.consolidar_duplicados = tk.BooleanVar(value=CONSOLIDAR_DUPLICADOS)  # Consolidar duplicados por defecto
+        self.mantener_navegador = tk.BooleanVar(value=MANTENER_NAVEGADOR_ABIERTO)  # Chrome abierto entre envíos
         
-        # Cache para elementos de WhatsApp Web
-        self._element_cache = {}
+        # Análisis del Excel en segundo plano
+        self._hilo_analisis = None
+        self._analisis_cancelado = threading.Event()
+        self._progreso_analisis = None  # (filas procesadas, total de filas o None, contactos hasta ahora)
+        self._resultado_analisis = None  # ("ok", contactos), ("cancelado", None) o ("error", excepción)
+        
+        # Envío en curso: bandeja de salida, navegadores y progreso de cada cuenta (ver EnvioWhatsApp)
+        self._envio = None
+        
+        # Cuentas de WhatsApp del envío
+        self.num_cuentas = tk.IntVar(value=1)
+        self._hilo_envio = None
         
         # Configuración de logging
-        self._log_level = "INFO"  # DEBUG, INFO, WARNING, ERROR
+        self._registro = RegistroEventos(nivel="INFO")  # DEBUG, INFO, WARNING, ERROR
         self._log_to_file = False
         self._log_file = "whatsapp_sender.log"
+        self._ultimo_volcado_log = 0.0
         
         # Configurar estilo
         self.setup_styles()
         
         # Crear interfaz
         self.create_interface()
+        self._programar_volcado_log()
         
         # Verificar sesión persistente al iniciar
         self.verificar_sesion_whatsapp()
@@ -159,6 +143,10 @@ class WhatsAppSenderGUIMejorado:
         if self.progreso_guardado > 0:
             self.log_message(f"📋 Progreso guardado detectado: {self.progreso_guardado} contactos procesados")
         
+        # Cache de archivos Excel leídos (compartida por análisis y diálogos de columnas),
+        # con los alias de columnas del usuario si existe ALIAS_COLUMNAS_FILE
+        self._cache_excel = CacheLibrosExcel(alias=self.cargar_alias_columnas())
+        
     def setup_styles(self):
         """Configurar estilos modernos"""
         style = ttk.Style()
@@ -266,11 +254,27 @@ class WhatsAppSenderGUIMejorado:
                               relief="flat", bd=0, padx=20, pady=8)
         browse_btn.grid(row=0, column=1)
         
-        # Botón analizar
-        analyze_btn = tk.Button(file_frame, text="🔍 Analizar Datos", command=self.analyze_data,
-                               font=("Segoe UI", 10, "bold"), bg="#34a853", fg="white",
-                               relief="flat", bd=0, padx=20, pady=8)
-        analyze_btn.grid(row=1, column=0, pady=(0, 15))
+        # Botones analizar y cancelar análisis
+        analyze_frame = tk.Frame(file_frame, bg="#ffffff")
+        analyze_frame.grid(row=1, column=0, pady=(0, 5))
+        
+        self.analyze_btn = tk.Button(analyze_frame, text="🔍 Analizar Datos", command=self.analyze_data,
+                                     font=("Segoe UI", 10, "bold"), bg="#34a853", fg="white",
+                                     relief="flat", bd=0, padx=20, pady=8)
+        self.analyze_btn.grid(row=0, column=0, padx=(0, 10))
+        
+        self.cancel_analysis_btn = tk.Button(analyze_frame, text="⏹️ Cancelar", command=self.cancel_analysis,
+                                             font=("Segoe UI", 10, "bold"), bg="#ea4335", fg="white",
+                                             relief="flat", bd=0, padx=20, pady=8, state=tk.DISABLED)
+        self.cancel_analysis_btn.grid(row=0, column=1)
+        
+        # Progreso del análisis (filas procesadas y velocidad)
+        self.analysis_progress = ttk.Progressbar(file_frame, mode='determinate', length=300)
+        self.analysis_progress.grid(row=2, column=0, pady=(5, 2))
+        
+        self.analysis_status_label = tk.Label(file_frame, text="", font=("Segoe UI", 9),
+                                              bg="#ffffff", fg="#5f6368")
+        self.analysis_status_label.grid(row=3, column=0, pady=(0, 10))
         
     def create_template_section(self, parent):
         """Sección de plantillas"""
@@ -396,9 +400,35 @@ class WhatsAppSenderGUIMejorado:
                             relief="solid", bd=1, width=8)
         max_delay.grid(row=0, column=4, sticky="w")
         
+        tk.Label(delay_frame, text="Cuentas WhatsApp:", 
+                font=("Segoe UI", 10, "bold"), bg="#ffffff", fg="#202124").grid(row=0, column=5, sticky="w", padx=(25, 5))
+        
+        cuentas = tk.Spinbox(delay_frame, from_=1, to=MAX_CUENTAS_WHATSAPP, textvariable=self.num_cuentas,
+                             font=("Segoe UI", 9), bg="#ffffff", fg="#202124",
+                             relief="solid", bd=1, width=4, state="readonly")
+        cuentas.grid(row=0, column=6, sticky="w")
+        
+        # Límites de envío por cuenta en una sola fila
+        limits_frame = tk.Frame(main_config_frame, bg="#ffffff")
+        limits_frame.grid(row=1, column=0, sticky="ew", pady=(0, 8))
+        
+        tk.Label(limits_frame, text="Límites:", 
+                font=("Segoe UI", 10, "bold"), bg="#ffffff", fg="#202124").grid(row=0, column=0, sticky="w")
+        
+        for columna, (texto, variable, ancho) in enumerate((("Máx/hora:", self.max_por_hora, 8),
+                                                             ("Máx/día:", self.max_por_dia, 8),
+                                                             ("Silencio:", self.horas_silencio, 12),
+                                                             ("Antelación (h):", self.antelacion_horas, 6))):
+            tk.Label(limits_frame, text=texto, 
+                    font=("Segoe UI", 9), bg="#ffffff", fg="#5f6368").grid(row=0, column=2 * columna + 1, sticky="w",
+                                                                          padx=(15 if columna == 0 else 0, 5))
+            tk.Entry(limits_frame, textvariable=variable,
+                     font=("Segoe UI", 9), bg="#ffffff", fg="#202124",
+                     relief="solid", bd=1, width=ancho).grid(row=0, column=2 * columna + 2, sticky="w", padx=(0, 10))
+        
         # Opciones en una sola fila
         options_frame = tk.Frame(main_config_frame, bg="#ffffff")
-        options_frame.grid(row=1, column=0, sticky="ew", pady=(0, 5))
+        options_frame.grid(row=2, column=0, sticky="ew", pady=(0, 5))
         
         # Opción para números extranjeros
         extranjeros_check = tk.Checkbutton(options_frame, 
@@ -420,14 +450,28 @@ class WhatsAppSenderGUIMejorado:
                                          selectcolor="#e8f0fe",
                                          activebackground="#ffffff",
                                          activeforeground="#202124")
-        consolidar_check.grid(row=0, column=1, sticky="w")
+        consolidar_check.grid(row=0, column=1, sticky="w", padx=(0, 20))
+        
+        # Opción para dejar Chrome abierto con WhatsApp Web para el siguiente envío
+        navegador_check = tk.Checkbutton(options_frame, 
+                                        text="🌐 Mantener Chrome abierto",
+                                        variable=self.mantener_navegador,
+                                        font=("Segoe UI", 9, "bold"),
+                                        bg="#ffffff", fg="#202124",
+                                        selectcolor="#e8f0fe",
+                                        activebackground="#ffffff",
+                                        activeforeground="#202124")
+        navegador_check.grid(row=0, column=2, sticky="w")
         
         # Información compacta
         info_frame = tk.Frame(main_config_frame, bg="#ffffff")
-        info_frame.grid(row=2, column=0, sticky="ew")
+        info_frame.grid(row=3, column=0, sticky="ew")
         
         info_label = tk.Label(info_frame,
-                             text="💡 Números extranjeros: 10-15 dígitos | Consolidar: Agrupa reservas del mismo cliente",
+                             text="💡 Delay: intervalo mínimo y máximo entre mensajes de cada cuenta | "
+                                  "Límites: 0 = sin límite, silencio 22:00-08:00 | "
+                                  "Antelación: cada mensaje sale N horas antes de la entrada (0 = sin esperar) | "
+                                  "Cuentas: cada una con su sesión, los contactos se reparten por teléfono",
                              font=("Segoe UI", 8), bg="#ffffff", fg="#5f6368")
         info_label.grid(row=0, column=0, sticky="w")
     
@@ -477,32 +521,81 @@ class WhatsAppSenderGUIMejorado:
         
         # Barra de progreso
         self.progress = ttk.Progressbar(control_frame, mode='determinate', length=300)
-        self.progress.grid(row=1, column=0, pady=(10, 15))
+        self.progress.grid(row=1, column=0, pady=(10, 5))
+        
+        # Progreso del envío (total y por cuenta)
+        self.sending_status_label = tk.Label(control_frame, text="", font=("Segoe UI", 9),
+                                             bg="#ffffff", fg="#5f6368")
+        self.sending_status_label.grid(row=2, column=0, pady=(0, 10))
         
     def create_preview_section(self, parent):
-        """Sección de vista previa"""
+        """
+        Sección de vista previa.
+        
+        La tabla es virtual: solo tiene FILAS_VISTA_PREVIA filas y la barra de
+        desplazamiento mueve la ventana sobre los contactos filtrados, de modo
+        que se pueden recorrer, ordenar y buscar todos sin crear una fila por
+        contacto.
+        """
         preview_frame = ttk.LabelFrame(parent, text="📊 Vista Previa de Datos", style='Section.TLabelframe')
         preview_frame.grid(row=0, column=0, sticky="nsew", padx=15, pady=(15, 10))
         parent.grid_rowconfigure(0, weight=1)
         
+        # Búsqueda y filtros
+        filtros_frame = tk.Frame(preview_frame, bg="#ffffff")
+        filtros_frame.grid(row=0, column=0, columnspan=2, sticky="ew", padx=15, pady=(10, 0))
+        
+        self.preview_busqueda = tk.StringVar()
+        self.preview_solo_consolidados = tk.BooleanVar(value=False)
+        self.preview_solo_extranjeros = tk.BooleanVar(value=False)
+        self.preview_hora = tk.StringVar(value=TODAS_LAS_HORAS)
+        
+        tk.Label(filtros_frame, text="🔎", bg="#ffffff").grid(row=0, column=0)
+        tk.Entry(filtros_frame, textvariable=self.preview_busqueda, font=("Segoe UI", 9),
+                 relief="solid", bd=1, width=18).grid(row=0, column=1, padx=(2, 10))
+        tk.Checkbutton(filtros_frame, text="🔗 Consolidados", variable=self.preview_solo_consolidados,
+                       command=self._refrescar_preview, bg="#ffffff",
+                       font=("Segoe UI", 9)).grid(row=0, column=2)
+        tk.Checkbutton(filtros_frame, text="🌍 Extranjeros", variable=self.preview_solo_extranjeros,
+                       command=self._refrescar_preview, bg="#ffffff",
+                       font=("Segoe UI", 9)).grid(row=0, column=3)
+        self.preview_hora_combo = ttk.Combobox(filtros_frame, textvariable=self.preview_hora,
+                                               values=[TODAS_LAS_HORAS], state="readonly", width=14)
+        self.preview_hora_combo.grid(row=0, column=4, padx=(10, 0))
+        self.preview_hora_combo.bind("<<ComboboxSelected>>", lambda event: self._refrescar_preview())
+        self.preview_busqueda.trace_add("write", lambda *args: self._refrescar_preview())
+        
         # Crear Treeview
-        columns = ('Nombre', 'Teléfono', 'Matrícula', 'Hora', 'Tipo Plaza', 'Ocupantes')
-        self.tree = ttk.Treeview(preview_frame, columns=columns, show='headings', height=8)
+        self.tree = ttk.Treeview(preview_frame, columns=COLUMNAS_VISTA, show='headings',
+                                 height=FILAS_VISTA_PREVIA)
         
-        # Configurar columnas
-        for col in columns:
-            self.tree.heading(col, text=col)
+        # Configurar columnas (clic en el encabezado para ordenar)
+        for col in COLUMNAS_VISTA:
+            self.tree.heading(col, text=col, command=lambda columna=col: self._ordenar_preview(columna))
             self.tree.column(col, width=100, anchor=tk.CENTER)
         
-        # Scrollbar para la tabla
-        tree_scroll = ttk.Scrollbar(preview_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=tree_scroll.set)
+        # Scrollbar virtual: desplaza la ventana de filas, no el contenido de la tabla
+        self.preview_scroll = ttk.Scrollbar(preview_frame, orient=tk.VERTICAL, command=self._desplazar_preview)
+        self.tree.bind("<MouseWheel>", self._rueda_preview)
+        self.tree.bind("<Button-4>", self._rueda_preview)
+        self.tree.bind("<Button-5>", self._rueda_preview)
         
-        self.tree.grid(row=0, column=0, sticky="nsew", padx=(15, 0), pady=15)
-        tree_scroll.grid(row=0, column=1, sticky="ns", pady=15)
-        preview_frame.grid_rowconfigure(0, weight=1)
+        self.tree.grid(row=1, column=0, sticky="nsew", padx=(15, 0), pady=(10, 5))
+        self.preview_scroll.grid(row=1, column=1, sticky="ns", pady=(10, 5))
+        
+        self.preview_info_label = tk.Label(preview_frame, text="Sin contactos", font=("Segoe UI", 9),
+                                           bg="#ffffff", fg="#5f6368")
+        self.preview_info_label.grid(row=2, column=0, columnspan=2, pady=(0, 10))
+        preview_frame.grid_rowconfigure(1, weight=1)
         preview_frame.grid_columnconfigure(0, weight=1)
         
+        # Estado de la vista: índice de los contactos, posiciones filtradas y primera fila visible
+        self._indice_preview = IndiceContactos([])
+        self._posiciones_preview = self._indice_preview.filtrar()
+        self._inicio_preview = 0
+        self._orden_preview = None
+        self._orden_descendente = False
+        
     def create_log_section(self, parent):
         """Sección de log"""
         log_frame = ttk.LabelFrame(parent, text="📝 Log de Eventos", style='Section.TLabelframe')
@@ -580,321 +673,246 @@ class WhatsAppSenderGUIMejorado:
             self.log_message(f"📁 Archivo seleccionado: {os.path.basename(filename)}")
     
     def analyze_data(self):
+        """
+        Analizar el archivo Excel en un hilo de fondo.
+        
+        La interfaz sigue respondiendo mientras se lee el archivo: la barra de
+        análisis muestra las filas procesadas por segundo, la vista previa se
+        va llenando con los contactos encontrados y el botón Cancelar detiene
+        la lectura al terminar el bloque actual.
+        """
         if not self.excel_path.get():
             messagebox.showerror("Error", "Por favor selecciona un archivo Excel")
             return
+        if self._analisis_en_curso():
+            return
         
+        self.log_message("🔍 Analizando archivo Excel...")
+        self._analisis_cancelado.clear()
+        self._progreso_analisis = None
+        self._resultado_analisis = None
+        
+        self.analyze_btn.config(state=tk.DISABLED)
+        self.cancel_analysis_btn.config(state=tk.NORMAL)
+        self.analysis_progress.config(mode='indeterminate')
+        self.analysis_progress.start()
+        self.analysis_status_label.config(text="📥 Leyendo archivo...")
+        
+        self._inicio_analisis = time.monotonic()
+        self._ultima_vista_parcial = 0.0
+        # Las variables de Tk se leen aquí, en el hilo de Tk; el hilo de análisis no las toca
+        analisis = self._analisis_excel()
+        recogidas = self.plantilla_actual.get() == "Recogidas"
+        self._hilo_analisis = threading.Thread(target=self.analysis_thread, args=(analisis, recogidas),
+                                               daemon=True)
+        self._hilo_analisis.start()
+        self.root.after(int(INTERVALO_PROGRESO_ANALISIS * 1000), self._vigilar_analisis)
+    
+    def cancel_analysis(self):
+        """Cancelar el análisis en curso (se detiene al terminar el bloque de filas actual)"""
+        if self._analisis_en_curso():
+            self._analisis_cancelado.set()
+            self.cancel_analysis_btn.config(state=tk.DISABLED)
+            self.analysis_status_label.config(text="⏹️ Cancelando...")
+            self.log_message("⏹️ Cancelando análisis...")
+    
+    def _analisis_en_curso(self):
+        """Indicar si hay un análisis ejecutándose en segundo plano"""
+        return self._hilo_analisis is not None and self._hilo_analisis.is_alive()
+    
+    def analysis_thread(self, analisis, recogidas):
+        """
+        Hilo de análisis: extrae los contactos sin tocar ningún widget.
+        
+        El progreso y el resultado se dejan en _progreso_analisis y
+        _resultado_analisis, que _vigilar_analisis lee desde el hilo de Tk.
+        
+        Args:
+            analisis (AnalisisExcel): Análisis creado en el hilo de Tk con las opciones de la ventana
+            recogidas (bool): Si la plantilla actual es la de recogidas
+        """
         try:
-            self.log_message("🔍 Analizando archivo Excel...")
-            
             # Verificar si es una plantilla de recogida y mostrar información de columnas
-            plantilla_actual = self.plantilla_actual.get()
-            if plantilla_actual == "Recogidas":
-                self._mostrar_info_columnas_vuelo()
-            
-            self.contactos = self.obtener_contactos_con_telefono()
-            
-            if len(self.contactos) == 0:
-                messagebox.showwarning("Advertencia", "No se encontraron contactos con teléfono válido")
-                return
-            
-            # Actualizar vista previa
-            self.update_preview()
-            
-            # Actualizar estadísticas
-            self.total_value_label.config(text=str(len(self.contactos)))
-            
-            # Calcular estadísticas de consolidación
-            contactos_consolidados = sum(1 for c in self.contactos if c.get('consolidado', False))
-            total_reservas = sum(c.get('reservas_count', 1) for c in self.contactos)
-            
-            self.consolidacion_value_label.config(text=str(contactos_consolidados))
-            self.reservas_value_label.config(text=str(total_reservas))
-            
-            self.log_message(f"✅ Análisis completado: {len(self.contactos)} contactos válidos")
-            if contactos_consolidados > 0:
-                self.log_message(f"🔗 {contactos_consolidados} contactos consolidados de {total_reservas} reservas totales")
-            messagebox.showinfo("Éxito", f"Se encontraron {len(self.contactos)} contactos válidos")
+            if recogidas:
+                analisis.mostrar_info_columnas_vuelo()
             
+            contactos = analisis.obtener_contactos_con_telefono(
+                progreso=lambda filas, total, contactos: setattr(self, '_progreso_analisis', (filas, total, contactos)),
+                cancelado=self._analisis_cancelado
+            )
+            self._resultado_analisis = ("ok", contactos)
+        except AnalysisCancelledError:
+            self._resultado_analisis = ("cancelado", None)
         except Exception as e:
-            self.log_message(f"❌ Error analizando datos: {str(e)}")
-            messagebox.showerror("Error", f"Error analizando datos: {str(e)}")
+            self._resultado_analisis = ("error", e)
+    
+    def _vigilar_analisis(self):
+        """Actualizar barra, velocidad y vista previa parcial del análisis (hilo de Tk)"""
+        progreso = self._progreso_analisis
+        if progreso is not None and not self._analisis_cancelado.is_set():
+            filas, total, contactos = progreso
+            velocidad = filas / max(time.monotonic() - self._inicio_analisis, 1e-6)
+            if total:
+                if str(self.analysis_progress.cget('mode')) != 'determinate':
+                    self.analysis_progress.stop()
+                    self.analysis_progress.config(mode='determinate')
+                self.analysis_progress['value'] = min(filas / total, 1.0) * 100
+                texto = f"📊 {filas}/{total} filas · {velocidad:,.0f} filas/s · {len(contactos)} contactos"
+            else:
+                texto = f"📊 {filas} filas · {velocidad:,.0f} filas/s · {len(contactos)} contactos"
+            self.analysis_status_label.config(text=texto)
+            
+            if time.monotonic() - self._ultima_vista_parcial >= INTERVALO_VISTA_PREVIA_PROGRESIVA:
+                self._mostrar_contactos_parciales(contactos)
+                self._ultima_vista_parcial = time.monotonic()
+        
+        if self._analisis_en_curso():
+            self.root.after(int(INTERVALO_PROGRESO_ANALISIS * 1000), self._vigilar_analisis)
+        else:
+            self._finalizar_analisis()
+    
+    def _finalizar_analisis(self):
+        """Mostrar el resultado del análisis y restaurar los controles (hilo de Tk)"""
+        self.analysis_progress.stop()
+        self.analysis_progress.config(mode='determinate')
+        self.analyze_btn.config(state=tk.NORMAL)
+        self.cancel_analysis_btn.config(state=tk.DISABLED)
+        duracion = time.monotonic() - self._inicio_analisis
+        
+        estado, valor = self._resultado_analisis or ("error", RuntimeError("el análisis terminó sin resultado"))
+        if estado == "cancelado":
+            # Sin el archivo completo la consolidación no es fiable: no se deja nada para enviar
+            self.analysis_progress['value'] = 0
+            self.analysis_status_label.config(text="⏹️ Análisis cancelado")
+            self._mostrar_estadisticas_contactos([])
+            self.log_message("⏹️ Análisis cancelado por el usuario")
+            return
+        if estado == "error":
+            self.analysis_progress['value'] = 0
+            self.analysis_status_label.config(text="❌ Error en el análisis")
+            self.log_message(f"❌ Error analizando datos: {str(valor)}")
+            messagebox.showerror("Error", f"Error analizando datos: {str(valor)}")
+            return
+        
+        self.analysis_progress['value'] = 100
+        self.analysis_status_label.config(text=f"✅ {len(valor)} contactos en {duracion:.1f}s")
+        contactos_consolidados, total_reservas = self._mostrar_estadisticas_contactos(valor)
+        
+        if len(self.contactos) == 0:
+            messagebox.showwarning("Advertencia", "No se encontraron contactos con teléfono válido")
+            return
+        
+        self.log_message(f"✅ Análisis completado: {len(self.contactos)} contactos válidos")
+        if contactos_consolidados > 0:
+            self.log_message(f"🔗 {contactos_consolidados} contactos consolidados de {total_reservas} reservas totales")
+        messagebox.showinfo("Éxito", f"Se encontraron {len(self.contactos)} contactos válidos")
+    
+    def _mostrar_estadisticas_contactos(self, contactos):
+        """
+        Cargar los contactos analizados en la vista previa y las estadísticas.
+        
+        Returns:
+            tuple: (contactos consolidados, total de reservas)
+        """
+        self.contactos = contactos
+        
+        # Actualizar vista previa
+        self.update_preview()
+        
+        # Actualizar estadísticas
+        self.total_value_label.config(text=str(len(contactos)))
+        
+        # Calcular estadísticas de consolidación
+        contactos_consolidados = sum(1 for c in contactos if c.consolidado)
+        total_reservas = sum(c.reservas_count for c in contactos)
+        
+        self.consolidacion_value_label.config(text=str(contactos_consolidados))
+        self.reservas_value_label.config(text=str(total_reservas))
+        return contactos_consolidados, total_reservas
     
     def _mostrar_info_columnas_vuelo(self):
         """Mostrar información sobre las columnas de vuelo disponibles"""
-        try:
-            df = pd.read_excel(self.excel_path.get())
-            
-            # Buscar columnas que contengan "VUELTA" o "VUELO"
-            columnas_vuelo = [col for col in df.columns if "VUELTA" in col.upper() or "VUELO" in col.upper()]
-            
-            if columnas_vuelo:
-                self.log_message(f"📋 Columnas de vuelo encontradas: {', '.join(columnas_vuelo)}")
-                
-                # Mostrar algunos ejemplos de valores
-                for columna in columnas_vuelo[:2]:  # Solo las primeras 2 columnas
-                    valores_ejemplo = df[columna].dropna().head(3).tolist()
-                    self.log_message(f"    📊 Ejemplos en '{columna}': {valores_ejemplo}")
-            else:
-                self.log_message("⚠️ No se encontraron columnas con 'VUELTA' o 'VUELO'")
-                self.log_message("    🔄 Se usará la columna 'NIF' como respaldo")
-                
-        except Exception as e:
-            self.log_message(f"⚠️ Error analizando columnas de vuelo: {str(e)}")
+        self._analisis_excel().mostrar_info_columnas_vuelo()
+    
+    def _analisis_excel(self):
+        """Análisis del archivo seleccionado con las opciones actuales de la ventana"""
+        return AnalisisExcel(self.excel_path.get(), self._cache_excel,
+                             recogidas=self.plantilla_actual.get() == "Recogidas",
+                             numeros_extranjeros=self.numeros_extranjeros.get(),
+                             consolidar=self.consolidar_duplicados.get(),
+                             log=self.log_message)
     
-    def obtener_contactos_con_telefono(self):
+    def obtener_contactos_con_telefono(self, progreso=None, cancelado=None):
         """
-        Extrae solo los contactos que tienen teléfono válido del archivo Excel.
-        
-        Esta función procesa el archivo Excel y extrae los contactos que cumplen
-        con los criterios de validación de teléfono. Soporta dos formatos:
-        - Formato especial: Todas las columnas en una sola columna separada por tabs
-        - Formato normal: Columnas separadas de Excel
+        Extrae solo los contactos que tienen teléfono válido del archivo Excel
+        (ver AnalisisExcel.obtener_contactos_con_telefono).
         
-        Si la consolidación de duplicados está habilitada, agrupa múltiples
-        reservas del mismo cliente por día en un solo contacto consolidado.
+        Args:
+            progreso (callable): progreso(filas_procesadas, total_filas, contactos) tras
+                cada bloque; total_filas es None si no se conoce
+            cancelado (threading.Event): Si se activa, el análisis se detiene al
+                terminar el bloque actual
         
         Returns:
-            list: Lista de diccionarios con información de contactos válidos
-                Cada contacto contiene: nombre, telefono, matricula, hora_entrada,
-                tipo_plaza, ocupantes, fecha_entrada
-                Si está consolidado: matriculas (lista), ocupantes_total, reservas_count
+            list: Contactos válidos (Contacto)
                 
         Raises:
             FileProcessingError: Si hay error al procesar el archivo Excel
+            AnalysisCancelledError: Si se activó cancelado
         """
+        return self._analisis_excel().obtener_contactos_con_telefono(progreso, cancelado)
+    
+    def _leer_libro_excel(self):
+        """Obtener el archivo Excel seleccionado a través de la caché de libros"""
+        return self._analisis_excel().leer_libro_excel()
+    
+    def cargar_alias_columnas(self):
+        """Cargar los alias de columnas del usuario (ALIAS_COLUMNAS_FILE) junto a los predeterminados"""
         try:
-            df = pd.read_excel(self.excel_path.get())
-            contactos = []
-            
-            self.log_message(f"📊 Procesando {len(df)} filas...")
-            self._log_configuracion_numeros()
-            
-            # Procesar según el formato del archivo
-            if len(df.columns) == 1:
-                self.log_message("📋 Detectado formato especial de archivo...")
-                contactos = self._procesar_formato_especial(df)
-            else:
-                self.log_message("📋 Detectado formato normal de Excel...")
-                contactos = self._procesar_formato_normal(df)
-            
-            # Aplicar consolidación de duplicados si está habilitada
-            if self.consolidar_duplicados.get() and contactos:
-                self.log_message("🔗 Aplicando consolidación de reservas duplicadas...")
-                contactos_originales = len(contactos)
-                contactos = self._consolidar_contactos_duplicados(contactos)
-                contactos_consolidados = len(contactos)
-                self.log_message(f"✅ Consolidación completada: {contactos_originales} → {contactos_consolidados} contactos")
-            
-            return contactos
-            
-        except FileNotFoundError:
-            self.log_message(f"❌ No se encontró el archivo: {self.excel_path.get()}")
-            raise FileProcessingError(f"Archivo no encontrado: {self.excel_path.get()}")
+            alias = cargar_alias_columnas(ALIAS_COLUMNAS_FILE)
+            if alias != ALIAS_COLUMNAS:
+                self.log_message(f"📋 Alias de columnas personalizados cargados desde {ALIAS_COLUMNAS_FILE}")
+            return alias
         except Exception as e:
-            self.log_message(f"❌ Error leyendo Excel: {e}")
-            raise FileProcessingError(f"Error procesando archivo Excel: {str(e)}")
+            self.log_message(f"⚠️ Error cargando alias de columnas: {str(e)}")
+            return ALIAS_COLUMNAS
     
-    def _log_configuracion_numeros(self):
-        """Registrar configuración de números en el log"""
-        plantilla_actual = self.plantilla_actual.get()
-        
-        if self.numeros_extranjeros.get():
-            self.log_message("🌍 Reconocimiento de números extranjeros: HABILITADO")
-        else:
-            self.log_message("🇪🇸 Solo números españoles: HABILITADO")
-        
-        # Informar sobre la columna de teléfono según la plantilla
-        if plantilla_actual == "Recogidas":
-            self.log_message("📞 Plantilla de recogida detectada: Buscando números en columna 'Nº Vuelo VUELTA'")
-        else:
-            self.log_message("📞 Plantilla normal: Buscando números en columna 'NIF'")
+    def _leer_muestra_excel(self):
+        """Hoja completa desde la caché o, en archivos grandes, solo el primer bloque de filas"""
+        return self._analisis_excel().leer_muestra_excel()
     
-    def _procesar_formato_especial(self, df):
-        """Procesar archivo con formato especial (todas las columnas en una sola)"""
-        contactos = []
-        
-        for index in range(1, len(df)):  # Empezar desde 1 para saltar la fila de encabezados
-            try:
-                contacto = self._extraer_contacto_formato_especial(df, index)
-                if contacto:
-                    contactos.append(contacto)
-            except Exception as e:
-                continue  # Saltar filas con errores
-        
-        return contactos
+    def iterar_contactos_excel(self, filas_por_bloque=FILAS_POR_BLOQUE):
+        """Leer el archivo Excel de forma progresiva y devolver los contactos válidos uno a uno"""
+        return self._analisis_excel().iterar_contactos_excel(filas_por_bloque)
     
-    def _procesar_formato_normal(self, df):
-        """Procesar archivo con formato normal de Excel"""
-        contactos = []
-        
-        for index in range(len(df)):
-            try:
-                contacto = self._extraer_contacto_formato_normal(df, index)
-                if contacto:
-                    contactos.append(contacto)
-            except Exception as e:
-                continue  # Saltar filas con errores
+    def _mostrar_contactos_parciales(self, contactos):
+        """
+        Mostrar en la vista previa y las estadísticas los contactos leídos hasta ahora.
         
-        return contactos
+        No se guardan en self.contactos: hasta que termina el análisis (y la
+        consolidación) la lista está incompleta y no se puede enviar.
+        """
+        self.update_preview(contactos)
+        self.total_value_label.config(text=str(len(contactos)))
+        self.reservas_value_label.config(text=str(len(contactos)))
     
-    def _extraer_contacto_formato_especial(self, df, index):
-        """Extraer contacto del formato especial"""
-        # Obtener la fila completa
-        fila_completa = str(df.iloc[index, 0])
-        datos = fila_completa.split('\t')
-        
-        if len(datos) < MIN_COLUMNAS_FORMATO_ESPECIAL:  # Mínimo de columnas necesarias
-            return None
-        
-        # Extraer datos según el orden: [Agencia, Cliente, NIF, Matricula, Vehiculo, Ocup., ...]
-        nombre = datos[1].strip() if len(datos) > 1 else f"Cliente {index+1}"
-        
-        # Determinar de qué columna extraer el teléfono según la plantilla seleccionada
-        plantilla_actual = self.plantilla_actual.get()
-        if plantilla_actual == "Recogidas":
-            # Para plantilla de recogidas, buscar en "Nº Vuelo VUELTA"
-            # Asumiendo que está en una posición específica del formato especial
-            # Buscar en todas las columnas que contengan "VUELTA" o números de vuelo
-            nif_campo = ""
-            for i, dato in enumerate(datos):
-                dato_limpio = dato.strip().upper()
-                if "VUELTA" in dato_limpio or "VUELO" in dato_limpio:
-                    # Extraer número de teléfono del campo de vuelo
-                    nif_campo = self._extraer_numero_telefono_vuelo(dato)
-                    if nif_campo:
-                        self.log_message(f"    📞 Número extraído de columna de vuelo: {nif_campo}")
-                        break
-            
-            # Si no se encontró en campos de vuelo, usar el campo NIF como respaldo
-            if not nif_campo:
-                nif_campo = datos[2].strip() if len(datos) > 2 else ""
-                self.log_message(f"    ⚠️ Usando campo NIF como respaldo: {nif_campo}")
-        else:
-            # Para otras plantillas, usar el campo NIF normal
-            nif_campo = datos[2].strip() if len(datos) > 2 else ""
-        
-        matricula = datos[3].strip() if len(datos) > 3 else "Sin matrícula"
-        ocupantes = datos[5].strip() if len(datos) > 5 else "Sin especificar"
-        
-        # Obtener hora de entrada
-        hora_entrada = self._extraer_hora_entrada(datos)
-        
-        # Obtener fecha de entrada
-        fecha_entrada = self._extraer_fecha_entrada(datos)
-        
-        # Obtener tipo de plaza
-        tipo_plaza = datos[12].strip() if len(datos) > 12 else "Sin especificar"
-        
-        return self._validar_y_crear_contacto(nombre, nif_campo, matricula, hora_entrada, fecha_entrada, tipo_plaza, ocupantes)
+    def _procesar_formato_especial(self, df, inicio=1):
+        """Procesar archivo con formato especial (todas las columnas en una sola, separadas por tabs)"""
+        return self._analisis_excel().procesar_formato_especial(df, inicio)
     
-    def _extraer_contacto_formato_normal(self, df, index):
-        """Extraer contacto del formato normal de Excel"""
-        # Obtener datos de las columnas correspondientes
-        nombre = str(df.iloc[index]['Cliente']).strip() if 'Cliente' in df.columns else f"Cliente {index+1}"
-        
-        # Determinar de qué columna extraer el teléfono según la plantilla seleccionada
-        plantilla_actual = self.plantilla_actual.get()
-        if plantilla_actual == "Recogidas":
-            # Para plantilla de recogidas, buscar en "Nº Vuelo VUELTA"
-            nif_campo = ""
-            
-            # Buscar columnas que contengan "VUELTA" o "VUELO"
-            columnas_vuelo = [col for col in df.columns if "VUELTA" in col.upper() or "VUELO" in col.upper()]
-            
-            if columnas_vuelo:
-                # Usar la primera columna de vuelo encontrada
-                columna_vuelo = columnas_vuelo[0]
-                valor_vuelo = df.iloc[index][columna_vuelo]
-                if pd.notna(valor_vuelo):
-                    # Extraer números de teléfono del campo de vuelo
-                    nif_campo = self._extraer_numero_telefono_vuelo(str(valor_vuelo))
-                    if nif_campo:
-                        self.log_message(f"    📞 Número extraído de '{columna_vuelo}': {nif_campo}")
-                    else:
-                        self.log_message(f"    ⚠️ No se pudo extraer número válido de '{columna_vuelo}': {valor_vuelo}")
-            
-            # Si no se encontró en campos de vuelo, usar el campo NIF como respaldo
-            if not nif_campo:
-                nif_campo = str(df.iloc[index]['NIF']).strip() if 'NIF' in df.columns else ""
-                self.log_message(f"    ⚠️ Usando campo NIF como respaldo: {nif_campo}")
-        else:
-            # Para otras plantillas, usar el campo NIF normal
-            nif_campo = str(df.iloc[index]['NIF']).strip() if 'NIF' in df.columns else ""
-        
-        matricula = str(df.iloc[index]['Matricula']).strip() if 'Matricula' in df.columns else "Sin matrícula"
-        
-        # Obtener hora de entrada
-        hora_entrada = self._extraer_hora_entrada_excel(df, index)
-        
-        # Obtener fecha de entrada
-        fecha_entrada = self._extraer_fecha_entrada_excel(df, index)
-        
-        # Obtener tipo de plaza
-        tipo_plaza = str(df.iloc[index]['Tipo de Plaza']).strip() if 'Tipo de Plaza' in df.columns else "Sin especificar"
-        
-        # Obtener número de ocupantes
-        ocupantes = self._extraer_ocupantes(df, index)
-        
-        return self._validar_y_crear_contacto(nombre, nif_campo, matricula, hora_entrada, fecha_entrada, tipo_plaza, ocupantes)
-    
-    def _extraer_hora_entrada(self, datos):
-        """Extraer hora de entrada del formato especial"""
-        hora_entrada = "00:00"
-        if len(datos) > 10:
-            hora_raw = datos[10].strip()
-            if hora_raw and ':' in hora_raw:
-                hora_entrada = hora_raw
-        return hora_entrada
-    
-    def _extraer_hora_entrada_excel(self, df, index):
-        """Extraer hora de entrada del formato Excel"""
-        hora_entrada = "00:00"
-        if 'Hora entrada' in df.columns:
-            hora_raw = df.iloc[index]['Hora entrada']
-            if pd.notna(hora_raw):
-                hora_str = str(hora_raw)
-                if ':' in hora_str:
-                    hora_entrada = hora_str.split(':')[0] + ":" + hora_str.split(':')[1]
-                else:
-                    hora_entrada = hora_str[:2] + ":00"
-        return hora_entrada
-    
-    def _extraer_ocupantes(self, df, index):
-        """Extraer número de ocupantes del formato Excel"""
-        ocupantes = "Sin especificar"
-        if 'Ocup.' in df.columns:
-            ocupantes_raw = df.iloc[index]['Ocup.']
-            if pd.notna(ocupantes_raw):
-                ocupantes = str(ocupantes_raw).strip()
-        return ocupantes
-    
-    def _extraer_fecha_entrada(self, datos):
-        """Extraer fecha de entrada del formato especial"""
-        fecha_entrada = "Desconocida"
-        if len(datos) > 10:
-            fecha_raw = datos[10].strip()
-            if fecha_raw and '-' in fecha_raw:
-                fecha_entrada = fecha_raw
-        return fecha_entrada
-    
-    def _extraer_fecha_entrada_excel(self, df, index):
-        """Extraer fecha de entrada del formato Excel"""
-        fecha_entrada = "Desconocida"
-        if 'Fecha entrada' in df.columns:
-            fecha_raw = df.iloc[index]['Fecha entrada']
-            if pd.notna(fecha_raw):
-                fecha_str = str(fecha_raw)
-                if '-' in fecha_str:
-                    fecha_entrada = fecha_str.split('-')[0] + "-" + fecha_str.split('-')[1] + "-" + fecha_str.split('-')[2]
-                else:
-                    fecha_entrada = fecha_str[:4] + "-" + fecha_str[4:6] + "-" + fecha_str[6:]
-        return fecha_entrada
+    def _procesar_formato_normal(self, df, esquema=None):
+        """Procesar archivo con formato normal de Excel (extracción por columnas con el esquema resuelto)"""
+        return self._analisis_excel().procesar_formato_normal(df, esquema)
+    
+    def _filtrar_contactos(self, campos):
+        """Aplicar a todas las filas extraídas los mismos filtros que _validar_y_crear_contacto"""
+        return self._analisis_excel().filtrar_contactos(campos)
     
     def _validar_y_crear_contacto(self, nombre, nif_campo, matricula, hora_entrada, fecha_entrada, tipo_plaza, ocupantes):
         """Validar y crear contacto si cumple los criterios"""
         # Verificar si el NIF es realmente un teléfono (español o extranjero)
-        if not self.es_telefono_valido(nif_campo):
+        telefono = normalizar_telefono(nif_campo)
+        if not telefono.es_valido(self.numeros_extranjeros.get()):
             return None
         
         # FILTRO: No enviar si Tipo de Plaza está en la lista de excluidos
@@ -902,11 +920,9 @@ class WhatsAppSenderGUIMejorado:
             self.log_message(f"    ⏭️ Saltando {nombre} - Tipo de Plaza: {tipo_plaza}")
             return None
         
-        # Determinar tipo de número
-        tipo_numero = self.determinar_tipo_numero(nif_campo)
-        self.log_message(f"    ✅ {nombre}: {nif_campo} ({tipo_numero})")
+        self.log_message(f"    ✅ {nombre}: {nif_campo} ({telefono.tipo})")
         
-        return {
+        return Contacto.desde_dict({
             'nombre': nombre,
             'telefono': nif_campo,
             'matricula': matricula,
@@ -914,119 +930,100 @@ class WhatsAppSenderGUIMejorado:
             'fecha_entrada': fecha_entrada,
             'tipo_plaza': tipo_plaza,
             'ocupantes': ocupantes
-        }
+        })
     
     def es_telefono_valido(self, telefono):
         """Verificar si un campo es un número de teléfono válido (español o extranjero)"""
-        if not telefono or telefono == 'nan':
-            return False
-        
-        # Limpiar el número
-        telefono_limpio = ''.join(filter(str.isdigit, str(telefono)))
-        
-        # Si ya empieza con +, es válido
-        if str(telefono).startswith('+'):
-            return len(telefono_limpio) >= 10 and len(telefono_limpio) <= 15
-        
-        # Si empieza con 00, es válido (formato internacional)
-        if telefono_limpio.startswith('00'):
-            return len(telefono_limpio) >= 12 and len(telefono_limpio) <= 17
-        
-        # Números españoles: 9 dígitos que empiecen con 6 o 7
-        if len(telefono_limpio) == 9 and telefono_limpio[0] in ['6', '7']:
-            return True
-        
-        # Números españoles con código de país: 11 dígitos que empiecen con 34
-        if len(telefono_limpio) == 11 and telefono_limpio.startswith('34'):
-            return True
-        
-        # Números extranjeros: solo si está habilitado en la configuración
-        if self.numeros_extranjeros.get():
-            # Números extranjeros: 10-15 dígitos que no empiecen con 34
-            if len(telefono_limpio) >= 10 and len(telefono_limpio) <= 15 and not telefono_limpio.startswith('34'):
-                return True
-            
-            # Números con formato especial (con espacios, guiones, etc.)
-            if len(telefono_limpio) >= 9 and len(telefono_limpio) <= 15:
-                return True
-        
-        return False
+        return es_telefono_valido(telefono, self.numeros_extranjeros.get())
     
     def determinar_tipo_numero(self, telefono):
         """Determinar el tipo de número de teléfono"""
-        if not telefono or telefono == 'nan':
-            return "Inválido"
-        
-        # Limpiar el número
-        telefono_limpio = ''.join(filter(str.isdigit, str(telefono)))
-        
-        # Si ya empieza con +, es internacional
-        if str(telefono).startswith('+'):
-            if telefono_limpio.startswith('34'):
-                return "Español Internacional"
-            else:
-                return "Extranjero Internacional"
-        
-        # Si empieza con 00, es internacional
-        if telefono_limpio.startswith('00'):
-            if telefono_limpio.startswith('0034'):
-                return "Español Internacional (00)"
-            else:
-                return "Extranjero Internacional (00)"
-        
-        # Números españoles: 9 dígitos que empiecen con 6 o 7
-        if len(telefono_limpio) == 9 and telefono_limpio[0] in ['6', '7']:
-            return "Español Nacional"
-        
-        # Números españoles con código de país: 11 dígitos que empiecen con 34
-        if len(telefono_limpio) == 11 and telefono_limpio.startswith('34'):
-            return "Español con Código"
-        
-        # Números extranjeros: 10-15 dígitos que no empiecen con 34
-        if len(telefono_limpio) >= 10 and len(telefono_limpio) <= 15 and not telefono_limpio.startswith('34'):
-            return "Extranjero"
-        
-        # Números con formato especial
-        if len(telefono_limpio) >= 9 and len(telefono_limpio) <= 15:
-            return "Formato Especial"
-        
-        return "Desconocido"
+        return determinar_tipo_numero(telefono)
+    
+    def update_preview(self, contactos=None):
+        """Actualizar vista previa de datos (de self.contactos o de la lista indicada)"""
+        if contactos is None:
+            contactos = self.contactos
+        
+        self._indice_preview = IndiceContactos(contactos)
+        self._inicio_preview = 0
+        self._refrescar_preview()
+    
+    def _refrescar_preview(self):
+        """Aplicar búsqueda, filtros y orden a los contactos y mostrar la primera ventana"""
+        hora = self.preview_hora.get()
+        self._posiciones_preview = self._indice_preview.filtrar(
+            consolidados=self.preview_solo_consolidados.get(),
+            extranjeros=self.preview_solo_extranjeros.get(),
+            hora=None if hora == TODAS_LAS_HORAS else hora,
+            texto=self.preview_busqueda.get(),
+            orden=self._orden_preview,
+            descendente=self._orden_descendente
+        )
+        self._inicio_preview = 0
+        self._mostrar_ventana_preview()
     
-    def update_preview(self):
-        """Actualizar vista previa de datos"""
-        # Limpiar tabla
+    def _mostrar_ventana_preview(self):
+        """Construir solo las filas visibles de la tabla"""
+        total = len(self._posiciones_preview)
+        self._inicio_preview = max(0, min(self._inicio_preview, total - FILAS_VISTA_PREVIA))
+        ventana = self._posiciones_preview[self._inicio_preview:self._inicio_preview + FILAS_VISTA_PREVIA]
+        
+        # Limpiar tabla (como mucho FILAS_VISTA_PREVIA filas)
         for item in self.tree.get_children():
             self.tree.delete(item)
         
-        # Agregar datos
-        for contacto in self.contactos[:20]:  # Mostrar solo los primeros 20
-            # Preparar información de matrículas para mostrar
-            if contacto.get('consolidado', False) and 'matriculas' in contacto:
-                matriculas_mostrar = ', '.join(contacto['matriculas'][:3])  # Mostrar solo las primeras 3
-                if len(contacto['matriculas']) > 3:
-                    matriculas_mostrar += f" (+{len(contacto['matriculas']) - 3} más)"
-            else:
-                matriculas_mostrar = contacto['matricula']
-            
-            # Preparar información de ocupantes
-            if contacto.get('consolidado', False) and 'ocupantes_total' in contacto:
-                ocupantes_mostrar = f"{contacto['ocupantes_total']} total"
-            else:
-                ocupantes_mostrar = contacto.get('ocupantes', 'Sin especificar')
-            
-            # Agregar indicador de consolidación al nombre
-            nombre_mostrar = contacto['nombre']
-            if contacto.get('consolidado', False):
-                nombre_mostrar += f" (🔗 {contacto['reservas_count']} reservas)"
-            
-            self.tree.insert('', tk.END, values=(
-                nombre_mostrar,
-                contacto['telefono'],
-                matriculas_mostrar,
-                contacto['hora_entrada'],
-                contacto.get('tipo_plaza', 'Sin especificar'),
-                ocupantes_mostrar
-            ))
+        # Agregar datos (nombre con 🔗 y matrículas/ocupantes resumidos en los consolidados)
+        contactos = self._indice_preview.contactos
+        for posicion in ventana.tolist():
+            self.tree.insert('', tk.END, values=contactos[posicion].valores_vista())
+        
+        if total:
+            self.preview_scroll.set(self._inicio_preview / total, (self._inicio_preview + len(ventana)) / total)
+            self.preview_info_label.config(
+                text=f"Mostrando {self._inicio_preview + 1}-{self._inicio_preview + len(ventana)} "
+                     f"de {total} (total: {len(contactos)})")
+        else:
+            self.preview_scroll.set(0, 1)
+            self.preview_info_label.config(text=f"Sin resultados (total: {len(contactos)})" if contactos
+                                           else "Sin contactos")
+        
+        horas = [TODAS_LAS_HORAS] + self._indice_preview.horas()
+        if list(self.preview_hora_combo.cget('values')) != horas:
+            self.preview_hora_combo.config(values=horas)
+    
+    def _desplazar_preview(self, accion, cantidad, unidad=None):
+        """Comando de la barra de desplazamiento virtual ('moveto' o 'scroll')"""
+        total = len(self._posiciones_preview)
+        if accion == "moveto":
+            self._inicio_preview = int(float(cantidad) * total)
+        elif accion == "scroll":
+            paso = FILAS_VISTA_PREVIA if unidad == "pages" else 1
+            self._inicio_preview += int(cantidad) * paso
+        self._mostrar_ventana_preview()
+    
+    def _rueda_preview(self, event):
+        """Desplazar la ventana de la vista previa con la rueda del ratón"""
+        arriba = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self._inicio_preview += -FILAS_POR_RUEDA_VISTA_PREVIA if arriba else FILAS_POR_RUEDA_VISTA_PREVIA
+        self._mostrar_ventana_preview()
+        return "break"
+    
+    def _ordenar_preview(self, columna):
+        """Ordenar por una columna; un segundo clic invierte el orden y un tercero lo quita"""
+        if self._orden_preview != columna:
+            self._orden_preview, self._orden_descendente = columna, False
+        elif not self._orden_descendente:
+            self._orden_descendente = True
+        else:
+            self._orden_preview, self._orden_descendente = None, False
+        
+        for col in COLUMNAS_VISTA:
+            flecha = ""
+            if col == self._orden_preview:
+                flecha = " ▼" if self._orden_descendente else " ▲"
+            self.tree.heading(col, text=col + flecha)
+        self._refrescar_preview()
     
     def load_template(self, event=None):
         """Cargar plantilla seleccionada"""
@@ -1056,7 +1053,6 @@ class WhatsAppSenderGUIMejorado:
         
         # Crear ventana de vista previa
         preview_window = tk.Toplevel(self.root)
-        preview_window.title("👁️ Vista Previa del Mensaje")
         preview_window.geometry("600x400")
         preview_window.configure(bg="#ffffff")
         
@@ -1064,16 +1060,12 @@ class WhatsAppSenderGUIMejorado:
         contacto = self.contactos[0]
         
         # Verificar si es un contacto consolidado
-        if contacto.get('consolidado', False):
-            mensaje = self.crear_mensaje_consolidado(contacto)
-            titulo_extra = f" (Consolidado: {contacto['reservas_count']} reservas)"
+        mensaje = self.crear_mensaje(contacto)
+        if contacto.consolidado:
+            titulo_extra = f" (Consolidado: {contacto.reservas_count} reservas)"
         else:
-            mensaje = self.crear_mensaje_personalizado(
-                contacto['nombre'], 
-                contacto['matricula'], 
-                contacto['hora_entrada']
-            )
             titulo_extra = ""
+        preview_window.title(f"👁️ Vista Previa del Mensaje{titulo_extra}")
         
         # Mostrar mensaje con formato preservado
         text_widget = scrolledtext.ScrolledText(preview_window, wrap=tk.WORD,
@@ -1086,10 +1078,10 @@ class WhatsAppSenderGUIMejorado:
         
         # Agregar información sobre el formato y consolidación
         info_text = "✅ Formato preservado - Saltos de línea y espacios mantenidos"
-        if contacto.get('consolidado', False):
-            info_text += f"\n🔗 Contacto consolidado: {contacto['reservas_count']} reservas agrupadas"
-            info_text += f"\n📋 Matrículas: {', '.join(contacto['matriculas'])}"
-            info_text += f"\n👥 Total ocupantes: {contacto['ocupantes_total']}"
+        if contacto.consolidado:
+            info_text += f"\n🔗 Contacto consolidado: {contacto.reservas_count} reservas agrupadas"
+            info_text += f"\n📋 Matrículas: {', '.join(contacto.matriculas)}"
+            info_text += f"\n👥 Total ocupantes: {contacto.ocupantes_total}"
         
         info_label = tk.Label(preview_window, 
                              text=info_text,
@@ -1119,118 +1111,108 @@ class WhatsAppSenderGUIMejorado:
             text_widget.insert(1.0, plantilla)
             text_widget.config(state=tk.DISABLED)
     
-    def crear_mensaje_personalizado(self, nombre, matricula, hora, ocupantes="Sin especificar"):
-        """Crea el mensaje usando la plantilla actual y limpia caracteres problemáticos"""
-        try:
-            from datetime import datetime
-            fecha_actual = datetime.now().strftime("%d-%m-%Y")
-            
-            # Obtener plantilla preservando saltos de línea
-            plantilla = self.template_text.get(1.0, tk.END)
-            
-            # Reemplazar variables en la plantilla
-            mensaje = plantilla.format(
-                nombre=nombre,
-                matricula=matricula,
-                hora=hora,
-                fecha_actual=fecha_actual,
-                ocupantes=ocupantes
-            )
-            
-            # Limpiar caracteres Unicode problemáticos preservando formato y emojis
-            mensaje_limpio = self.limpiar_caracteres_unicode(mensaje)
-            
-            # Verificar si se preservaron los emojis
-            emojis_originales = [char for char in mensaje if ord(char) > 0xFFFF]
-            emojis_preservados = [char for char in mensaje_limpio if ord(char) > 0xFFFF]
-            
-            if emojis_originales and len(emojis_preservados) == len(emojis_originales):
-                self.log_message(f"    ✅ Emojis preservados correctamente: {len(emojis_preservados)} emojis")
-            elif emojis_originales and len(emojis_preservados) < len(emojis_originales):
-                self.log_message(f"    ⚠️ Algunos emojis se perdieron: {len(emojis_preservados)}/{len(emojis_originales)} preservados")
+    def compilar_plantilla(self):
+        """
+        Leer la plantilla del editor y compilarla (solo desde el hilo de Tk).
+        
+        Returns:
+            PlantillaCompilada: Plantilla lista para rellenar con cada contacto
             
-            return mensaje_limpio
-        except Exception as e:
-            return f"Error en la plantilla: {str(e)}"
+        Raises:
+            TemplateError: Si la plantilla usa variables desconocidas o llaves mal cerradas
+        """
+        # Obtener plantilla preservando saltos de línea
+        plantilla = self.template_text.get(1.0, tk.END)
+        try:
+            return PlantillaCompilada(plantilla)
+        except (KeyError, ValueError, IndexError) as e:
+            raise TemplateError(f"Error en la plantilla: {str(e)}")
     
-    def crear_mensaje_consolidado(self, contacto):
+    def crear_mensaje(self, contacto, plantilla=None):
         """
-        Crear mensaje personalizado para contactos consolidados.
+        Crear el mensaje de un contacto (normal o consolidado).
         
         Args:
-            contacto (dict): Contacto consolidado con múltiples matrículas
+            contacto (Contacto): Contacto destinatario
+            plantilla (PlantillaCompilada): Plantilla ya compilada; si no se indica,
+                se compila la del editor
             
         Returns:
-            str: Mensaje formateado para contacto consolidado
+            str: Mensaje formateado, o el texto del error si la plantilla no es válida
         """
         try:
-            from datetime import datetime
-            fecha_actual = datetime.now().strftime("%d-%m-%Y")
-            
-            # Obtener plantilla preservando saltos de línea
-            plantilla = self.template_text.get(1.0, tk.END)
-            
-            # Preparar información de matrículas
-            if contacto.get('consolidado', False) and 'matriculas' in contacto:
-                matriculas = contacto['matriculas']
-                if len(matriculas) == 1:
-                    matricula_texto = matriculas[0]
-                elif len(matriculas) == 2:
-                    matricula_texto = f"{matriculas[0]} y {matriculas[1]}"
-                else:
-                    matricula_texto = f"{', '.join(matriculas[:-1])} y {matriculas[-1]}"
-                
-                # Agregar información de consolidación
-                if len(matriculas) > 1:
-                    matricula_texto += f" ({len(matriculas)} vehículos)"
-            else:
-                matricula_texto = contacto['matricula']
-            
-            # Preparar información de ocupantes
-            ocupantes_texto = contacto.get('ocupantes', 'Sin especificar')
-            if contacto.get('consolidado', False) and 'ocupantes_total' in contacto:
-                ocupantes_texto = f"{contacto['ocupantes_total']} personas total"
-            
-            # Reemplazar variables en la plantilla
-            mensaje = plantilla.format(
-                nombre=contacto['nombre'],
-                matricula=matricula_texto,
-                hora=contacto['hora_entrada'],
-                fecha_actual=fecha_actual,
-                ocupantes=ocupantes_texto
-            )
-            
-            # Limpiar caracteres Unicode problemáticos preservando formato y emojis
-            mensaje_limpio = self.limpiar_caracteres_unicode(mensaje)
-            
-            return mensaje_limpio
+            if plantilla is None:
+                plantilla = self.compilar_plantilla()
+            return plantilla.render(contacto)
+        except TemplateError as e:
+            return str(e)
         except Exception as e:
-            return f"Error en la plantilla consolidada: {str(e)}"
+            return f"Error en la plantilla: {str(e)}"
+    
+    def crear_mensaje_personalizado(self, nombre, matricula, hora, ocupantes="Sin especificar"):
+        """Crea el mensaje de prueba con la plantilla actual y unos datos de ejemplo"""
+        mensaje = self.crear_mensaje(Contacto(nombre, "", matricula, hora, "", "", ocupantes))
+        
+        # Verificar si se preservaron los emojis
+        emojis = contar_emojis(mensaje)
+        if emojis:
+            self.log_message(f"    ✅ Emojis preservados correctamente: {emojis} emojis")
+        return mensaje
     
     def start_sending(self):
-        """Iniciar el proceso de envío"""
-        if not self.contactos:
-            messagebox.showerror("Error", "No hay contactos para enviar. Analiza los datos primero.")
+        """
+        Iniciar el proceso de envío.
+        
+        La plantilla se lee y se compila aquí (hilo de Tk); los mensajes se
+        preparan en segundo plano mientras se abre Chrome, y si el análisis del
+        archivo sigue en curso se usan sus contactos en cuanto termine.
+        """
+        try:
+            politica = PoliticaEnvio.desde_delays(
+                self.delay_min.get(), self.delay_max.get(), self.max_por_hora.get(),
+                self.max_por_dia.get(), self.horas_silencio.get())
+            antelacion = self.antelacion_horas.get()
+            if antelacion < 0:
+                raise ValueError("La antelación no puede ser negativa")
+        except (tk.TclError, ValueError) as e:
+            messagebox.showerror("Error", f"Configuración de envío no válida: {str(e)}")
             return
         
-        # Verificar progreso guardado
-        progreso_prev = self.cargar_progreso()
-        if progreso_prev > 0 and progreso_prev < len(self.contactos):
-            if self.mostrar_dialogo_progreso(progreso_prev, len(self.contactos)):
-                self.log_message(f"🔄 Reanudando envío desde contacto {progreso_prev + 1}")
-                self.indice_inicio = progreso_prev
+        # Un envío interrumpido se reanuda desde su bandeja de salida, sin volver a preparar los mensajes
+        bandeja = BandejaSalida.cargar(BANDEJA_SALIDA_FILE)
+        if bandeja and bandeja.pendientes():
+            if self.mostrar_dialogo_progreso(len(bandeja) - len(bandeja.pendientes()), len(bandeja)):
+                self.log_message(f"🔄 Reanudando envío desde la bandeja de salida "
+                                 f"({len(bandeja.pendientes())} mensajes pendientes)")
             else:
                 self.borrar_progreso()
-                self.indice_inicio = 0
+                bandeja = None
                 self.log_message("🔄 Iniciando envío desde el principio")
         else:
-            self.indice_inicio = 0
+            bandeja = None
+        
+        plantilla = None
+        analisis_en_curso = bandeja is None and self._analisis_en_curso()
+        if bandeja is None:
+            if not self.contactos and not analisis_en_curso:
+                messagebox.showerror("Error", "No hay contactos para enviar. Analiza los datos primero.")
+                return
+            try:
+                plantilla = self.compilar_plantilla()
+            except TemplateError as e:
+                messagebox.showerror("Error", str(e))
+                return
             self.log_message("🚀 Iniciando nuevo envío")
         
         # Confirmar envío automático
-        contactos_restantes = len(self.contactos) - self.indice_inicio
+        if analisis_en_curso:
+            pregunta = ("El análisis del archivo sigue en curso.\n"
+                        "¿Abrir WhatsApp Web ya y enviar los mensajes a todos los contactos en cuanto termine?")
+        else:
+            contactos_restantes = len(bandeja.pendientes()) if bandeja else len(self.contactos)
+            pregunta = f"¿Enviar {contactos_restantes} mensajes automáticamente?"
         respuesta = messagebox.askyesno("Confirmar Envío Automático", 
-            f"¿Enviar {contactos_restantes} mensajes automáticamente?\n\n"
+            f"{pregunta}\n\n"
             "El programa abrirá cada chat y enviará el mensaje automáticamente\n"
             "usando send_keys() y Keys.ENTER (método natural de Selenium).")
         if not respuesta:
@@ -1241,798 +1223,111 @@ class WhatsAppSenderGUIMejorado:
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
         
-        thread = threading.Thread(target=self.sending_thread)
+        # Datos de la interfaz que necesita el envío, leídos ahora desde el hilo de Tk
+        try:
+            cuentas = self.num_cuentas.get()
+        except tk.TclError:
+            cuentas = 1
+        self._envio = EnvioWhatsApp(self.log_message, politica, antelacion, cuentas, SESSION_DIR, bandeja,
+                                    self.mantener_navegador.get())
+        preparacion = None
+        if bandeja is None:
+            preparacion = (plantilla, None if analisis_en_curso else self.contactos,
+                           {"archivo": self.excel_path.get(), "plantilla": self.plantilla_actual.get()})
+        
+        thread = threading.Thread(target=self.sending_thread, args=(preparacion,))
         thread.daemon = True
         thread.start()
+        self._hilo_envio = thread
+        self.root.after(int(INTERVALO_PROGRESO_ENVIO * 1000), self._vigilar_envio)
+    
+    def _vigilar_envio(self):
+        """Mostrar el progreso común de todas las cuentas (hilo de Tk)"""
+        bandeja = self._envio.bandeja
+        if bandeja is not None and len(bandeja):
+            procesados = len(bandeja.resultados)
+            self.progress['value'] = procesados / len(bandeja) * 100
+            cuentas = " | ".join(f"{nombre}: {p['estado']}, {p['enviados']}✅ {p['errores']}❌ de {p['total']}"
+                                 for nombre, p in list(self._envio.progreso_cuentas.items()))
+            self.sending_status_label.config(text=f"📤 {procesados}/{len(bandeja)}" + (f" · {cuentas}" if cuentas else ""))
+        if self._hilo_envio.is_alive():
+            self.root.after(int(INTERVALO_PROGRESO_ENVIO * 1000), self._vigilar_envio)
+    
+    def _preparar_bandeja(self, plantilla, contactos, origen):
+        """
+        Preparar todos los mensajes del envío y guardarlos en la bandeja de salida.
+        
+        Se ejecuta en un hilo aparte mientras se abre Chrome; no accede a ningún widget.
+        Si el análisis sigue en curso espera a que termine y el resto lo hace
+        EnvioWhatsApp.preparar_bandeja.
+        
+        Args:
+            plantilla (PlantillaCompilada): Plantilla compilada desde el hilo de Tk
+            contactos (list): Contactos a enviar, o None para esperar al análisis en curso
+            origen (dict): Archivo y nombre de plantilla para la cabecera de la bandeja
+            
+        Returns:
+            BandejaSalida: Bandeja nueva, o None si no hay contactos o no se pudo guardar
+        """
+        if contactos is None:
+            self.log_message("⏳ Esperando a que termine el análisis del archivo...")
+            self._hilo_analisis.join()
+            estado, contactos = self._resultado_analisis or ("error", None)
+            if estado != "ok" or not contactos:
+                self.log_message("❌ El análisis no terminó con contactos para enviar")
+                return None
+        return self._envio.preparar_bandeja(plantilla, contactos, origen)
     
     def stop_sending(self):
         """Detener el proceso de envío"""
         self.is_running = False
+        if self._envio is not None:
+            self._envio.detener()
         self.log_message("⏹️ Deteniendo envío...")
         self.start_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
     
-    def sending_thread(self):
+    def sending_thread(self, preparacion=None):
         """
-        Hilo principal de envío con Selenium.
-        
-        Esta función ejecuta el proceso completo de envío de mensajes:
-        1. Inicializa Chrome con configuración robusta
-        2. Conecta a WhatsApp Web
-        3. Procesa todos los contactos y envía mensajes
-        4. Maneja errores y actualiza progreso
+        Hilo principal de envío con Selenium (ver EnvioWhatsApp.enviar).
         
-        El proceso se ejecuta en un hilo separado para mantener
-        la interfaz de usuario responsiva.
+        Mientras se abre Chrome y se conecta WhatsApp Web, otro hilo prepara
+        la bandeja de salida (espera al análisis si sigue en curso y rellena
+        la plantilla); el primer mensaje sale en cuanto las dos cosas están
+        listas. El proceso se ejecuta en un hilo separado para mantener la
+        interfaz de usuario responsiva.
         
-        Raises:
-            ChromeInitializationError: Si no se puede inicializar Chrome
-            WhatsAppConnectionError: Si no se puede conectar a WhatsApp Web
-            MessageSendError: Si hay errores al enviar mensajes
+        Args:
+            preparacion (tuple): Argumentos de _preparar_bandeja, o None al reanudar
+                desde una bandeja ya preparada
         """
-        driver = None
         try:
-            self._log_inicio_envio()
-            driver = self._inicializar_chrome()
-            self._conectar_whatsapp(driver)
-            self._procesar_contactos(driver)
+            preparar = None
+            if preparacion is not None:
+                preparar = lambda: self._preparar_bandeja(*preparacion)
+            bandeja = self._envio.enviar(preparar)
+            
+            # Borrar progreso al completar (si se detuvo, la bandeja queda para reanudar)
+            if bandeja is not None and not bandeja.pendientes():
+                self.borrar_progreso()
             
-        except TimeoutException:
-            self.log_message("⏰ Tiempo de espera agotado. No se pudo conectar a WhatsApp Web")
         except Exception as e:
             self.log_message(f"❌ Error en el envío: {str(e)}")
         finally:
-            if driver:
-                driver.quit()
             self.cleanup()
     
-    def _log_inicio_envio(self):
-        """Registrar mensajes de inicio del envío"""
-        self.log_message("🚀 Iniciando envío automático con send_keys() y Keys.ENTER...")
-        self.log_message("ℹ️ Usando método natural de Selenium: send_keys() para escribir y Keys.ENTER para enviar")
-        self.log_message("ℹ️ Soporte completo para Unicode, emojis y caracteres especiales")
-        self.log_message("ℹ️ Emojis preservados automáticamente en todas las plantillas")
-        self.log_message("ℹ️ Detectando envío automático de WhatsApp Web para evitar escritura duplicada")
-        self.log_message("📱 Configurando Chrome...")
-    
-    def _inicializar_chrome(self):
-        """Inicializar Chrome con configuración robusta"""
-        from selenium import webdriver
-        from selenium.webdriver.chrome.options import Options
-        from selenium.webdriver.chrome.service import Service
-        from webdriver_manager.chrome import ChromeDriverManager
-        import os
-        
-        # Configurar opciones de Chrome
-        chrome_options = self._configurar_opciones_chrome()
-        
-        # Inicializar driver con configuración robusta
-        driver = None
-        try:
-            self.log_message("🔧 Configurando Chrome...")
-            
-            # Método 1: Usar webdriver-manager con configuración específica
-            try:
-                service = Service(ChromeDriverManager(version="latest").install())
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-                self.log_message("✅ Chrome iniciado con webdriver-manager")
-            except Exception as e1:
-                self.log_message(f"⚠️ webdriver-manager falló: {str(e1)}")
-                
-                # Método 2: Usar ChromeDriver directo
-                try:
-                    driver = webdriver.Chrome(options=chrome_options)
-                    self.log_message("✅ Chrome iniciado directamente")
-                except Exception as e2:
-                    self.log_message(f"⚠️ Chrome directo falló: {str(e2)}")
-                    
-                    # Método 3: Usar configuración mínima
-                    try:
-                        chrome_options_minimal = Options()
-                        chrome_options_minimal.add_argument("--no-sandbox")
-                        chrome_options_minimal.add_argument("--disable-dev-shm-usage")
-                        driver = webdriver.Chrome(options=chrome_options_minimal)
-                        self.log_message("✅ Chrome iniciado con configuración mínima")
-                    except Exception as e3:
-                        self.log_message(f"⚠️ Configuración mínima falló: {str(e3)}")
-                        raise ChromeInitializationError("No se pudo inicializar Chrome. Verifica la instalación.")
-            
-            if driver:
-                driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                
-        except Exception as e:
-            self.log_message(f"❌ Error crítico inicializando Chrome: {str(e)}")
-            raise ChromeInitializationError(f"Error inicializando Chrome: {str(e)}")
-        
-        return driver
-    
-    def _configurar_opciones_chrome(self):
-        """Configurar opciones de Chrome con persistencia de sesión"""
-        from selenium.webdriver.chrome.options import Options
-        import os
-        
-        chrome_options = Options()
-        
-        # Directorio para persistir la sesión de WhatsApp Web
-        user_data_dir = os.path.join(os.getcwd(), "whatsapp_session")
-        if not os.path.exists(user_data_dir):
-            os.makedirs(user_data_dir)
-        
-        chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
-        chrome_options.add_argument("--start-maximized")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--disable-web-security")
-        chrome_options.add_argument("--allow-running-insecure-content")
-        chrome_options.add_argument("--disable-features=VizDisplayCompositor")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_experimental_option("prefs", {
-            "profile.default_content_setting_values.notifications": 2,
-            "profile.default_content_settings.popups": 0
-        })
-        
-        return chrome_options
-    
-    def _conectar_whatsapp(self, driver):
-        """Conectar a WhatsApp Web"""
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-        import time
-        
-        self.log_message("🌐 Abriendo WhatsApp Web...")
-        driver.get("https://web.whatsapp.com")
-        
-        # Esperar a que se cargue WhatsApp Web y detectar si ya está conectado
-        self.log_message("🔍 Verificando estado de conexión...")
-        
-        # Esperar a que aparezca el chat list o el código QR
-        wait = WebDriverWait(driver, TIMEOUT_WHATSAPP_CONNECTION)  # 30 segundos para verificar conexión
-        
-        try:
-            # Intentar detectar si ya está conectado (chat list visible)
-            chat_list = wait.until(EC.presence_of_element_located((By.ID, "pane-side")))
-            self.log_message("✅ WhatsApp Web ya está conectado! (sesión persistente)")
-            self.log_message("📱 No es necesario escanear el código QR")
-        except:
-            # Si no está conectado, mostrar código QR
-            self.log_message("📱 Código QR detectado - Escanea con tu teléfono")
-            self.log_message("⏳ Esperando escaneo del código QR...")
-            
-            # Esperar hasta 2 minutos para escanear QR
-            wait_qr = WebDriverWait(driver, TIMEOUT_QR_SCAN)
-            try:
-                chat_list = wait_qr.until(EC.presence_of_element_located((By.ID, "pane-side")))
-                self.log_message("✅ WhatsApp Web conectado exitosamente!")
-                self.log_message("💾 Sesión guardada para futuros usos")
-            except:
-                self.log_message("❌ Tiempo agotado para escanear código QR")
-                raise WhatsAppConnectionError("No se pudo conectar a WhatsApp Web - Tiempo agotado para escanear QR")
-        
-        # Pausa inicial para asegurar que WhatsApp Web esté completamente cargado
-        self.log_message("⏳ Esperando a que WhatsApp Web esté completamente listo...")
-        time.sleep(10)
-        self.log_message("📤 Iniciando envío automático de mensajes...")
-    
-    def _procesar_contactos(self, driver):
-        """Procesar todos los contactos para envío"""
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.common.keys import Keys
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-        from urllib.parse import quote
-        import time
-        import random
-        
-        # Contador de mensajes enviados
-        enviados = 0
-        errores = 0
-        
-        for i, contacto in enumerate(self.contactos[self.indice_inicio:], start=self.indice_inicio):
-            if not self.is_running:
-                break
-            
-            try:
-                resultado = self._enviar_mensaje_contacto(driver, contacto, i)
-                if resultado:
-                    enviados += 1
-                else:
-                    errores += 1
-                
-                # Log de progreso
-                self.log_message(f"    📊 Progreso: {enviados} enviados, {errores} errores")
-                
-                # Guardar progreso
-                self.guardar_progreso(i)
-                
-                # Actualizar progreso
-                progress = ((i + 1) / len(self.contactos)) * 100
-                self.progress['value'] = progress
-                self.root.update_idletasks()
-                
-                # Pausa entre mensajes
-                delay = random.randint(self.delay_min.get(), self.delay_max.get())
-                self.log_message(f"    ⏳ Pausa de {delay}s...")
-                time.sleep(delay)
-                
-            except Exception as e:
-                errores += 1
-                self.log_message(f"❌ Error con {contacto['nombre']}: {str(e)}")
-                
-                # Si hay un error crítico, preguntar si continuar
-                if "chrome not reachable" in str(e).lower() or "session deleted" in str(e).lower():
-                    respuesta = messagebox.askyesno("Error Crítico", 
-                        f"Error crítico detectado: {str(e)}\n¿Deseas continuar con el siguiente contacto?")
-                    if not respuesta:
-                        break
-                continue
-        
-        self.log_message(f"✅ Envío completado: {enviados} mensajes enviados, {errores} errores")
-        
-        # Borrar progreso al completar
-        self.borrar_progreso()
-    
-    def _enviar_mensaje_contacto(self, driver, contacto, indice):
-        """Enviar mensaje a un contacto específico"""
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.common.keys import Keys
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-        from urllib.parse import quote
-        import time
-        import random
-        
-        self.log_message(f"📤 [{indice+1}/{len(self.contactos)}] Enviando mensaje a {contacto['nombre']}")
-        
-        # Verificar si es un contacto consolidado
-        if contacto.get('consolidado', False):
-            self.log_message(f"    🔗 Enviando mensaje consolidado ({contacto['reservas_count']} reservas)")
-            mensaje = self.crear_mensaje_consolidado(contacto)
-        else:
-            # Crear mensaje personalizado normal
-            mensaje = self.crear_mensaje_personalizado(
-                contacto['nombre'], 
-                contacto['matricula'], 
-                contacto['hora_entrada'],
-                contacto.get('ocupantes', 'Sin especificar')
-            )
-        
-        # Verificar si el mensaje contiene emojis
-        emojis_en_mensaje = [char for char in mensaje if ord(char) > 0xFFFF]
-        if emojis_en_mensaje:
-            self.log_message(f"    😊 Mensaje contiene {len(emojis_en_mensaje)} emojis")
-        
-        # Método mejorado: Usar URL directa de WhatsApp y envío automático
-        telefono_formateado = self.formatear_telefono_whatsapp(contacto['telefono'])
-        numero_limpio = telefono_formateado.replace('+', '').replace(' ', '')
-        url_whatsapp = f"https://web.whatsapp.com/send?phone={numero_limpio}&text={quote(mensaje)}"
-
-        self.log_message(f"    🌐 Abriendo chat directo para {contacto['nombre']}")
-        driver.get(url_whatsapp)
-
-        # Tiempo de espera especial para el primer contacto
-        if indice == 0:
-            self.log_message(f"    ⏳ Esperando más tiempo para el primer contacto...")
-            time.sleep(TIMEOUT_FIRST_CONTACT)  # Más tiempo para el primer contacto
-        else:
-            time.sleep(random.randint(TIMEOUT_BETWEEN_MESSAGES_MIN, TIMEOUT_BETWEEN_MESSAGES_MAX))  # Más tiempo para procesar
-
-        # Esperar que aparezca el cuadro de texto y enviar automáticamente
-        try:
-            input_box = WebDriverWait(driver, TIMEOUT_FIELD_SEARCH).until(
-                EC.presence_of_element_located((
-                    By.XPATH, '//div[@contenteditable="true"][@data-tab="10"]'
-                ))
-            )
-            input_box.send_keys(Keys.ENTER)
-            self.log_message(f"    ✅ Mensaje enviado automáticamente a {contacto['nombre']}")
-            return True
-        except Exception as e:
-            self.log_message(f"    ❌ No se pudo enviar el mensaje a {contacto['nombre']}: {e}")
-            return False
-    
-
     def formatear_telefono_whatsapp(self, telefono):
-        """Formatear número de teléfono para WhatsApp - Mejorado para números extranjeros"""
-        # Si ya empieza con +, devolverlo tal como está
-        if str(telefono).startswith('+'):
-            return str(telefono)
-        
-        # Limpiar el número
-        telefono_limpio = ''.join(filter(str.isdigit, str(telefono)))
-        
-        # Si empieza con 00, convertir a +
-        if telefono_limpio.startswith('00'):
-            return f"+{telefono_limpio[2:]}"
-        
-        # Si empieza con 34 (España), mantenerlo
-        if telefono_limpio.startswith('34'):
-            return f"+{telefono_limpio}"
-        
-        # Si empieza con 6 o 7 (móvil español), agregar 34
-        if telefono_limpio.startswith(('6', '7')) and len(telefono_limpio) == 9:
-            return f"+34{telefono_limpio}"
-        
-        # Si ya tiene 9 dígitos y empieza con 6 o 7, agregar 34
-        if len(telefono_limpio) == 9 and telefono_limpio[0] in ['6', '7']:
-            return f"+34{telefono_limpio}"
-        
-        # Si ya tiene el formato correcto con 34, devolverlo
-        if telefono_limpio.startswith('34') and len(telefono_limpio) >= 11:
-            return f"+{telefono_limpio}"
-        
-        # Para números extranjeros, verificar si ya tienen código de país
-        # Si tiene 10-15 dígitos y no empieza con 34, asumir que ya tiene código de país
-        if len(telefono_limpio) >= 10 and len(telefono_limpio) <= 15 and not telefono_limpio.startswith('34'):
-            return f"+{telefono_limpio}"
-        
-        # Si tiene menos de 9 dígitos, probablemente es un número español sin código
-        if len(telefono_limpio) < 9:
-            return f"+34{telefono_limpio}"
-        
-        # Por defecto, agregar 34 (España)
-        return f"+34{telefono_limpio}"
+        """Formatear número de teléfono para WhatsApp (formato E.164)"""
+        return formatear_telefono_whatsapp(telefono)
     
     def limpiar_caracteres_unicode(self, texto):
         """Limpiar caracteres Unicode problemáticos para ChromeDriver preservando formato y emojis"""
         try:
-            # Convertir a string si no lo es
-            if not isinstance(texto, str):
-                texto = str(texto)
-            
-            # Preservar emojis y caracteres Unicode válidos
-            # Los emojis están en rangos específicos de Unicode
-            texto_limpio = ""
-            for char in texto:
-                # Preservar emojis (rangos Unicode de emojis)
-                # Emojis básicos: U+1F600-U+1F64F (Emoticons)
-                # Emojis varios: U+1F300-U+1F5FF (Miscellaneous Symbols and Pictographs)
-                # Emojis transporte: U+1F680-U+1F6FF (Transport and Map Symbols)
-                # Emojis varios suplementarios: U+1F900-U+1F9FF (Supplemental Symbols and Pictographs)
-                # Emojis símbolos: U+2600-U+26FF (Miscellaneous Symbols)
-                # Emojis dingbats: U+2700-U+27BF (Dingbats)
-                
-                char_code = ord(char)
-                
-                # Verificar si es un emoji válido usando constantes
-                es_emoji = any(start <= char_code <= end for start, end in EMOJI_RANGES)
-                
-                # Preservar caracteres BMP normales y emojis
-                if char_code <= 0xFFFF or es_emoji:
-                    texto_limpio += char
-                else:
-                    # Solo reemplazar caracteres problemáticos muy específicos
-                    # pero preservar saltos de línea
-                    if char == '\n':
-                        texto_limpio += '\n'
-                    elif char == '\t':
-                        texto_limpio += ' '  # Reemplazar tabs con espacios
-                    elif char_code > 0x10FFFF:  # Solo caracteres fuera del rango Unicode válido
-                        texto_limpio += " "
-                    else:
-                        # Preservar otros caracteres Unicode válidos
-                        texto_limpio += char
-            
-            # NO limpiar espacios múltiples para preservar formato
-            # Solo eliminar espacios al inicio y final
-            texto_limpio = texto_limpio.strip()
-            
-            return texto_limpio
+            return limpiar_caracteres_unicode(texto)
         except Exception as e:
             self.log_message(f"    ⚠️ Error limpiando caracteres Unicode: {str(e)}")
             # Si falla, devolver texto original sin caracteres problemáticos
             return "".join(char for char in texto if ord(char) <= 0x10FFFF)
-
-    def enviar_mensaje_automatico(self, driver, mensaje):
-        """Enviar mensaje usando send_keys() con Keys.ENTER"""
-        try:
-            self.log_message("    🔍 Preparando y enviando mensaje...")
-            
-            # Limpiar caracteres Unicode problemáticos preservando emojis
-            mensaje_limpio = self.limpiar_caracteres_unicode(mensaje)
-            if mensaje_limpio != mensaje:
-                self.log_message("    🔧 Mensaje limpiado de caracteres Unicode problemáticos (emojis preservados)")
-            
-            # Esperar a que la página cargue completamente
-            time.sleep(10)
-            
-            # Buscar el campo de texto
-            text_box = self.buscar_campo_texto(driver)
-            if not text_box:
-                return False
-            
-            # Verificar si el mensaje ya se envió automáticamente (URL directa)
-            if self.verificar_mensaje_enviado_automatico(driver):
-                self.log_message("    ✅ Mensaje enviado automáticamente por WhatsApp Web")
-                return True
-            # Verificar si el mensaje ya está presente en el campo (URL directa)
-            elif self.verificar_mensaje_ya_presente(driver, mensaje_limpio):
-                self.log_message("    ✅ Mensaje ya está en el campo de texto (URL directa)")
-                # Enviar el mensaje que ya está en el campo
-                self.log_message("    🚀 Enviando mensaje existente con Keys.ENTER...")
-                return self.enviar_con_enter(driver, text_box)
-            else:
-                # Escribir el mensaje usando send_keys()
-                self.log_message("    📝 Escribiendo mensaje con send_keys()...")
-                self.escribir_mensaje_con_send_keys(driver, text_box, mensaje_limpio)
-                
-                # Enviar el mensaje con Keys.ENTER
-                self.log_message("    🚀 Enviando mensaje con Keys.ENTER...")
-                return self.enviar_con_enter(driver, text_box)
-            
-        except Exception as e:
-            raise Exception(f"Error enviando mensaje: {str(e)}")
-    
-
-    
-    def buscar_campo_texto(self, driver):
-        """Buscar el campo de texto de WhatsApp Web con caché"""
-        try:
-            # Verificar caché primero
-            if 'campo_texto' in self._element_cache:
-                try:
-                    elemento = self._element_cache['campo_texto']
-                    # Verificar que el elemento aún es válido
-                    elemento.is_displayed()
-                    self.log_message(f"    ✅ Campo de texto encontrado en caché")
-                    return elemento
-                except:
-                    # Elemento ya no es válido, limpiar caché
-                    del self._element_cache['campo_texto']
-            
-            # Buscar elemento si no está en caché
-            selectores_texto = [
-                '//div[@contenteditable="true"][@data-tab="6"]',
-                '//div[@contenteditable="true"][@data-tab="10"]',
-                '//div[@contenteditable="true"][@role="textbox"]',
-                '//div[@contenteditable="true"]',
-                '//div[@data-testid="conversation-compose-box-input"]',
-                '//div[@title="Escribe un mensaje"]',
-                '//div[@contenteditable="true"][@data-tab="1"]'
-            ]
-            
-            for i, selector in enumerate(selectores_texto):
-                try:
-                    text_box = WebDriverWait(driver, TIMEOUT_FIELD_SEARCH).until(
-                        EC.presence_of_element_located((By.XPATH, selector))
-                    )
-                    # Guardar en caché
-                    self._element_cache['campo_texto'] = text_box
-                    self.log_message(f"    ✅ Campo de texto encontrado con selector {i+1} (guardado en caché)")
-                    return text_box
-                except Exception as e:
-                    self.log_message(f"    ⚠️ Selector {i+1} falló: {str(e)}")
-                    continue
-            
-            raise Exception("No se pudo encontrar el campo de texto")
-            
-        except Exception as e:
-            self.log_message(f"    ❌ Error buscando campo de texto: {str(e)}")
-            return None
-    
-    def limpiar_cache_elementos(self):
-        """Limpiar caché de elementos cuando sea necesario"""
-        self._element_cache.clear()
-        self.log_message("    🧹 Caché de elementos limpiado")
-    
-    def verificar_mensaje_ya_presente(self, driver, mensaje_limpio):
-        """Verificar si el mensaje ya está presente en el campo de texto"""
-        try:
-            # Primero verificar si ya hay mensajes recientes en el chat
-            if self.hay_mensajes_recientes_en_chat(driver):
-                self.log_message("    ⚠️ Detectados mensajes recientes en el chat - posible envío previo")
-                return True
-            
-            text_box = self.buscar_campo_texto(driver)
-            if not text_box:
-                return False
-            
-            texto_actual = text_box.get_attribute('innerHTML') or text_box.text or text_box.get_attribute('textContent') or ""
-            
-            # Comparar de manera más flexible
-            mensaje_para_comparar = mensaje_limpio.strip()
-            texto_para_comparar = texto_actual.strip()
-            
-            # Verificar si el mensaje ya está presente (al menos 80% del contenido)
-            if self.mensaje_ya_presente(texto_para_comparar, mensaje_para_comparar):
-                return True
-            
-            return False
-            
-        except Exception as e:
-            self.log_message(f"    ⚠️ Error verificando mensaje presente: {str(e)}")
-            return False
-    
-    def hay_mensajes_recientes_en_chat(self, driver):
-        """Verificar si hay mensajes recientes en el chat que indiquen envío previo"""
-        try:
-            # Verificar con JavaScript si hay mensajes recientes
-            hay_mensajes = driver.execute_script("""
-                // Buscar mensajes enviados recientemente
-                const mensajesEnviados = document.querySelectorAll('div[data-testid="msg-meta"].message-out');
-                if (mensajesEnviados.length > 0) {
-                    return true;
-                }
-                
-                // Buscar cualquier mensaje reciente
-                const mensajesRecientes = document.querySelectorAll('div[data-testid="msg-meta"]');
-                if (mensajesRecientes.length > 0) {
-                    // Verificar que el último mensaje tenga contenido sustancial
-                    const ultimoMensaje = mensajesRecientes[mensajesRecientes.length - 1];
-                    const contenido = ultimoMensaje.textContent || '';
-                    if (contenido.length > 30) { // Mensaje con contenido mínimo
-                        return true;
-                    }
-                }
-                
-                return false;
-            """)
-            return hay_mensajes
-            
-        except Exception as e:
-            self.log_message(f"    ⚠️ Error verificando mensajes recientes: {str(e)}")
-            return False
-    
-    def escribir_mensaje_con_send_keys(self, driver, text_box, mensaje_limpio):
-        """Escribir mensaje usando send_keys()"""
-        try:
-            # Limpiar el campo de texto de manera segura
-            try:
-                text_box.clear()
-                time.sleep(2)
-            except Exception as e:
-                self.log_message(f"    ⚠️ Error limpiando campo: {str(e)}")
-                # Intentar con JavaScript
-                try:
-                    driver.execute_script("arguments[0].innerHTML = '';", text_box)
-                    time.sleep(2)
-                except:
-                    pass
-            
-            # Hacer clic en el campo para enfocarlo
-            text_box.click()
-            time.sleep(1)
-            
-            # Escribir el mensaje usando send_keys() (método natural)
-            self.log_message(f"    📝 Escribiendo mensaje con send_keys()...")
-            text_box.send_keys(mensaje_limpio)
-            
-            # Esperar a que se complete la escritura
-            time.sleep(3)
-            
-            self.log_message(f"    ✅ Mensaje escrito correctamente con send_keys()")
-            
-        except Exception as e:
-            self.log_message(f"    ❌ Error escribiendo mensaje: {str(e)}")
-            raise Exception(f"Error escribiendo mensaje: {str(e)}")
-    
-    def enviar_con_enter(self, driver, text_box):
-        """Enviar mensaje usando Keys.ENTER"""
-        try:
-            # Asegurar que el campo esté enfocado
-            text_box.click()
-            time.sleep(1)
-            
-            # Enviar con Keys.ENTER
-            self.log_message(f"    🚀 Enviando con Keys.ENTER...")
-            text_box.send_keys(Keys.ENTER)
-            
-            # Esperar a que se procese el envío
-            time.sleep(5)
-            
-            # Verificar que se envió correctamente
-            if self.verificar_mensaje_enviado(driver):
-                self.log_message(f"    ✅ Mensaje enviado exitosamente con Keys.ENTER")
-                return True
-            else:
-                self.log_message(f"    ⚠️ Mensaje no confirmado, intentando método alternativo...")
-                return self.enviar_con_enter_alternativo(driver, text_box)
-                
-        except Exception as e:
-            self.log_message(f"    ❌ Error enviando con Keys.ENTER: {str(e)}")
-            return self.enviar_con_enter_alternativo(driver, text_box)
-    
-    def enviar_con_enter_alternativo(self, driver, text_box):
-        """Método alternativo para enviar con Enter usando ActionChains"""
-        try:
-            self.log_message(f"    🔄 Intentando método alternativo con ActionChains...")
-            
-            # Usar ActionChains para mayor confiabilidad
-            actions = ActionChains(driver)
-            actions.move_to_element(text_box).click().send_keys(Keys.ENTER).perform()
-            
-            # Esperar a que se procese el envío
-            time.sleep(5)
-            
-            # Verificar que se envió correctamente
-            if self.verificar_mensaje_enviado(driver):
-                self.log_message(f"    ✅ Mensaje enviado exitosamente con ActionChains")
-                return True
-            else:
-                self.log_message(f"    ❌ No se pudo confirmar el envío")
-                return False
-                
-        except Exception as e:
-            self.log_message(f"    ❌ Error con método alternativo: {str(e)}")
-            return False
-    
-
-    def mensaje_ya_presente(self, texto_campo, mensaje_esperado):
-        """Verificar si el mensaje ya está presente en el campo de texto"""
-        try:
-            # Si el campo está vacío, no está presente
-            if not texto_campo or not texto_campo.strip():
-                return False
-            
-            # Si el mensaje esperado está vacío, no está presente
-            if not mensaje_esperado or not mensaje_esperado.strip():
-                return False
-            
-            # Normalizar ambos textos para comparación
-            texto_normalizado = texto_campo.strip().lower()
-            mensaje_normalizado = mensaje_esperado.strip().lower()
-            
-            # Método 1: Verificar si el mensaje completo está presente
-            if mensaje_normalizado in texto_normalizado:
-                return True
-            
-            # Método 2: Verificar si al menos 80% del contenido coincide
-            palabras_mensaje = set(mensaje_normalizado.split())
-            palabras_campo = set(texto_normalizado.split())
-            
-            if palabras_mensaje:
-                palabras_coincidentes = palabras_mensaje.intersection(palabras_campo)
-                porcentaje_coincidencia = len(palabras_coincidentes) / len(palabras_mensaje)
-                
-                if porcentaje_coincidencia >= 0.8:  # 80% de coincidencia
-                    return True
-            
-            # Método 3: Verificar si hay una coincidencia parcial significativa
-            # Buscar frases clave del mensaje en el campo
-            frases_clave = mensaje_normalizado.split('\n')[:3]  # Primeras 3 líneas
-            frases_encontradas = 0
-            
-            for frase in frases_clave:
-                if frase.strip() and frase.strip() in texto_normalizado:
-                    frases_encontradas += 1
-            
-            if frases_clave and frases_encontradas >= len(frases_clave) * 0.7:  # 70% de frases
-                return True
-            
-            return False
-            
-        except Exception as e:
-            self.log_message(f"    ⚠️ Error verificando mensaje presente: {str(e)}")
-            return False
-    
-    def verificar_mensaje_enviado_automatico(self, driver):
-        """Verificar si el mensaje se envió automáticamente por WhatsApp Web"""
-        try:
-            # Esperar un poco más para que se procese completamente
-            time.sleep(3)
-            
-            # Verificar si el campo de texto está vacío (indicador principal de envío automático)
-            text_box = None
-            try:
-                text_box = driver.find_element(By.XPATH, '//div[@contenteditable="true"][@data-tab="6"]')
-            except:
-                try:
-                    text_box = driver.find_element(By.XPATH, '//div[@contenteditable="true"]')
-                except:
-                    pass
-            
-            if text_box:
-                texto_actual = text_box.get_attribute('innerHTML') or text_box.text or text_box.get_attribute('textContent') or ""
-                if not texto_actual.strip():
-                    return True
-            
-            # Verificar con JavaScript para mayor precisión
-            try:
-                mensaje_enviado = driver.execute_script("""
-                    // Verificar si el campo de texto está vacío (indicador principal de envío automático)
-                    const textBox = document.querySelector('div[contenteditable="true"]');
-                    if (textBox && (!textBox.textContent || textBox.textContent.trim() === '')) {
-                        return true;
-                    }
-                    
-                    // Verificar si hay mensajes enviados recientemente (últimos 10 segundos)
-                    const mensajesEnviados = document.querySelectorAll('div[data-testid="msg-meta"].message-out');
-                    if (mensajesEnviados.length > 0) {
-                        // Verificar que el mensaje sea reciente
-                        const ultimoMensaje = mensajesEnviados[mensajesEnviados.length - 1];
-                        const timestamp = ultimoMensaje.querySelector('span[data-testid="msg-meta"]');
-                        if (timestamp) {
-                            return true;
-                        }
-                    }
-                    
-                    // Verificar si hay indicadores de envío reciente (checkmarks)
-                    const indicadoresEnvio = document.querySelectorAll('div[data-testid="msg-meta"] span[data-testid="msg-check"]');
-                    if (indicadoresEnvio.length > 0) {
-                        return true;
-                    }
-                    
-                    // Verificar si hay mensajes con contenido completo reciente
-                    const mensajesRecientes = document.querySelectorAll('div[data-testid="msg-meta"]');
-                    if (mensajesRecientes.length > 0) {
-                        // Verificar que el último mensaje tenga contenido sustancial (no solo una línea)
-                        const ultimoMensaje = mensajesRecientes[mensajesRecientes.length - 1];
-                        const contenido = ultimoMensaje.textContent || '';
-                        if (contenido.length > 50) { // Mensaje con contenido sustancial
-                            return true;
-                        }
-                    }
-                    
-                    return false;
-                """)
-                return mensaje_enviado
-            except:
-                pass
-            
-            return False
-            
-        except Exception as e:
-            self.log_message(f"    ⚠️ Error verificando envío automático: {str(e)}")
-            return False
-    
-    def verificar_mensaje_enviado(self, driver):
-        """Verificar si el mensaje se envió realmente"""
-        try:
-            # Esperar un poco para que se procese el envío
-            time.sleep(3)
-            
-            # Verificar si el campo de texto está vacío (indicador de envío exitoso)
-            text_box = None
-            try:
-                text_box = driver.find_element(By.XPATH, '//div[@contenteditable="true"][@data-tab="6"]')
-            except:
-                try:
-                    text_box = driver.find_element(By.XPATH, '//div[@contenteditable="true"]')
-                except:
-                    pass
-            
-            if text_box:
-                texto_actual = text_box.get_attribute('innerHTML') or text_box.text
-                if not texto_actual.strip():
-                    return True
-            
-            # Verificar si hay mensajes en el chat (indicador de envío)
-            try:
-                mensajes = driver.find_elements(By.XPATH, '//div[@data-testid="msg-meta"]')
-                if len(mensajes) > 0:
-                    return True
-            except:
-                pass
-            
-            # Verificar con JavaScript
-            try:
-                mensaje_enviado = driver.execute_script("""
-                    // Verificar si el campo de texto está vacío
-                    const textBox = document.querySelector('div[contenteditable="true"]');
-                    if (textBox && (!textBox.textContent || textBox.textContent.trim() === '')) {
-                        return true;
-                    }
-                    
-                    // Verificar si hay mensajes en el chat
-                    const mensajes = document.querySelectorAll('div[data-testid="msg-meta"]');
-                    if (mensajes.length > 0) {
-                        return true;
-                    }
-                    
-                    return false;
-                """)
-                return mensaje_enviado
-            except:
-                pass
-            
-            return False
-            
-        except Exception as e:
-            self.log_message(f"    ⚠️ Error verificando envío: {str(e)}")
-            return False
     
     def cleanup(self):
         """Limpiar recursos"""
@@ -2045,12 +1340,17 @@ class WhatsAppSenderGUIMejorado:
         """Limpiar la sesión persistente de WhatsApp Web"""
         try:
             import shutil
-            import os
             
-            user_data_dir = os.path.join(os.getcwd(), "whatsapp_session")
-            if os.path.exists(user_data_dir):
-                shutil.rmtree(user_data_dir)
-                self.log_message("🧹 Sesión de WhatsApp Web limpiada")
+            # Chrome que quedó abierto de envíos anteriores: cerrarlo antes de borrar su perfil
+            if not self.is_running:
+                EnvioWhatsApp(self.log_message, directorio_sesion=SESSION_DIR).cerrar_navegadores()
+            
+            # Sesiones de todas las cuentas (whatsapp_session, whatsapp_session_2...)
+            directorios = directorios_sesion(SESSION_DIR)
+            if directorios:
+                for user_data_dir in directorios:
+                    shutil.rmtree(user_data_dir)
+                self.log_message(f"🧹 Sesión de WhatsApp Web limpiada ({len(directorios)} cuentas)")
                 messagebox.showinfo("Sesión Limpiada", "La sesión persistente de WhatsApp Web ha sido eliminada.\n\nLa próxima vez que ejecutes el programa, necesitarás escanear el código QR nuevamente.")
             else:
                 messagebox.showinfo("Sin Sesión", "No hay sesión persistente para limpiar.")
@@ -2062,8 +1362,7 @@ class WhatsAppSenderGUIMejorado:
         """Verificar si existe una sesión persistente de WhatsApp Web"""
         try:
             import os
-            user_data_dir = os.path.join(os.getcwd(), "whatsapp_session")
-            if os.path.exists(user_data_dir):
+            for user_data_dir in directorios_sesion(SESSION_DIR):
                 # Verificar si hay archivos de sesión
                 session_files = os.listdir(user_data_dir)
                 if session_files:
@@ -2075,31 +1374,22 @@ class WhatsAppSenderGUIMejorado:
             return False
     
     # ===================== Funciones de Gestión de Progreso =====================
-    def guardar_progreso(self, indice):
-        """Guardar el progreso actual en archivo JSON"""
-        try:
-            with open(PROGRESO_FILE, "w") as f:
-                json.dump({"indice": indice, "fecha": datetime.now().isoformat()}, f)
-        except Exception as e:
-            self.log_message(f"⚠️ Error guardando progreso: {str(e)}")
-    
     def cargar_progreso(self):
         """Cargar el progreso guardado desde archivo JSON"""
         try:
             if os.path.exists(PROGRESO_FILE):
                 with open(PROGRESO_FILE, "r") as f:
                     data = json.load(f)
-                    return data.get("indice", 0)
+                    return data.get("procesados", 0)
             return 0
         except Exception as e:
             self.log_message(f"⚠️ Error cargando progreso: {str(e)}")
             return 0
     
     def borrar_progreso(self):
-        """Borrar el archivo de progreso"""
+        """Borrar el archivo de progreso y la bandeja de salida"""
         try:
-            if os.path.exists(PROGRESO_FILE):
-                os.remove(PROGRESO_FILE)
+            if borrar_progreso():
                 self.log_message("🗑️ Progreso guardado eliminado")
         except Exception as e:
             self.log_message(f"⚠️ Error borrando progreso: {str(e)}")
@@ -2115,14 +1405,22 @@ class WhatsAppSenderGUIMejorado:
             if os.path.exists(PROGRESO_FILE):
                 with open(PROGRESO_FILE, "r") as f:
                     data = json.load(f)
-                    indice = data.get("indice", 0)
+                    procesados = data.get("procesados", 0)
                     fecha = data.get("fecha", "Desconocida")
                     
-                    mensaje = f"📋 Información del Progreso Guardado:\n\n"
-                    mensaje += f"• Contactos procesados: {indice}\n"
+                    mensaje = "📋 Información del Progreso Guardado:\n\n"
+                    mensaje += f"• Contactos procesados: {procesados} de {data.get('total', '?')}\n"
                     mensaje += f"• Fecha del último envío: {fecha}\n"
                     mensaje += f"• Archivo: {PROGRESO_FILE}"
                     
+                    bandeja = BandejaSalida.cargar(BANDEJA_SALIDA_FILE)
+                    if bandeja:
+                        mensaje += f"\n\n📬 Bandeja de salida ({BANDEJA_SALIDA_FILE}):\n"
+                        mensaje += f"• Excel: {os.path.basename(bandeja.origen.get('archivo') or '') or 'Desconocido'}\n"
+                        mensaje += f"• Plantilla: {bandeja.origen.get('plantilla', 'Desconocida')}\n"
+                        mensaje += f"• Enviados: {bandeja.contar(ENVIADO)}, errores: {bandeja.contar(ERROR)}, "
+                        mensaje += f"pendientes: {len(bandeja.pendientes())} de {len(bandeja)}"
+                    
                     messagebox.showinfo("Información de Progreso", mensaje)
             else:
                 messagebox.showinfo("Sin Progreso", "No hay progreso guardado.")
@@ -2276,43 +1574,54 @@ class WhatsAppSenderGUIMejorado:
     
     def clear_log(self):
         """Limpiar log"""
+        self._registro.vaciar(max_mensajes=None)  # Descartar también lo pendiente de mostrar
         self.log_text.delete(1.0, tk.END)
         self.log_message("🧹 Log limpiado")
     
-    def log_message(self, message, level="INFO"):
-        """Agregar mensaje al log con nivel de importancia"""
-        # Verificar nivel de logging
-        levels = {"DEBUG": 0, "INFO": 1, "WARNING": 2, "ERROR": 3}
-        if levels.get(level, 1) < levels.get(self._log_level, 1):
+    def log_message(self, message, level="INFO", *args):
+        """
+        Agregar mensaje al log con nivel de importancia.
+        
+        Solo encola el mensaje (desde cualquier hilo); el widget y el archivo se
+        actualizan por lotes en _volcar_log. Los mensajes por debajo del nivel
+        actual se descartan antes de formatearlos: con args, message % args solo
+        se calcula si el mensaje llega a mostrarse.
+        """
+        if not self._registro.registrar(message, level, *args):
             return
         
-        timestamp = time.strftime("%H:%M:%S")
-        level_icon = {"DEBUG": "🔍", "INFO": "ℹ️", "WARNING": "⚠️", "ERROR": "❌"}
-        icon = level_icon.get(level, "ℹ️")
+        # Si el hilo principal está ocupado (p. ej. analizando un archivo) el bucle de Tk
+        # no vuelca la cola: hacerlo aquí, como mucho una vez por INTERVALO_VOLCADO_LOG
+        if (threading.current_thread() is threading.main_thread()
+                and time.monotonic() - self._ultimo_volcado_log >= INTERVALO_VOLCADO_LOG):
+            self._volcar_log()
+            self.root.update_idletasks()
+    
+    def _volcar_log(self):
+        """Pasar al widget de log los mensajes encolados (solo desde el hilo de Tk)"""
+        self._ultimo_volcado_log = time.monotonic()
+        lineas = self._registro.vaciar()
+        if not lineas:
+            return
         
-        log_entry = f"[{timestamp}] {icon} {message}\n"
+        self.log_text.insert(tk.END, ''.join(lineas))
         
-        # Agregar al widget de texto
-        self.log_text.insert(tk.END, log_entry)
+        # Conservar solo las últimas MAX_LINEAS_WIDGET_LOG líneas
+        exceso = int(self.log_text.index('end-1c').split('.')[0]) - MAX_LINEAS_WIDGET_LOG
+        if exceso > 0:
+            self.log_text.delete('1.0', f'{exceso + 1}.0')
         self.log_text.see(tk.END)
-        
-        # Guardar en archivo si está habilitado
-        if self._log_to_file:
-            try:
-                with open(self._log_file, "a", encoding="utf-8") as f:
-                    f.write(log_entry)
-            except Exception as e:
-                # Si falla el logging a archivo, no interrumpir la aplicación
-                pass
-        
-        # Actualizar interfaz
-        self.root.update_idletasks()
+    
+    def _programar_volcado_log(self):
+        """Volcar el log periódicamente desde el bucle de eventos de Tk"""
+        self._volcar_log()
+        self.root.after(int(INTERVALO_VOLCADO_LOG * 1000), self._programar_volcado_log)
     
     def set_log_level(self, level):
         """Configurar nivel de logging"""
         valid_levels = ["DEBUG", "INFO", "WARNING", "ERROR"]
         if level.upper() in valid_levels:
-            self._log_level = level.upper()
+            self._registro.nivel = level.upper()
             self.log_message(f"Nivel de logging cambiado a: {level}", "INFO")
         else:
             self.log_message(f"Nivel de logging inválido: {level}. Usando INFO", "WARNING")
@@ -2320,14 +1629,23 @@ class WhatsAppSenderGUIMejorado:
     def toggle_file_logging(self, enabled=True):
         """Activar/desactivar logging a archivo"""
         self._log_to_file = enabled
+        self._registro.configurar_archivo(self._log_file if enabled else None)
         status = "activado" if enabled else "desactivado"
         self.log_message(f"Logging a archivo {status}", "INFO")
     
+    def cerrar_log(self):
+        """Escribir los mensajes pendientes y cerrar el archivo de log"""
+        self._registro.vaciar(max_mensajes=None)
+        self._registro.cerrar()
+    
     def clear_log_file(self):
         """Limpiar archivo de log"""
         try:
             if os.path.exists(self._log_file):
+                # Cerrar el archivo abierto por el registro antes de borrarlo
+                self._registro.cerrar()
                 os.remove(self._log_file)
+                self._registro.configurar_archivo(self._log_file if self._log_to_file else None)
                 self.log_message("Archivo de log limpiado", "INFO")
         except Exception as e:
             self.log_message(f"Error limpiando archivo de log: {e}", "ERROR")
@@ -2336,8 +1654,9 @@ class WhatsAppSenderGUIMejorado:
         """
         Consolidar contactos duplicados del mismo cliente por día.
         
-        Agrupa múltiples reservas del mismo cliente para la misma fecha
-        en un solo contacto consolidado con todas las matrículas y ocupantes.
+        Agrupa múltiples reservas del mismo cliente (teléfono normalizado) para
+        la misma fecha en un solo contacto consolidado con todas las matrículas
+        y ocupantes (ver consolidar_reservas).
         
         Args:
             contactos (list): Lista de contactos a consolidar
@@ -2345,91 +1664,7 @@ class WhatsAppSenderGUIMejorado:
         Returns:
             list: Lista de contactos consolidados
         """
-        if not contactos:
-            return contactos
-        
-        # Crear diccionario para agrupar por teléfono y fecha
-        grupos = {}
-        
-        for contacto in contactos:
-            # Crear clave única: teléfono + fecha
-            clave = f"{contacto['telefono']}_{contacto['fecha_entrada']}"
-            
-            if clave not in grupos:
-                grupos[clave] = []
-            grupos[clave].append(contacto)
-        
-        # Consolidar cada grupo
-        contactos_consolidados = []
-        
-        for clave, grupo in grupos.items():
-            if len(grupo) == 1:
-                # Solo una reserva, mantener como está
-                contactos_consolidados.append(grupo[0])
-            else:
-                # Múltiples reservas, consolidar
-                contacto_consolidado = self._crear_contacto_consolidado(grupo)
-                contactos_consolidados.append(contacto_consolidado)
-                
-                # Log de consolidación
-                self.log_message(f"    🔗 Consolidado {len(grupo)} reservas para {contacto_consolidado['nombre']}")
-                self.log_message(f"       📋 Matrículas: {', '.join(contacto_consolidado['matriculas'])}")
-                self.log_message(f"       👥 Total ocupantes: {contacto_consolidado['ocupantes_total']}")
-        
-        return contactos_consolidados
-    
-    def _crear_contacto_consolidado(self, grupo):
-        """
-        Crear un contacto consolidado a partir de un grupo de reservas.
-        
-        Args:
-            grupo (list): Lista de contactos del mismo cliente y fecha
-            
-        Returns:
-            dict: Contacto consolidado
-        """
-        # Tomar el primer contacto como base
-        base = grupo[0]
-        
-        # Recolectar todas las matrículas únicas
-        matriculas = list(set([c['matricula'] for c in grupo if c['matricula'] != 'Sin matrícula']))
-        
-        # Calcular total de ocupantes
-        ocupantes_total = 0
-        for contacto in grupo:
-            try:
-                ocupantes = str(contacto['ocupantes']).strip()
-                if ocupantes.isdigit():
-                    ocupantes_total += int(ocupantes)
-                elif 'persona' in ocupantes.lower():
-                    # Extraer número de "X personas"
-                    import re
-                    match = re.search(r'(\d+)', ocupantes)
-                    if match:
-                        ocupantes_total += int(match.group(1))
-                    else:
-                        ocupantes_total += 1
-                else:
-                    ocupantes_total += 1
-            except:
-                ocupantes_total += 1
-        
-        # Crear contacto consolidado
-        contacto_consolidado = {
-            'nombre': base['nombre'],
-            'telefono': base['telefono'],
-            'matricula': ', '.join(matriculas) if matriculas else 'Sin matrícula',
-            'matriculas': matriculas,  # Lista de matrículas
-            'hora_entrada': base['hora_entrada'],
-            'fecha_entrada': base['fecha_entrada'],
-            'tipo_plaza': base['tipo_plaza'],
-            'ocupantes': f"{ocupantes_total} personas",
-            'ocupantes_total': ocupantes_total,
-            'reservas_count': len(grupo),
-            'consolidado': True  # Marcar como consolidado
-        }
-        
-        return contacto_consolidado
+        return consolidar_reservas(contactos, log=self.log_message)
     
     def mostrar_info_columnas(self):
         """Mostrar información detallada sobre la configuración de columnas"""
@@ -2506,7 +1741,7 @@ class WhatsAppSenderGUIMejorado:
                 archivo_frame.pack(fill=tk.X, pady=(0, 15))
                 
                 try:
-                    df = pd.read_excel(self.excel_path.get())
+                    df = self._leer_muestra_excel()
                     columnas_disponibles = list(df.columns)
                     
                     # Buscar columnas relevantes
@@ -2564,51 +1799,14 @@ class WhatsAppSenderGUIMejorado:
             str: Número de teléfono extraído o cadena vacía si no se encuentra
         """
         try:
-            if not valor_vuelo or valor_vuelo == 'nan':
-                return ""
-            
-            valor_limpio = str(valor_vuelo).strip()
-            
-            # Buscar secuencias de 9 o más dígitos consecutivos
-            import re
-            
-            # Patrón 1: Buscar números de 9+ dígitos al final del string
-            patron_final = r'(\d{9,})$'
-            match_final = re.search(patron_final, valor_limpio)
-            if match_final:
-                numero = match_final.group(1)
-                if self.es_telefono_valido(numero):
-                    return numero
-            
-            # Patrón 2: Buscar números de 9+ dígitos precedidos por espacios o guiones
-            patron_espaciado = r'[-\s](\d{9,})'
-            match_espaciado = re.search(patron_espaciado, valor_limpio)
-            if match_espaciado:
-                numero = match_espaciado.group(1)
-                if self.es_telefono_valido(numero):
-                    return numero
-            
-            # Patrón 3: Buscar cualquier secuencia de 9+ dígitos
-            patron_general = r'(\d{9,})'
-            matches = re.findall(patron_general, valor_limpio)
-            for numero in matches:
-                if self.es_telefono_valido(numero):
-                    return numero
-            
-            # Si no se encuentra con patrones, intentar extraer todos los dígitos
-            todos_digitos = ''.join(filter(str.isdigit, valor_limpio))
-            if len(todos_digitos) >= 9:
-                # Buscar la secuencia más larga de dígitos consecutivos
-                secuencias = re.findall(r'\d+', valor_limpio)
-                for secuencia in secuencias:
-                    if len(secuencia) >= 9 and self.es_telefono_valido(secuencia):
-                        return secuencia
-            
-            return ""
-            
+            return extraer_telefono_vuelo(valor_vuelo, self.numeros_extranjeros.get())
         except Exception as e:
             self.log_message(f"    ⚠️ Error extrayendo número de vuelo: {str(e)}")
             return ""
+    
+    def _extraer_telefonos_vuelo(self, valores_vuelo):
+        """Extraer los teléfonos de una columna completa de campos de vuelo (ver extraer_telefonos_vuelo)"""
+        return extraer_telefonos_vuelo(valores_vuelo, self.numeros_extranjeros.get())
 
 def main():
     """Función principal"""
@@ -2621,8 +1819,10 @@ def main():
             if messagebox.askokcancel("Salir", "El envío está en progreso. ¿Deseas salir?"):
                 app.stop_sending()
                 app.cleanup()
+                app.cerrar_log()
                 root.destroy()
         else:
+            app.cerrar_log()
             root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -0,0 +1,194 @@
+# ✉️ Renderizado de mensajes
+# La plantilla se lee y se compila una vez por envío y cada mensaje solo
+# rellena las variables que la plantilla usa; la limpieza de cada mensaje y el
+# recuento de emojis se hacen en una sola pasada.
+
+import re
+import string
+from collections import namedtuple
+from datetime import datetime
+
+# Constantes de rangos Unicode para emojis
+EMOJI_RANGES = [
+    (0x1F600, 0x1F64F),  # Emoticons
+    (0x1F300, 0x1F5FF),  # Misc Symbols and Pictographs
+    (0x1F680, 0x1F6FF),  # Transport and Map Symbols
+    (0x1F900, 0x1F9FF),  # Supplemental Symbols and Pictographs
+    (0x2600, 0x26FF),    # Miscellaneous Symbols
+    (0x2700, 0x27BF)     # Dingbats
+]
+
+# Variables que se pueden usar en las plantillas y cómo se obtienen de cada contacto
+VARIABLES_MENSAJE = {
+    'nombre': lambda contacto: contacto.nombre,
+    'matricula': lambda contacto: contacto.texto_matriculas(),
+    'hora': lambda contacto: contacto.texto_hora(),
+    'ocupantes': lambda contacto: contacto.texto_ocupantes(),
+    'reservas_count': lambda contacto: contacto.reservas_count,
+}
+
+_formateador = string.Formatter()
+
+
+# Caracteres que cuentan como emoji: los de EMOJI_RANGES y cualquiera fuera del plano básico
+PATRON_EMOJIS = re.compile('[' + ''.join(f'{chr(inicio)}-{chr(fin)}' for inicio, fin in EMOJI_RANGES)
+                           + '\U00010000-\U0010FFFF]')
+
+
+class EstadisticasEmojis(namedtuple('EstadisticasEmojis', ['total', 'fuera_bmp', 'desconocidos'])):
+    """
+    Emojis de un mensaje.
+
+    Attributes:
+        total: Caracteres en EMOJI_RANGES o fuera del plano básico
+        fuera_bmp: Caracteres por encima de 0xFFFF (lo que antes se contaba como emojis)
+        desconocidos: Caracteres fuera del plano básico que no están en EMOJI_RANGES
+    """
+    __slots__ = ()
+
+
+def _estadisticas(encontrados):
+    fuera_bmp = desconocidos = 0
+    for char in encontrados:
+        if char > '\uffff':
+            fuera_bmp += 1
+            if not any(inicio <= ord(char) <= fin for inicio, fin in EMOJI_RANGES):
+                desconocidos += 1
+    return EstadisticasEmojis(len(encontrados), fuera_bmp, desconocidos)
+
+
+def limpiar_mensaje(texto):
+    """
+    Limpiar un mensaje para ChromeDriver y contar sus emojis en una sola pasada.
+
+    Los caracteres del plano básico y los emojis se conservan tal cual (un str
+    de Python no puede contener caracteres por encima de 0x10FFFF); solo se
+    eliminan los espacios al inicio y al final. Los emojis se buscan con una
+    única expresión regular y solo los encontrados se clasifican.
+
+    Args:
+        texto: Texto del mensaje (se convierte a str si no lo es)
+
+    Returns:
+        tuple: (texto limpio, EstadisticasEmojis)
+    """
+    if not isinstance(texto, str):
+        texto = str(texto)
+    # NO limpiar espacios múltiples para preservar formato
+    texto = texto.strip()
+    return texto, _estadisticas(PATRON_EMOJIS.findall(texto))
+
+
+def limpiar_caracteres_unicode(texto):
+    """Texto limpio de limpiar_mensaje, sin las estadísticas"""
+    return limpiar_mensaje(texto)[0]
+
+
+def contar_emojis(texto):
+    """Número de caracteres fuera del plano básico (emojis) de un texto"""
+    return _estadisticas(PATRON_EMOJIS.findall(texto)).fuera_bmp
+
+
+class PlantillaCompilada:
+    """
+    Plantilla de mensaje analizada una sola vez.
+
+    Al compilar se separa el texto fijo de las variables ({nombre}, {hora}...),
+    se cuentan sus emojis y se calcula la fecha actual. render() solo obtiene
+    del contacto las variables que aparecen en la plantilla y las une al texto
+    fijo; el resultado es el mismo que plantilla.format(...) seguido de
+    limpiar_caracteres_unicode.
+
+    Attributes:
+        texto: Plantilla original
+        variables: Nombres de las variables que usa la plantilla
+        fecha_actual: Fecha (dd-mm-yyyy) con la que se rellena {fecha_actual}
+        emojis: Emojis del texto fijo de la plantilla
+        errores: Errores del último render_todos, por posición del contacto
+    """
+
+    def __init__(self, texto, fecha_actual=None):
+        """
+        Compilar una plantilla.
+
+        Args:
+            texto (str): Texto de la plantilla con variables entre llaves
+            fecha_actual (str): Valor de {fecha_actual} (por defecto, la fecha de hoy)
+
+        Raises:
+            KeyError: Si la plantilla usa una variable que no existe
+            ValueError: Si la plantilla tiene llaves mal cerradas
+        """
+        self.texto = texto
+        self.fecha_actual = fecha_actual or datetime.now().strftime("%d-%m-%Y")
+        self.variables = []
+        self.emojis = 0
+        self.errores = {}
+
+        # Trozos: (texto fijo, obtener valor o None, campo, conversión, formato)
+        self._trozos = []
+        for literal, campo, formato, conversion in _formateador.parse(texto):
+            self.emojis += contar_emojis(literal)
+            if campo is None:
+                self._trozos.append((literal, None, None, None, None))
+                continue
+
+            nombre = campo.split('.', 1)[0].split('[', 1)[0]
+            if nombre == 'fecha_actual':
+                obtener = lambda contacto, fecha=self.fecha_actual: fecha
+            elif nombre in VARIABLES_MENSAJE:
+                obtener = VARIABLES_MENSAJE[nombre]
+            else:
+                raise KeyError(nombre)
+            if '{' in (formato or ''):
+                raise ValueError(f"Formato anidado no soportado en {{{campo}}}")
+            if nombre not in self.variables:
+                self.variables.append(nombre)
+
+            # Campos simples ({nombre}) sin atributos, índices ni conversión: str() directo
+            simple = campo == nombre and not formato and not conversion
+            self._trozos.append((literal, obtener,
+                                 None if simple else campo, conversion, formato))
+
+    def render(self, contacto):
+        """
+        Mensaje de un contacto.
+
+        Args:
+            contacto (Contacto): Contacto (o consolidado) a quien va el mensaje
+
+        Returns:
+            str: Mensaje con las variables sustituidas y limpio
+        """
+        partes = []
+        for literal, obtener, campo, conversion, formato in self._trozos:
+            partes.append(literal)
+            if obtener is None:
+                continue
+            valor = obtener(contacto)
+            if campo is None:
+                texto = str(valor)
+            else:
+                nombre = campo.split('.', 1)[0].split('[', 1)[0]
+                valor, _ = _formateador.get_field(campo, (), {nombre: valor})
+                texto = format(_formateador.convert_field(valor, conversion), formato)
+            partes.append(texto)
+        return ''.join(partes).strip()
+
+    def render_todos(self, contactos):
+        """
+        Mensajes de todos los contactos de una vez.
+
+        Returns:
+            list: Un mensaje por contacto, o None si no se pudo rellenar la plantilla
+                para ese contacto (la excepción queda en self.errores)
+        """
+        mensajes = []
+        self.errores = {}
+        for posicion, contacto in enumerate(contactos):
+            try:
+                mensajes.append(self.render(contacto))
+            except Exception as e:
+                mensajes.append(None)
+                self.errores[posicion] = e
+        return mensajes
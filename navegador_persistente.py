@@ -0,0 +1,128 @@
+# 🌐 Navegador persistente entre envíos
+# El Chrome de cada cuenta se abre con un puerto de depuración y se queda
+# abierto al terminar el envío, con WhatsApp Web conectado: el siguiente
+# envío (de la ventana o de la línea de comandos) se conecta a él en lugar de
+# abrir otro Chrome, volver a cargar WhatsApp Web y esperar a la lista de
+# chats. La ruta de ChromeDriver se guarda para no consultar la última
+# versión por red en cada envío.
+
+import json
+import os
+import time
+import urllib.request
+
+# Dejar Chrome abierto al terminar el envío por defecto (ventana y línea de comandos)
+MANTENER_NAVEGADOR_ABIERTO = True
+
+# Puerto de depuración de la cuenta 1; la cuenta N usa PUERTO_DEPURACION_BASE + N - 1
+PUERTO_DEPURACION_BASE = 9222
+TIMEOUT_COMPROBAR_NAVEGADOR = 1  # Segundos para saber si hay un Chrome escuchando en el puerto
+ESPERA_CIERRE_NAVEGADOR = 10  # Segundos que se espera a que un Chrome cerrado deje libre su puerto
+
+# Ruta de ChromeDriver guardada entre envíos; se vuelve a buscar pasados estos días
+CHROMEDRIVER_CACHE_FILE = "chromedriver.json"
+CHROMEDRIVER_CACHE_DIAS = 7
+
+
+def puerto_depuracion(perfil):
+    """Puerto de depuración del Chrome de una cuenta (PerfilCuenta)"""
+    return PUERTO_DEPURACION_BASE + perfil.numero - 1
+
+
+def navegador_abierto(puerto):
+    """
+    Indicar si hay un Chrome abierto escuchando en un puerto de depuración.
+
+    Args:
+        puerto (int): Puerto de depuración de la cuenta
+
+    Returns:
+        bool: True si Chrome responde en 127.0.0.1:puerto
+    """
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/json/version",
+                                    timeout=TIMEOUT_COMPROBAR_NAVEGADOR) as respuesta:
+            return respuesta.status == 200
+    except (OSError, ValueError):
+        return False
+
+
+def esperar_cierre_navegador(puerto, espera=ESPERA_CIERRE_NAVEGADOR):
+    """
+    Esperar a que el Chrome de un puerto de depuración termine de cerrarse.
+
+    Args:
+        puerto (int): Puerto de depuración de la cuenta
+        espera (float): Segundos como máximo
+
+    Returns:
+        bool: True si el puerto quedó libre; False si sigue habiendo un Chrome escuchando
+    """
+    limite = time.monotonic() + espera
+    while navegador_abierto(puerto):
+        if time.monotonic() >= limite:
+            return False
+        time.sleep(0.5)
+    return True
+
+
+def ruta_chromedriver(renovar=False, ruta_cache=CHROMEDRIVER_CACHE_FILE):
+    """
+    Ruta de ChromeDriver, guardada entre envíos.
+
+    Solo se pregunta a webdriver-manager (que consulta la última versión por
+    red) si no hay ruta guardada, si el archivo ya no existe, si tiene más de
+    CHROMEDRIVER_CACHE_DIAS días o si se pide renovarla (p. ej. porque Chrome
+    se actualizó y el ChromeDriver guardado ya no le sirve).
+
+    Args:
+        renovar (bool): Ignorar la ruta guardada y volver a buscarla
+        ruta_cache (str): Archivo JSON donde se guarda la ruta
+
+    Returns:
+        tuple: (ruta, guardada) con guardada=True si la ruta viene del archivo
+
+    Raises:
+        Exception: Los errores de webdriver-manager si hay que buscarla y falla
+    """
+    if not renovar:
+        try:
+            with open(ruta_cache, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+            if (os.path.exists(datos["ruta"])
+                    and time.time() - datos["fecha"] < CHROMEDRIVER_CACHE_DIAS * 24 * 3600):
+                return datos["ruta"], True
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    ruta = ChromeDriverManager(version="latest").install()
+    try:
+        with open(ruta_cache, "w", encoding="utf-8") as f:
+            json.dump({"ruta": ruta, "fecha": time.time()}, f)
+    except OSError:
+        pass
+    return ruta, False
+
+
+def soltar_navegador(driver):
+    """
+    Terminar la conexión de Selenium con Chrome sin cerrarlo.
+
+    Se para solo el proceso de ChromeDriver; Chrome (abierto con 'detach' o al
+    que se conectó el envío) sigue abierto con WhatsApp Web para el siguiente.
+    """
+    try:
+        driver.service.stop()
+    except Exception:
+        pass
+
+
+def cerrar_navegador(driver):
+    """Cerrar Chrome del todo (también el que quedó abierto de envíos anteriores)"""
+    try:
+        driver.execute_cdp_cmd("Browser.close", {})
+    except Exception:
+        pass
+    soltar_navegador(driver)
@@ -76,6 +76,9 @@ PLANTILLAS_DISPONIBLES = {
     "CitaMultiple": CITA_MULTIPLE
 }
 
+# Plantilla seleccionada al arrancar (ventana y línea de comandos)
+DEFAULT_PLANTILLA = "RecordatorioCita"
+
 # Variables disponibles en todas las plantillas
 VARIABLES_DISPONIBLES = {
     "{nombre}": "Nombre del cliente",
@@ -0,0 +1,625 @@
+# 📊 Procesamiento de archivos Excel de reservas
+# Motor de extracción por columnas: construye todos los campos de contacto de
+# una hoja de una sola vez en lugar de recorrerla fila a fila con df.iloc
+
+import os
+import json
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Campos de cada contacto, en el orden en que se guardan en el diccionario
+COLUMNAS_CONTACTO = ['nombre', 'telefono', 'matricula', 'hora_entrada',
+                     'fecha_entrada', 'tipo_plaza', 'ocupantes']
+
+# Formatos de archivo soportados
+FORMATO_NORMAL = "normal"      # Columnas separadas de Excel
+FORMATO_ESPECIAL = "especial"  # Todas las columnas en una sola separada por tabs
+
+# Formato especial: mínimo de campos por fila y posición fija de cada dato
+# [Agencia, Cliente, NIF, Matricula, Vehiculo, Ocup., ..., Entrada (10), ..., Tipo de Plaza (12)]
+MIN_COLUMNAS_FORMATO_ESPECIAL = 6
+POSICIONES_FORMATO_ESPECIAL = {
+    1: 'Cliente',
+    2: 'NIF',
+    3: 'Matricula',
+    5: 'Ocup.',
+    10: 'Entrada',  # Hora (si contiene ':') o fecha (si contiene '-')
+    12: 'Tipo de Plaza',
+}
+
+# Formato normal: nombres aceptados para la columna de cada campo, por orden de
+# preferencia. Se comparan sin distinguir mayúsculas, tildes ni espacios sobrantes.
+ALIAS_COLUMNAS = {
+    'cliente': ('Cliente', 'Nombre', 'Nombre cliente'),
+    'nif': ('NIF', 'DNI', 'NIF/DNI'),
+    'vuelo': (),  # Sin alias: primera columna que contenga PALABRAS_COLUMNA_VUELO
+    'matricula': ('Matricula', 'Matrícula'),
+    'hora_entrada': ('Hora entrada', 'Hora de entrada'),
+    'fecha_entrada': ('Fecha entrada', 'Fecha de entrada'),
+    'tipo_plaza': ('Tipo de Plaza', 'Tipo plaza'),
+    'ocupantes': ('Ocup.', 'Ocupantes'),
+}
+PALABRAS_COLUMNA_VUELO = ('VUELTA', 'VUELO')
+
+# Alias adicionales definidos por el usuario: {"campo": ["Columna", ...]}
+ALIAS_COLUMNAS_FILE = "alias_columnas.json"
+
+# Límites de la caché de libros Excel
+CACHE_EXCEL_MAX_LIBROS = 4
+CACHE_EXCEL_MAX_BYTES = 512 * 1024 * 1024
+
+# Lectura progresiva (openpyxl en modo solo lectura) para archivos grandes
+UMBRAL_LECTURA_PROGRESIVA_MB = 20
+EXTENSIONES_LECTURA_PROGRESIVA = ('.xlsx', '.xlsm')
+FILAS_POR_BLOQUE = 500
+
+
+def detectar_formato(df):
+    """Detectar el formato de una hoja: especial si todo está en una sola columna"""
+    return FORMATO_ESPECIAL if len(df.columns) == 1 else FORMATO_NORMAL
+
+
+def _normalizar_nombre_columna(nombre):
+    """Nombre de columna sin tildes, en minúsculas y con los espacios normalizados"""
+    texto = unicodedata.normalize('NFKD', str(nombre))
+    texto = ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return ' '.join(texto.casefold().split())
+
+
+def resolver_esquema(columnas, alias=None):
+    """
+    Asociar cada campo del formato normal a la columna real de la hoja.
+
+    Para cada campo se busca primero un alias con el nombre exacto y después
+    sin distinguir mayúsculas, tildes ni espacios. La columna de vuelo, si
+    ningún alias coincide, es la primera que contiene "VUELTA" o "VUELO".
+
+    Args:
+        columnas: Nombres de columna de la hoja (df.columns)
+        alias (dict): Campo -> nombres aceptados (por defecto ALIAS_COLUMNAS)
+
+    Returns:
+        dict: Campo -> nombre de la columna, o None si la hoja no lo tiene
+    """
+    alias = ALIAS_COLUMNAS if alias is None else alias
+    columnas = list(columnas)
+
+    normalizadas = {}
+    for columna in columnas:
+        normalizadas.setdefault(_normalizar_nombre_columna(columna), columna)
+
+    esquema = {}
+    for campo in ALIAS_COLUMNAS:
+        nombres = alias.get(campo, ())
+        columna = next((nombre for nombre in nombres if nombre in columnas), None)
+        if columna is None:
+            columna = next((normalizadas[normalizado] for normalizado in map(_normalizar_nombre_columna, nombres)
+                            if normalizado in normalizadas), None)
+        esquema[campo] = columna
+
+    if esquema['vuelo'] is None:
+        esquema['vuelo'] = next((columna for columna in columnas
+                                 if any(palabra in str(columna).upper() for palabra in PALABRAS_COLUMNA_VUELO)), None)
+    return esquema
+
+
+def cargar_alias_columnas(ruta=ALIAS_COLUMNAS_FILE):
+    """
+    Combinar ALIAS_COLUMNAS con los alias del usuario guardados en un archivo JSON.
+
+    Los alias del archivo tienen preferencia sobre los predeterminados.
+
+    Args:
+        ruta (str): Archivo JSON con {"campo": ["Columna", ...]} (puede no existir)
+
+    Returns:
+        dict: Campo -> tupla de nombres aceptados
+
+    Raises:
+        ValueError: Si el archivo no es un JSON válido o nombra un campo desconocido
+    """
+    alias = dict(ALIAS_COLUMNAS)
+    if not os.path.exists(ruta):
+        return alias
+
+    with open(ruta, "r", encoding="utf-8") as f:
+        personalizados = json.load(f)
+    if not isinstance(personalizados, dict):
+        raise ValueError(f"{ruta}: se esperaba un objeto {{campo: [columnas]}}")
+
+    for campo, nombres in personalizados.items():
+        if campo not in ALIAS_COLUMNAS:
+            raise ValueError(f"{ruta}: campo desconocido '{campo}' (válidos: {', '.join(ALIAS_COLUMNAS)})")
+        nombres = (nombres,) if isinstance(nombres, str) else tuple(nombres)
+        alias[campo] = nombres + tuple(nombre for nombre in alias[campo] if nombre not in nombres)
+    return alias
+
+
+class LibroExcel:
+    """
+    Hoja de Excel ya leída, tal como se guarda en la caché.
+
+    El DataFrame se comparte entre todos los lectores: no debe modificarse.
+
+    Attributes:
+        ruta: Ruta absoluta del archivo
+        clave: (ruta, mtime, tamaño) del archivo cuando se leyó
+        df: DataFrame con el contenido de la primera hoja
+        formato: FORMATO_NORMAL o FORMATO_ESPECIAL
+        esquema: Campo -> columna (ver resolver_esquema), None en formato especial
+        bytes: Memoria aproximada que ocupa el DataFrame
+    """
+
+    def __init__(self, ruta, clave, df, alias=None):
+        self.ruta = ruta
+        self.clave = clave
+        self.df = df
+        self.formato = detectar_formato(df)
+        self.esquema = resolver_esquema(df.columns, alias) if self.formato == FORMATO_NORMAL else None
+        self.bytes = int(df.memory_usage(index=True, deep=True).sum())
+
+
+class CacheLibrosExcel:
+    """
+    Caché de libros Excel leídos, compartida por el análisis y los diálogos de columnas.
+
+    Cada entrada se identifica por ruta, fecha de modificación y tamaño: si el
+    archivo cambia en disco se vuelve a leer. Cuando se supera el número de
+    libros o la memoria máxima se descartan primero los menos usados.
+    """
+
+    def __init__(self, max_libros=CACHE_EXCEL_MAX_LIBROS, max_bytes=CACHE_EXCEL_MAX_BYTES, alias=None):
+        self.max_libros = max_libros
+        self.max_bytes = max_bytes
+        self.alias = ALIAS_COLUMNAS if alias is None else alias
+        self._libros = OrderedDict()  # ruta -> LibroExcel
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clave(ruta):
+        """Clave (ruta, mtime, tamaño) del archivo; lanza FileNotFoundError si no existe"""
+        info = os.stat(ruta)
+        return (ruta, info.st_mtime_ns, info.st_size)
+
+    def obtener(self, ruta):
+        """
+        Obtener un libro leído, desde la caché si el archivo no ha cambiado.
+
+        Args:
+            ruta (str): Ruta del archivo Excel
+
+        Returns:
+            LibroExcel: Libro con el DataFrame, su formato y su esquema de columnas
+
+        Raises:
+            FileNotFoundError: Si el archivo no existe
+        """
+        ruta = os.path.abspath(ruta)
+        clave = self._clave(ruta)
+
+        with self._lock:
+            libro = self._libros.get(ruta)
+            if libro is not None and libro.clave == clave:
+                self._libros.move_to_end(ruta)
+                return libro
+
+        # Leer fuera del lock para no bloquear a otros lectores
+        libro = LibroExcel(ruta, clave, pd.read_excel(ruta), self.alias)
+
+        with self._lock:
+            self._libros[ruta] = libro
+            self._libros.move_to_end(ruta)
+            self._liberar_memoria()
+        return libro
+
+    def _liberar_memoria(self):
+        """Descartar los libros menos usados si se superan los límites (conserva el último)"""
+        while len(self._libros) > 1 and (len(self._libros) > self.max_libros or self.bytes_en_uso() > self.max_bytes):
+            self._libros.popitem(last=False)
+
+    def bytes_en_uso(self):
+        """Memoria aproximada ocupada por todos los libros en caché"""
+        return sum(libro.bytes for libro in self._libros.values())
+
+    def invalidar(self, ruta=None):
+        """Descartar un libro de la caché, o todos si no se indica ruta"""
+        with self._lock:
+            if ruta is None:
+                self._libros.clear()
+            else:
+                self._libros.pop(os.path.abspath(ruta), None)
+
+
+def _dtype_fila(df):
+    """Obtener el dtype con el que pandas devuelve una fila (df.iloc[i])"""
+    if len(df) == 0:
+        return np.dtype(object)
+    return df.iloc[0].dtype
+
+
+def _texto_columna(df, columna, dtype_fila):
+    """
+    Convertir una columna completa a texto tal como lo haría str(df.iloc[i][columna]).
+
+    Args:
+        df (DataFrame): Hoja de Excel leída con pandas
+        columna (str): Nombre de la columna
+        dtype_fila: dtype de las filas de la hoja (ver _dtype_fila)
+
+    Returns:
+        tuple: (Series de textos, máscara numpy de celdas no vacías)
+    """
+    serie = df[columna]
+    # En hojas totalmente numéricas la fila se convierte al tipo común (p. ej. float)
+    if serie.dtype != dtype_fila:
+        serie = serie.astype(dtype_fila)
+
+    presente = serie.notna().to_numpy()
+    texto = pd.Series([str(valor) for valor in serie.tolist()], index=df.index, dtype=object)
+    return texto, presente
+
+
+def _columna_o_defecto(df, columna, dtype_fila, defecto):
+    """Texto sin espacios de una columna o un valor por defecto si no existe (columna None)"""
+    if columna is not None:
+        texto, _ = _texto_columna(df, columna, dtype_fila)
+        return texto.str.strip()
+    return pd.Series(defecto, index=df.index, dtype=object)
+
+
+def _extraer_horas(df, columna, dtype_fila):
+    """Extraer la hora de entrada (HH:MM) de todas las filas (None en las que no la tienen)"""
+    horas = np.full(len(df), None, dtype=object)
+    if columna is not None:
+        texto, presente = _texto_columna(df, columna, dtype_fila)
+        con_separador = texto.str.contains(':', regex=False).to_numpy()
+        partes = texto.str.split(':')
+
+        horas_completas = (partes.str[0] + ":" + partes.str[1]).to_numpy(dtype=object)
+        horas_cortas = (texto.str.slice(0, 2) + ":00").to_numpy(dtype=object)
+
+        horas[presente & con_separador] = horas_completas[presente & con_separador]
+        horas[presente & ~con_separador] = horas_cortas[presente & ~con_separador]
+    return pd.Series(horas, index=df.index, dtype=object)
+
+
+def _extraer_fechas(df, columna, dtype_fila):
+    """
+    Extraer la fecha de entrada (YYYY-MM-DD) de todas las filas.
+
+    Returns:
+        tuple: (Series de fechas, máscara de filas con fecha mal formada)
+            Una fecha con un único '-' no tiene tres partes y la fila se descarta,
+            igual que ocurría al procesar fila a fila.
+    """
+    fechas = pd.Series("Desconocida", index=df.index, dtype=object)
+    erroneas = np.zeros(len(df), dtype=bool)
+    if columna is None:
+        return fechas, erroneas
+
+    texto, presente = _texto_columna(df, columna, dtype_fila)
+    partes = texto.str.split('-')
+    num_partes = partes.str.len().to_numpy()
+    con_separador = num_partes > 1
+
+    fechas_separadas = partes.str[0] + "-" + partes.str[1] + "-" + partes.str[2]
+    fechas_compactas = texto.str.slice(0, 4) + "-" + texto.str.slice(4, 6) + "-" + texto.str.slice(6)
+
+    completas = presente & con_separador & (num_partes >= 3)
+    fechas[completas] = fechas_separadas[completas]
+    fechas[presente & ~con_separador] = fechas_compactas[presente & ~con_separador]
+    erroneas = presente & con_separador & (num_partes < 3)
+    return fechas, erroneas
+
+
+def _extraer_ocupantes(df, columna, dtype_fila):
+    """Extraer el número de ocupantes de todas las filas"""
+    ocupantes = pd.Series("Sin especificar", index=df.index, dtype=object)
+    if columna is None:
+        return ocupantes
+
+    texto, presente = _texto_columna(df, columna, dtype_fila)
+    ocupantes[presente] = texto.str.strip()[presente]
+    return ocupantes
+
+
+def _extraer_telefonos_vuelo(df, columna_vuelo, dtype_fila, extraer_telefonos_vuelo, log):
+    """
+    Extraer teléfonos de la columna de vuelo para la plantilla de recogidas.
+
+    Args:
+        df (DataFrame): Hoja de Excel
+        columna_vuelo (str): Columna de vuelo del esquema (None si la hoja no tiene)
+        dtype_fila: dtype de las filas de la hoja
+        extraer_telefonos_vuelo (callable): Extrae los teléfonos de una Series de valores de vuelo
+        log (callable): Función de log de la aplicación, log(mensaje, nivel, *args)
+
+    Returns:
+        Series: Teléfonos extraídos ("" si no se encontró ninguno)
+    """
+    telefonos = pd.Series("", index=df.index, dtype=object)
+    if columna_vuelo is None:
+        return telefonos
+
+    texto, presente = _texto_columna(df, columna_vuelo, dtype_fila)
+
+    posiciones = np.flatnonzero(presente)
+    numeros = extraer_telefonos_vuelo(texto.iloc[posiciones])
+    telefonos.iloc[posiciones] = numeros.to_numpy()
+
+    for valor_vuelo, numero in zip(texto.iloc[posiciones], numeros):
+        if numero:
+            log("    📞 Número extraído de '%s': %s", "INFO", columna_vuelo, numero)
+        else:
+            log("    ⚠️ No se pudo extraer número válido de '%s': %s", "INFO", columna_vuelo, valor_vuelo)
+
+    return telefonos
+
+
+def usar_lectura_progresiva(ruta, umbral_mb=UMBRAL_LECTURA_PROGRESIVA_MB):
+    """Indicar si un archivo es lo bastante grande (y .xlsx) para leerlo de forma progresiva"""
+    if not ruta.lower().endswith(EXTENSIONES_LECTURA_PROGRESIVA):
+        return False
+    return os.path.getsize(ruta) >= umbral_mb * 1024 * 1024
+
+
+def _nombres_columnas(cabecera):
+    """Nombres de columna a partir de la fila de cabecera, con los mismos criterios que pandas"""
+    nombres = []
+    vistos = {}
+    for posicion, valor in enumerate(cabecera):
+        nombre = f"Unnamed: {posicion}" if valor is None else valor
+        # Columnas repetidas: 'Matricula', 'Matricula.1', ...
+        if nombre in vistos:
+            vistos[nombre] += 1
+            nombre = f"{nombre}.{vistos[nombre]}"
+        else:
+            vistos[nombre] = 0
+        nombres.append(nombre)
+    return nombres
+
+
+def _crear_bloque(filas, columnas, inicio):
+    """Crear un DataFrame pequeño con las filas leídas, numeradas desde 'inicio'"""
+    ancho = len(columnas)
+    filas = [tuple(fila[:ancho]) + (None,) * (ancho - len(fila)) for fila in filas]
+    return pd.DataFrame(filas, columns=columnas, index=pd.RangeIndex(inicio, inicio + len(filas)), dtype=object)
+
+
+def iterar_bloques_excel(ruta, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Leer un .xlsx fila a fila con openpyxl (solo lectura) y devolverlo en bloques.
+
+    El libro nunca se carga completo en memoria: solo se mantiene el bloque
+    actual. Cada bloque conserva el número de fila global en su índice, de
+    modo que las funciones de extracción lo tratan igual que la hoja completa.
+
+    Args:
+        ruta (str): Ruta del archivo .xlsx
+        filas_por_bloque (int): Número de filas de cada bloque
+
+    Yields:
+        DataFrame: Bloque de filas (dtype object) con las columnas de la cabecera
+    """
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        # Igual que pd.read_excel: primera hoja del libro
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        cabecera = next(filas, None)
+        if cabecera is None:
+            return
+        columnas = _nombres_columnas(cabecera)
+
+        bloque = []
+        inicio = 0
+        for fila in filas:
+            bloque.append(fila)
+            if len(bloque) == filas_por_bloque:
+                yield _crear_bloque(bloque, columnas, inicio)
+                inicio += len(bloque)
+                bloque = []
+        if bloque:
+            yield _crear_bloque(bloque, columnas, inicio)
+    finally:
+        libro.close()
+
+
+def contar_filas_excel(ruta):
+    """
+    Número de filas de datos de la primera hoja según las dimensiones del libro.
+
+    No recorre las filas: usa la dimensión que guarda el propio archivo, así
+    que es inmediato incluso en libros enormes.
+
+    Args:
+        ruta (str): Ruta del archivo .xlsx
+
+    Returns:
+        int: Filas sin contar la cabecera, o None si el archivo no indica sus dimensiones
+    """
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        max_fila = libro.worksheets[0].max_row
+        return max(max_fila - 1, 0) if max_fila else None
+    finally:
+        libro.close()
+
+
+def dividir_formato_especial(df, inicio=1):
+    """
+    Dividir por tabs la única columna del formato especial en un DataFrame posicional.
+
+    Args:
+        df (DataFrame): Hoja en formato especial (una sola columna)
+        inicio (int): Primera fila a procesar (1 salta la fila de encabezados)
+
+    Returns:
+        tuple: (DataFrame con una columna por posición 0..N, array con el número
+            de campos de cada fila). Las posiciones que faltan en una fila son None.
+    """
+    df = df.iloc[inicio:]
+    texto, _ = _texto_columna(df, df.columns[0], _dtype_fila(df))
+
+    num_campos = texto.str.count('\t').to_numpy(dtype=int) + 1
+    if len(texto):
+        partes = texto.str.split('\t', expand=True)
+    else:
+        partes = pd.DataFrame(index=texto.index)
+
+    # Garantizar que existen todas las posiciones fijas aunque ninguna fila llegue a ellas
+    ultima_posicion = max(POSICIONES_FORMATO_ESPECIAL)
+    partes = partes.reindex(columns=range(max(partes.shape[1], ultima_posicion + 1))).astype(object)
+    return partes, num_campos
+
+
+def _extraer_telefonos_vuelo_especial(partes, extraer_telefonos_vuelo):
+    """
+    Buscar teléfonos en los campos de vuelo del formato especial, posición a posición.
+
+    Para cada fila se usa el primer campo (de izquierda a derecha) que contiene
+    "VUELTA" o "VUELO" y del que se puede extraer un número válido.
+
+    Returns:
+        Series: Teléfonos extraídos ("" si no se encontró ninguno)
+    """
+    telefonos = pd.Series("", index=partes.index, dtype=object)
+    pendientes = np.ones(len(partes), dtype=bool)
+
+    for posicion in partes.columns:
+        campo = partes[posicion]
+        es_vuelo = campo.str.upper().str.contains('VUELTA|VUELO', regex=True, na=False).to_numpy(dtype=bool)
+        candidatos = es_vuelo & pendientes
+        if not candidatos.any():
+            continue
+
+        numeros = extraer_telefonos_vuelo(campo[candidatos])
+        encontrados = (numeros != "").to_numpy()
+        filas = np.flatnonzero(candidatos)[encontrados]
+        telefonos.iloc[filas] = numeros[encontrados].to_numpy()
+        pendientes[filas] = False
+
+    return telefonos
+
+
+def extraer_campos_formato_especial(df, inicio=1, recogidas=False, extraer_telefonos_vuelo=None, log=None):
+    """
+    Extraer los campos de contacto del formato especial (una columna separada por tabs).
+
+    La columna se divide una sola vez en un DataFrame posicional y los campos
+    se toman de las posiciones fijas de POSICIONES_FORMATO_ESPECIAL. Las filas
+    con menos de MIN_COLUMNAS_FORMATO_ESPECIAL campos se descartan.
+
+    Args:
+        df (DataFrame): Hoja en formato especial
+        inicio (int): Primera fila a procesar (1 salta la fila de encabezados)
+        recogidas (bool): Si se buscan los teléfonos en los campos de vuelo
+        extraer_telefonos_vuelo (callable): Extrae los teléfonos de una Series de valores de vuelo
+        log (callable): Función de log de la aplicación, log(mensaje, nivel, *args)
+
+    Returns:
+        DataFrame: Una fila por reserva con las columnas de COLUMNAS_CONTACTO,
+            sin validar todavía el teléfono ni el tipo de plaza
+    """
+    log = log or (lambda *args, **kwargs: None)
+    partes, num_campos = dividir_formato_especial(df, inicio)
+
+    # Mínimo de columnas necesarias
+    completas = num_campos >= MIN_COLUMNAS_FORMATO_ESPECIAL
+    partes = partes[completas]
+    datos = partes[list(POSICIONES_FORMATO_ESPECIAL)].rename(columns=POSICIONES_FORMATO_ESPECIAL)
+    datos = datos.apply(lambda columna: columna.str.strip())
+
+    nif = datos['NIF']
+    if recogidas:
+        telefonos = _extraer_telefonos_vuelo_especial(partes, extraer_telefonos_vuelo)
+
+        # Si no se encontró en campos de vuelo, usar el campo NIF como respaldo
+        for telefono, respaldo in zip(telefonos, nif):
+            if telefono:
+                log("    📞 Número extraído de columna de vuelo: %s", "INFO", telefono)
+            else:
+                log("    ⚠️ Usando campo NIF como respaldo: %s", "INFO", respaldo)
+        telefonos = telefonos.where(telefonos != "", nif)
+    else:
+        telefonos = nif
+
+    entrada = datos['Entrada']
+    hora_valida = entrada.str.contains(':', regex=False, na=False)
+    fecha_valida = entrada.str.contains('-', regex=False, na=False)
+
+    return pd.DataFrame({
+        'nombre': datos['Cliente'],
+        'telefono': telefonos,
+        'matricula': datos['Matricula'],
+        'hora_entrada': entrada.where(hora_valida, None),
+        'fecha_entrada': entrada.where(fecha_valida, "Desconocida"),
+        'tipo_plaza': datos['Tipo de Plaza'].where(datos['Tipo de Plaza'].notna(), "Sin especificar"),
+        'ocupantes': datos['Ocup.'],
+    }, columns=COLUMNAS_CONTACTO).astype(object)
+
+
+def extraer_campos_formato_normal(df, recogidas=False, extraer_telefonos_vuelo=None, log=None, esquema=None):
+    """
+    Extraer los campos de contacto de una hoja en formato normal, columna a columna.
+
+    Produce exactamente los mismos valores que la extracción fila a fila con
+    df.iloc[index][...], pero cada campo se calcula una sola vez para toda la hoja.
+
+    Args:
+        df (DataFrame): Hoja de Excel en formato normal (columnas separadas)
+        recogidas (bool): Si se buscan los teléfonos en la columna de vuelo
+        extraer_telefonos_vuelo (callable): Extrae los teléfonos de una Series de valores de vuelo
+        log (callable): Función de log de la aplicación, log(mensaje, nivel, *args)
+        esquema (dict): Columnas de la hoja ya resueltas (ver resolver_esquema);
+            si no se indica se resuelven a partir de df.columns
+
+    Returns:
+        DataFrame: Una fila por reserva con las columnas de COLUMNAS_CONTACTO,
+            sin validar todavía el teléfono ni el tipo de plaza
+    """
+    log = log or (lambda *args, **kwargs: None)
+    if esquema is None:
+        esquema = resolver_esquema(df.columns)
+    dtype_fila = _dtype_fila(df)
+
+    if esquema['cliente'] is not None:
+        nombres = _columna_o_defecto(df, esquema['cliente'], dtype_fila, "")
+    else:
+        # Numeración global de la fila (los bloques de lectura progresiva no empiezan en 0)
+        primera_fila = df.index[0] if isinstance(df.index, pd.RangeIndex) and len(df) else 0
+        nombres = pd.Series([f"Cliente {primera_fila + posicion + 1}" for posicion in range(len(df))],
+                            index=df.index, dtype=object)
+
+    nif = _columna_o_defecto(df, esquema['nif'], dtype_fila, "")
+    if recogidas:
+        telefonos = _extraer_telefonos_vuelo(df, esquema['vuelo'], dtype_fila, extraer_telefonos_vuelo, log)
+
+        # Si no se encontró en campos de vuelo, usar el campo NIF como respaldo
+        sin_telefono = (telefonos == "").to_numpy()
+        for posicion in np.flatnonzero(sin_telefono):
+            log("    ⚠️ Usando campo NIF como respaldo: %s", "INFO", nif.iat[posicion])
+        telefonos[sin_telefono] = nif[sin_telefono]
+    else:
+        telefonos = nif
+
+    fechas, fechas_erroneas = _extraer_fechas(df, esquema['fecha_entrada'], dtype_fila)
+
+    campos = pd.DataFrame({
+        'nombre': nombres,
+        'telefono': telefonos,
+        'matricula': _columna_o_defecto(df, esquema['matricula'], dtype_fila, "Sin matrícula"),
+        'hora_entrada': _extraer_horas(df, esquema['hora_entrada'], dtype_fila),
+        'fecha_entrada': fechas,
+        'tipo_plaza': _columna_o_defecto(df, esquema['tipo_plaza'], dtype_fila, "Sin especificar"),
+        'ocupantes': _extraer_ocupantes(df, esquema['ocupantes'], dtype_fila),
+    }, columns=COLUMNAS_CONTACTO)
+
+    return campos[~fechas_erroneas]
@@ -0,0 +1,215 @@
+# ⏱️ Programador de envíos
+# Decide cuándo puede salir el siguiente mensaje de una cuenta: cubo de tokens
+# para el ritmo por minuto, límites por hora y por día, horas de silencio y
+# una variación aleatoria para no enviar a intervalos exactos. El tiempo que
+# tarda cada envío cuenta para el intervalo: no se suman esperas.
+
+import random
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta, time as hora_dia
+
+# Segundos entre mensajes por defecto (ventana y línea de comandos)
+DEFAULT_DELAY_MIN = 3
+DEFAULT_DELAY_MAX = 5
+
+# Trozo máximo de cada espera, para poder detener el envío sin esperar al final
+INTERVALO_COMPROBACION_ESPERA = 0.5
+
+
+class PoliticaEnvio(namedtuple('PoliticaEnvio', ['por_minuto', 'por_hora', 'por_dia', 'variacion',
+                                                 'silencio_inicio', 'silencio_fin'])):
+    """
+    Límites de envío de una cuenta.
+
+    Attributes:
+        por_minuto: Mensajes por minuto (ritmo del cubo de tokens)
+        por_hora: Máximo de mensajes en cualquier hora (0 = sin límite)
+        por_dia: Máximo de mensajes por día natural (0 = sin límite)
+        variacion: Segundos aleatorios (entre 0 y este valor) añadidos a cada espera
+        silencio_inicio, silencio_fin: Horas de silencio (datetime.time) o None; pueden cruzar
+            la medianoche (22:00-08:00)
+    """
+    __slots__ = ()
+
+    @classmethod
+    def desde_delays(cls, delay_min, delay_max, por_hora=0, por_dia=0, silencio=""):
+        """
+        Política equivalente a la configuración de la ventana.
+
+        Args:
+            delay_min (int): Segundos mínimos entre mensajes (fija el ritmo por minuto)
+            delay_max (int): Segundos máximos; la diferencia con el mínimo es la variación
+            por_hora (int): Máximo por hora (0 = sin límite)
+            por_dia (int): Máximo por día (0 = sin límite)
+            silencio (str): Horas de silencio 'HH:MM-HH:MM' (vacío = sin silencio)
+
+        Raises:
+            ValueError: Si los valores o el formato de las horas de silencio no son válidos
+        """
+        delay_min = max(float(delay_min), 0.1)
+        delay_max = max(float(delay_max), delay_min)
+        if int(por_hora) < 0 or int(por_dia) < 0:
+            raise ValueError("Los límites por hora y por día no pueden ser negativos")
+        inicio, fin = interpretar_horas_silencio(silencio)
+        return cls(60.0 / delay_min, int(por_hora), int(por_dia), delay_max - delay_min, inicio, fin)
+
+    def segundos_por_mensaje(self):
+        """Intervalo medio entre mensajes con el ritmo, la variación y el límite por hora"""
+        intervalo = 60.0 / self.por_minuto + self.variacion / 2
+        return max(intervalo, 3600.0 / self.por_hora) if self.por_hora else intervalo
+
+
+def interpretar_horas_silencio(texto):
+    """
+    Horas de silencio a partir de un texto 'HH:MM-HH:MM'.
+
+    Returns:
+        tuple: (inicio, fin) como datetime.time, o (None, None) si el texto está vacío
+
+    Raises:
+        ValueError: Si el formato no es válido
+    """
+    texto = (texto or "").strip()
+    if not texto:
+        return None, None
+    try:
+        inicio, fin = (datetime.strptime(parte.strip(), "%H:%M").time() for parte in texto.split("-"))
+    except ValueError:
+        raise ValueError(f"Horas de silencio no válidas: '{texto}' (formato HH:MM-HH:MM)")
+    return inicio, fin
+
+
+class CuboTokens:
+    """
+    Cubo de tokens: se rellena a un ritmo fijo hasta su capacidad y cada envío gasta uno.
+
+    Attributes:
+        capacidad: Tokens máximos (mensajes que pueden salir seguidos)
+        por_segundo: Tokens que se recuperan por segundo
+    """
+
+    def __init__(self, capacidad, por_segundo, reloj=time.monotonic):
+        self.capacidad = capacidad
+        self.por_segundo = por_segundo
+        self._reloj = reloj
+        self._tokens = capacidad
+        self._ultimo = reloj()
+
+    def _rellenar(self):
+        ahora = self._reloj()
+        self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.por_segundo)
+        self._ultimo = ahora
+
+    def espera(self):
+        """Segundos hasta que haya un token"""
+        self._rellenar()
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.por_segundo
+
+    def consumir(self):
+        """Gastar un token (puede quedar en negativo si se envía sin esperar)"""
+        self._rellenar()
+        self._tokens -= 1
+
+
+class ProgramadorEnvio:
+    """
+    Programador de los envíos de una cuenta.
+
+    esperar_turno() espera lo justo para cumplir todos los límites de la
+    política y registrar_envio() anota cada mensaje enviado. El reloj y la
+    fecha se pueden sustituir para probarlo sin esperar.
+
+    Attributes:
+        politica: PoliticaEnvio de la cuenta
+        enviados_hoy: Mensajes enviados en el día actual
+    """
+
+    def __init__(self, politica, reloj=time.monotonic, ahora=datetime.now, dormir=time.sleep):
+        self.politica = politica
+        self._reloj = reloj
+        self._ahora = ahora
+        self._dormir = dormir
+        self._cubo = CuboTokens(1, politica.por_minuto / 60.0, reloj)
+        self._ultima_hora = deque()
+        self._dia = ahora().date()
+        self.enviados_hoy = 0
+
+    def _en_silencio(self, momento):
+        inicio, fin = self.politica.silencio_inicio, self.politica.silencio_fin
+        if inicio is None or inicio == fin:
+            return False
+        hora = momento.time()
+        if inicio < fin:
+            return inicio <= hora < fin
+        return hora >= inicio or hora < fin
+
+    def _fin_silencio(self, momento):
+        fin = datetime.combine(momento.date(), self.politica.silencio_fin)
+        return fin if fin > momento else fin + timedelta(days=1)
+
+    def espera(self):
+        """
+        Segundos que faltan para poder enviar el siguiente mensaje y el motivo.
+
+        Returns:
+            tuple: (segundos, motivo) con motivo 'ritmo', 'hora', 'dia' o 'silencio';
+                (0.0, None) si se puede enviar ya
+        """
+        momento = self._ahora()
+        if momento.date() != self._dia:
+            self._dia = momento.date()
+            self.enviados_hoy = 0
+
+        if self._en_silencio(momento):
+            return (self._fin_silencio(momento) - momento).total_seconds(), "silencio"
+        if self.politica.por_dia and self.enviados_hoy >= self.politica.por_dia:
+            manana = datetime.combine(momento.date() + timedelta(days=1), hora_dia())
+            return (manana - momento).total_seconds(), "dia"
+
+        reloj = self._reloj()
+        while self._ultima_hora and reloj - self._ultima_hora[0] >= 3600 - 1e-6:
+            self._ultima_hora.popleft()
+        if self.politica.por_hora and len(self._ultima_hora) >= self.politica.por_hora:
+            return 3600 - (reloj - self._ultima_hora[0]), "hora"
+
+        espera = self._cubo.espera()
+        return (espera, "ritmo") if espera > 0 else (0.0, None)
+
+    def esperar_turno(self, continuar=lambda: True, avisar=None):
+        """
+        Esperar hasta poder enviar, con una variación aleatoria.
+
+        Args:
+            continuar (callable): Se consulta durante la espera; si devuelve False se deja de esperar
+            avisar (callable): avisar(segundos, motivo) en cada espera por límite o silencio
+
+        Returns:
+            bool: True si ya se puede enviar, False si se dejó de esperar
+        """
+        variacion = random.uniform(0, self.politica.variacion)
+        while True:
+            segundos, motivo = self.espera()
+            if segundos <= 0:
+                break
+            if motivo != "ritmo" and avisar:
+                avisar(segundos, motivo)
+            if not self._esperar(segundos, continuar):
+                return False
+        return self._esperar(variacion, continuar)
+
+    def _esperar(self, segundos, continuar):
+        fin = self._reloj() + segundos
+        while True:
+            if not continuar():
+                return False
+            restante = fin - self._reloj()
+            if restante <= 0:
+                return True
+            self._dormir(min(restante, INTERVALO_COMPROBACION_ESPERA))
+
+    def registrar_envio(self):
+        """Anotar un mensaje enviado en el ritmo y en los límites por hora y por día"""
+        self._cubo.consumir()
+        self._ultima_hora.append(self._reloj())
+        self.enviados_hoy += 1
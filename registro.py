@@ -0,0 +1,114 @@
+# 📝 Registro de eventos de la aplicación
+# Los productores (interfaz, ingesta, hilo de envío) solo filtran por nivel y
+# encolan; el formato, el volcado al widget y la escritura en archivo se hacen
+# por lotes desde el consumidor.
+
+import queue
+import time
+import logging
+from logging.handlers import RotatingFileHandler
+
+# Niveles de log, de menor a mayor importancia
+NIVELES_LOG = {"DEBUG": 0, "INFO": 1, "WARNING": 2, "ERROR": 3}
+ICONOS_NIVEL_LOG = {"DEBUG": "🔍", "INFO": "ℹ️", "WARNING": "⚠️", "ERROR": "❌"}
+
+# Volcado al widget: como máximo 20 veces por segundo y un número acotado de líneas
+INTERVALO_VOLCADO_LOG = 0.05
+MAX_LINEAS_POR_VOLCADO = 2000
+MAX_LINEAS_WIDGET_LOG = 5000
+
+# Archivo de log con rotación
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+
+class RegistroEventos:
+    """
+    Cola de mensajes de log compartida por todos los hilos.
+
+    registrar() es barato: descarta los mensajes por debajo del nivel actual
+    antes de formatear nada y encola el resto. vaciar() formatea los mensajes
+    pendientes, los escribe de una vez en el archivo (si está activado) y
+    devuelve las líneas para mostrarlas.
+
+    Attributes:
+        nivel: Nivel mínimo registrado (DEBUG, INFO, WARNING, ERROR)
+        ruta_archivo: Archivo de log actual o None si no se escribe a archivo
+    """
+
+    def __init__(self, nivel="INFO", ruta_archivo=None):
+        self.nivel = nivel
+        self.ruta_archivo = None
+        self._cola = queue.SimpleQueue()
+        self._archivo = None
+        self.configurar_archivo(ruta_archivo)
+
+    def habilitado(self, nivel):
+        """Indicar si los mensajes de este nivel se registran con el nivel actual"""
+        return NIVELES_LOG.get(nivel, 1) >= NIVELES_LOG.get(self.nivel, 1)
+
+    def registrar(self, mensaje, nivel="INFO", *args):
+        """
+        Encolar un mensaje si su nivel está habilitado.
+
+        Args:
+            mensaje (str): Texto del mensaje (con %s si se pasan args)
+            nivel (str): DEBUG, INFO, WARNING o ERROR
+            *args: Valores para mensaje % args, que solo se formatea al vaciar
+
+        Returns:
+            bool: True si el mensaje se encoló
+        """
+        if not self.habilitado(nivel):
+            return False
+        self._cola.put((time.time(), nivel, mensaje, args))
+        return True
+
+    def pendientes(self):
+        """Indicar si hay mensajes en la cola"""
+        return not self._cola.empty()
+
+    def vaciar(self, max_mensajes=MAX_LINEAS_POR_VOLCADO):
+        """
+        Formatear los mensajes encolados y escribirlos en el archivo de log.
+
+        Args:
+            max_mensajes (int): Máximo de mensajes a sacar de la cola (None = todos)
+
+        Returns:
+            list: Líneas formateadas ("[HH:MM:SS] icono mensaje\\n"), en orden de llegada
+        """
+        lineas = []
+        while max_mensajes is None or len(lineas) < max_mensajes:
+            try:
+                momento, nivel, mensaje, args = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if args:
+                mensaje = mensaje % args
+            timestamp = time.strftime("%H:%M:%S", time.localtime(momento))
+            lineas.append(f"[{timestamp}] {ICONOS_NIVEL_LOG.get(nivel, 'ℹ️')} {mensaje}\n")
+
+        if lineas and self._archivo is not None:
+            # Un único registro por lote: una escritura y una comprobación de rotación
+            try:
+                self._archivo.handle(logging.makeLogRecord({'msg': ''.join(lineas), 'args': None}))
+            except Exception:
+                # Si falla el logging a archivo, no interrumpir la aplicación
+                pass
+        return lineas
+
+    def configurar_archivo(self, ruta_archivo):
+        """Empezar a escribir en un archivo de log con rotación, o dejar de hacerlo (None)"""
+        self.cerrar()
+        self.ruta_archivo = ruta_archivo
+        if ruta_archivo is not None:
+            self._archivo = RotatingFileHandler(ruta_archivo, maxBytes=LOG_MAX_BYTES,
+                                                backupCount=LOG_BACKUPS, encoding="utf-8", delay=True)
+            self._archivo.terminator = ""
+
+    def cerrar(self):
+        """Cerrar el archivo de log (los mensajes aún en cola no se escriben: llamar antes a vaciar)"""
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
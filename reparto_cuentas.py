@@ -0,0 +1,93 @@
+# 👥 Reparto de contactos entre cuentas de WhatsApp
+# Cada cuenta usa su propio perfil de Chrome (su propia sesión de WhatsApp Web)
+# y los contactos se reparten por hash consistente del teléfono: un cliente va
+# siempre por la misma cuenta y añadir una cuenta solo mueve la parte de
+# contactos que le corresponde.
+
+import hashlib
+import os
+from bisect import bisect
+from collections import namedtuple
+
+MAX_CUENTAS_WHATSAPP = 4
+# Puntos de cada cuenta en el anillo: más puntos, reparto más uniforme
+REPLICAS_POR_CUENTA = 500
+
+
+class PerfilCuenta(namedtuple('PerfilCuenta', ['numero', 'nombre', 'directorio'])):
+    """
+    Cuenta de WhatsApp del envío.
+
+    Attributes:
+        numero: Número de la cuenta (1 = la sesión de siempre)
+        nombre: Nombre de la cuenta en el log y en el anillo ('Cuenta 1'...)
+        directorio: Directorio del perfil de Chrome con su sesión
+    """
+    __slots__ = ()
+
+
+def perfiles_cuentas(cantidad, directorio_base):
+    """
+    Perfiles de las cuentas del envío.
+
+    La cuenta 1 usa directorio_base, así una sola cuenta sigue con la sesión
+    ya guardada; las demás usan directorio_base_2, directorio_base_3...
+
+    Args:
+        cantidad (int): Número de cuentas (entre 1 y MAX_CUENTAS_WHATSAPP)
+        directorio_base (str): Directorio de la sesión de la primera cuenta
+
+    Returns:
+        list: Un PerfilCuenta por cuenta
+    """
+    cantidad = max(1, min(int(cantidad), MAX_CUENTAS_WHATSAPP))
+    return [PerfilCuenta(numero, f"Cuenta {numero}",
+                         directorio_base if numero == 1 else f"{directorio_base}_{numero}")
+            for numero in range(1, cantidad + 1)]
+
+
+def directorios_sesion(directorio_base):
+    """Directorios de sesión existentes de todas las cuentas posibles"""
+    return [perfil.directorio for perfil in perfiles_cuentas(MAX_CUENTAS_WHATSAPP, directorio_base)
+            if os.path.exists(perfil.directorio)]
+
+
+def _hash(texto):
+    return int.from_bytes(hashlib.md5(texto.encode('utf-8')).digest()[:8], 'big')
+
+
+class AnilloConsistente:
+    """
+    Anillo de hash consistente sobre los nombres de las cuentas.
+
+    Cada cuenta ocupa REPLICAS_POR_CUENTA puntos del anillo; una clave va a
+    la cuenta del primer punto que la sigue. Al pasar de N a N+1 cuentas
+    solo cambian de cuenta las claves que pasan a la nueva (~1/(N+1)).
+    """
+
+    def __init__(self, cuentas, replicas=REPLICAS_POR_CUENTA):
+        puntos = sorted((_hash(f"{cuenta}#{replica}"), cuenta) for cuenta in cuentas for replica in range(replicas))
+        self._posiciones = [posicion for posicion, _ in puntos]
+        self._cuentas = [cuenta for _, cuenta in puntos]
+
+    def cuenta_para(self, clave):
+        """Cuenta que atiende una clave"""
+        return self._cuentas[bisect(self._posiciones, _hash(clave)) % len(self._posiciones)]
+
+
+def repartir_entradas(entradas, perfiles):
+    """
+    Repartir las entradas de la bandeja entre las cuentas por su teléfono.
+
+    Args:
+        entradas (list): Entradas de la bandeja (con teléfono E.164)
+        perfiles (list): Perfiles de perfiles_cuentas()
+
+    Returns:
+        dict: Nombre de cuenta -> entradas que envía, en el orden original
+    """
+    anillo = AnilloConsistente([perfil.nombre for perfil in perfiles])
+    reparto = {perfil.nombre: [] for perfil in perfiles}
+    for entrada in entradas:
+        reparto[anillo.cuenta_para(entrada.telefono)].append(entrada)
+    return reparto
@@ -0,0 +1,125 @@
+# 🩺 Supervisor del navegador
+# Vigila el Chrome de una cuenta durante el envío: lo comprueba cada cierto
+# tiempo (también durante las esperas largas por límites, silencio o
+# antelación), lo reinicia si deja de responder y lo recicla cada N mensajes.
+# Chrome se vuelve a abrir con el mismo perfil, así WhatsApp Web entra sin
+# escanear el QR y el envío sigue solo con los mensajes pendientes.
+
+import time
+
+# Segundos entre comprobaciones del navegador
+INTERVALO_COMPROBACION_NAVEGADOR = 60
+
+# Mensajes tras los que se cierra y se vuelve a abrir Chrome (0 = nunca)
+RECICLAR_NAVEGADOR_CADA = 300
+
+# Reinicios seguidos sin llegar a enviar ningún mensaje antes de dar la cuenta por perdida
+MAX_REINICIOS_SEGUIDOS = 3
+ESPERA_REINICIO_NAVEGADOR = 5  # Segundos antes de reabrir Chrome (se multiplica por el intento)
+
+
+def _sin_log(*args, **kwargs):
+    pass
+
+
+class SupervisorNavegador:
+    """
+    Navegador de una cuenta con comprobaciones y reinicios automáticos.
+
+    El motor de envío usa siempre supervisor.driver: tras un reinicio es otro
+    Chrome. Las funciones que abren, cierran y comprueban el navegador las pone
+    el motor, así que se puede probar sin Selenium.
+
+    Attributes:
+        driver: Navegador actual (None si no se pudo recuperar)
+        reciclar_cada: Mensajes tras los que se recicla Chrome (0 = nunca)
+        reinicios: Reinicios hechos durante el envío (por fallo o reciclado)
+    """
+
+    def __init__(self, driver, abrir, cerrar, responde, log=_sin_log, reciclar_cada=RECICLAR_NAVEGADOR_CADA,
+                 intervalo=INTERVALO_COMPROBACION_NAVEGADOR, max_reinicios=MAX_REINICIOS_SEGUIDOS,
+                 espera_reinicio=ESPERA_REINICIO_NAVEGADOR, reloj=time.monotonic, dormir=time.sleep):
+        """
+        Args:
+            driver: Navegador ya abierto y conectado
+            abrir (callable): abrir() devuelve un navegador nuevo conectado (lanza excepción si falla)
+            cerrar (callable): cerrar(driver) cierra del todo un navegador, aunque no responda
+            responde (callable): responde(driver) indica si el navegador sigue vivo
+            log (callable): log(mensaje)
+        """
+        self.driver = driver
+        self.reciclar_cada = reciclar_cada
+        self.reinicios = 0
+        self._abrir = abrir
+        self._cerrar = cerrar
+        self._responde = responde
+        self._log = log
+        self._intervalo = intervalo
+        self._max_reinicios = max_reinicios
+        self._espera_reinicio = espera_reinicio
+        self._reloj = reloj
+        self._dormir = dormir
+        self._ultima_comprobacion = reloj()
+        self._mensajes = 0
+        self._reinicios_seguidos = 0
+
+    def navegador_caido(self):
+        """Comprobar ahora si el navegador ha dejado de responder"""
+        self._ultima_comprobacion = self._reloj()
+        return self.driver is None or not self._responde(self.driver)
+
+    def vigilar(self):
+        """
+        Comprobación periódica, pensada para el continuar() de las esperas.
+
+        Si toca comprobar y el navegador no responde, lo reinicia.
+
+        Returns:
+            bool: False si el navegador se cayó y no se pudo recuperar
+        """
+        if self._reloj() - self._ultima_comprobacion < self._intervalo:
+            return self.driver is not None
+        if not self.navegador_caido():
+            return True
+        return self.reiniciar("no responde")
+
+    def registrar_envio(self):
+        """
+        Anotar un mensaje enviado con este navegador y reciclarlo si toca.
+
+        Returns:
+            bool: False si había que reciclarlo y no se pudo volver a abrir
+        """
+        self._mensajes += 1
+        self._reinicios_seguidos = 0
+        if self.reciclar_cada and self._mensajes >= self.reciclar_cada:
+            return self.reiniciar(f"reciclado tras {self._mensajes} mensajes")
+        return True
+
+    def reiniciar(self, motivo):
+        """
+        Cerrar el navegador y abrir otro con el mismo perfil.
+
+        Returns:
+            bool: True si hay un navegador nuevo conectado; False si se superó
+                MAX_REINICIOS_SEGUIDOS sin enviar ningún mensaje entre medias
+        """
+        while self._reinicios_seguidos < self._max_reinicios:
+            self._reinicios_seguidos += 1
+            self._log(f"🔄 Reiniciando Chrome ({motivo}), intento {self._reinicios_seguidos} "
+                      f"de {self._max_reinicios}")
+            if self.driver is not None:
+                self._cerrar(self.driver)
+                self.driver = None
+            self._dormir(self._espera_reinicio * self._reinicios_seguidos)
+            try:
+                self.driver = self._abrir()
+            except Exception as e:
+                self._log(f"⚠️ No se pudo volver a abrir Chrome: {str(e)}")
+                continue
+            self.reinicios += 1
+            self._mensajes = 0
+            self._ultima_comprobacion = self._reloj()
+            self._log("✅ Chrome reiniciado con la sesión guardada, el envío continúa")
+            return True
+        return False
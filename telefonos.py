@@ -0,0 +1,581 @@
+# 📞 Validación y formato de números de teléfono
+# Reglas para números españoles e internacionales, en versión individual
+# (un número) y en versión vectorizada (una columna completa de pandas)
+
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from itertools import compress
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+# Patrones de búsqueda de teléfonos en campos de vuelo (ej: 'T4-T4-IB23677-609553462'),
+# en orden de prioridad: al final del campo, tras un guion o espacio, cualquier secuencia
+PATRON_TELEFONO_FINAL = re.compile(r'(\d{9,})$')
+PATRON_TELEFONO_DELIMITADO = re.compile(r'[-\s](\d{9,})')
+PATRON_SECUENCIA_TELEFONO = re.compile(r'(\d{9,})')
+
+# Máximo de teléfonos normalizados que se conservan en memoria
+CACHE_TELEFONOS_MAX = 200000
+
+# Campos de TelefonoNormalizado que guarda la caché (el original es la clave)
+_CAMPOS_CACHE = ('e164', 'pais', 'tipo', 'valido', 'valido_nacional')
+
+# Caracteres de cada campo que entran en la matriz de la versión vectorizada; los
+# campos más largos (texto libre en la columna de teléfono) se interpretan uno a uno
+MAX_CARACTERES_TELEFONO = 24
+
+
+def _solo_digitos(telefono):
+    """Quitar todo lo que no sea dígito"""
+    return ''.join(filter(str.isdigit, str(telefono)))
+
+
+def _es_vacio(valor):
+    """Equivalente a 'not telefono or telefono == "nan"' sin fallar con pd.NA"""
+    try:
+        return bool(not valor or valor == 'nan')
+    except (TypeError, ValueError):
+        return True
+
+
+class TelefonoNormalizado(namedtuple('TelefonoNormalizado',
+                                     ['original', 'e164', 'pais', 'tipo', 'valido', 'valido_nacional'])):
+    """
+    Teléfono interpretado una sola vez con todas las reglas (ver normalizar_telefono).
+
+    Attributes:
+        original: Texto tal como venía en el archivo
+        e164: Número en formato internacional '+<dígitos>', el que se usa en WhatsApp
+        pais: "España", "Extranjero" o "" si el número no es válido
+        tipo: Tipo de número ("Español Nacional", "Extranjero Internacional", ...)
+        valido: Si es un teléfono válido con los números extranjeros habilitados
+        valido_nacional: Si es válido con los números extranjeros deshabilitados
+    """
+    __slots__ = ()
+
+    def es_valido(self, numeros_extranjeros=True):
+        """Validez según la configuración de números extranjeros"""
+        return self.valido if numeros_extranjeros else self.valido_nacional
+
+
+def _pais(e164, valido):
+    """País del número a partir de su prefijo internacional"""
+    if not valido:
+        return ""
+    return "España" if e164.startswith("+34") else "Extranjero"
+
+
+def _interpretar_telefono(telefono):
+    """
+    Aplicar a un número las reglas de validez, tipo y formato WhatsApp.
+
+    Args:
+        telefono (str): Texto del campo de teléfono
+
+    Returns:
+        TelefonoNormalizado: Registro con todos los datos del número
+    """
+    texto = str(telefono)
+    vacio = _es_vacio(telefono)
+
+    # Limpiar el número
+    limpio = _solo_digitos(texto)
+    n = len(limpio)
+    movil = n == 9 and limpio[0] in ['6', '7']
+
+    if texto.startswith('+'):
+        # Si ya empieza con +, es internacional
+        valido = valido_nacional = 10 <= n <= 15
+        tipo = "Español Internacional" if limpio.startswith('34') else "Extranjero Internacional"
+        e164 = f"+{limpio}"
+    elif limpio.startswith('00'):
+        # Si empieza con 00, es internacional: convertir a +
+        valido = valido_nacional = 12 <= n <= 17
+        tipo = "Español Internacional (00)" if limpio.startswith('0034') else "Extranjero Internacional (00)"
+        e164 = f"+{limpio[2:]}"
+    else:
+        # Números españoles: 9 dígitos que empiecen con 6 o 7, u 11 dígitos que empiecen con 34
+        valido_nacional = movil or (n == 11 and limpio.startswith('34'))
+        # Números extranjeros (solo si está habilitado): 9-15 dígitos
+        valido = valido_nacional or 9 <= n <= 15
+
+        if movil:
+            tipo = "Español Nacional"
+        elif n == 11 and limpio.startswith('34'):
+            tipo = "Español con Código"
+        elif 10 <= n <= 15 and not limpio.startswith('34'):
+            tipo = "Extranjero"
+        elif 9 <= n <= 15:
+            tipo = "Formato Especial"
+        else:
+            tipo = "Desconocido"
+
+        # Con 34 o 10-15 dígitos ya lleva código de país; si no, agregar 34 (España)
+        if limpio.startswith('34') or (not movil and 10 <= n <= 15):
+            e164 = f"+{limpio}"
+        else:
+            e164 = f"+34{limpio}"
+
+    if vacio:
+        valido = valido_nacional = False
+        tipo = "Inválido"
+    return TelefonoNormalizado(texto, e164, _pais(e164, valido), tipo, valido, valido_nacional)
+
+
+class CacheTelefonos:
+    """
+    Caché LRU de teléfonos normalizados, compartida por toda la aplicación.
+
+    La clave es el texto original del campo, así que un cliente que repite
+    en varios archivos o análisis solo se interpreta la primera vez. Se
+    guardan tuplas con los campos de _CAMPOS_CACHE: las versiones
+    vectorizadas las rellenan directamente desde sus arrays.
+    """
+
+    def __init__(self, max_telefonos=CACHE_TELEFONOS_MAX):
+        self.max_telefonos = max_telefonos
+        self._telefonos = OrderedDict()  # texto -> tupla de campos (_CAMPOS_CACHE)
+        self._lock = threading.Lock()
+
+    def obtener(self, claves):
+        """Campos ya guardados de las claves indicadas (las que falten no aparecen)"""
+        encontrados = {}
+        with self._lock:
+            for clave in claves:
+                registro = self._telefonos.get(clave)
+                if registro is not None:
+                    self._telefonos.move_to_end(clave)
+                    encontrados[clave] = registro
+        return encontrados
+
+    def guardar(self, registros):
+        """Guardar campos {clave: tupla de _CAMPOS_CACHE}, descartando los menos usados"""
+        with self._lock:
+            self._telefonos.update(registros)
+            while len(self._telefonos) > self.max_telefonos:
+                self._telefonos.popitem(last=False)
+
+    def __len__(self):
+        return len(self._telefonos)
+
+    def invalidar(self):
+        """Vaciar la caché"""
+        with self._lock:
+            self._telefonos.clear()
+
+
+_cache_telefonos = CacheTelefonos()
+
+
+def _clave_telefono(telefono):
+    """Clave de caché: el texto del campo ('' para los valores vacíos que no son texto)"""
+    if isinstance(telefono, str):
+        return telefono
+    return "" if _es_vacio(telefono) else str(telefono)
+
+
+def normalizar_telefono(telefono):
+    """
+    Interpretar un teléfono: formato E.164, país, tipo y validez en un solo registro.
+
+    Los resultados se guardan en una caché LRU por texto original, de modo que
+    validar, clasificar y formatear el mismo número nunca vuelve a analizarlo.
+
+    Args:
+        telefono: Valor del campo de teléfono
+
+    Returns:
+        TelefonoNormalizado: Registro del número
+    """
+    clave = _clave_telefono(telefono)
+    campos = _cache_telefonos.obtener((clave,)).get(clave)
+    if campos is None:
+        registro = _interpretar_telefono(clave)
+        _cache_telefonos.guardar({clave: registro[1:]})
+        return registro
+    return TelefonoNormalizado(clave, *campos)
+
+
+def es_telefono_valido(telefono, numeros_extranjeros=True):
+    """Verificar si un campo es un número de teléfono válido (español o extranjero)"""
+    return normalizar_telefono(telefono).es_valido(numeros_extranjeros)
+
+
+def determinar_tipo_numero(telefono):
+    """Determinar el tipo de número de teléfono"""
+    return normalizar_telefono(telefono).tipo
+
+
+def formatear_telefono_whatsapp(telefono):
+    """Formatear número de teléfono para WhatsApp (formato E.164, '+' y solo dígitos)"""
+    return normalizar_telefono(telefono).e164
+
+
+def extraer_telefono_vuelo(valor_vuelo, numeros_extranjeros=True):
+    """
+    Extraer número de teléfono de un campo de vuelo que puede contener texto mezclado.
+
+    Args:
+        valor_vuelo (str): Valor del campo de vuelo (ej: 'T4-T4-IB23677-609553462')
+        numeros_extranjeros (bool): Si se aceptan números extranjeros
+
+    Returns:
+        str: Número de teléfono extraído o cadena vacía si no se encuentra
+    """
+    if not valor_vuelo or valor_vuelo == 'nan':
+        return ""
+
+    valor_limpio = str(valor_vuelo).strip()
+
+    for patron in (PATRON_TELEFONO_FINAL, PATRON_TELEFONO_DELIMITADO):
+        coincidencia = patron.search(valor_limpio)
+        if coincidencia and es_telefono_valido(coincidencia.group(1), numeros_extranjeros):
+            return coincidencia.group(1)
+
+    for numero in PATRON_SECUENCIA_TELEFONO.findall(valor_limpio):
+        if es_telefono_valido(numero, numeros_extranjeros):
+            return numero
+
+    return ""
+
+
+# ===================== Versiones vectorizadas =====================
+
+# Códigos Unicode usados por las reglas
+_MAS, _CERO, _TRES, _CUATRO, _SEIS, _SIETE, _NUEVE = (ord('+'), ord('0'), ord('3'), ord('4'),
+                                                     ord('6'), ord('7'), ord('9'))
+
+
+def _como_texto(codigos, ancho):
+    """Convertir una matriz de códigos Unicode (uint32) en un array de cadenas"""
+    if ancho == 0:
+        return np.full(len(codigos), "", dtype="<U1")
+    return np.ascontiguousarray(codigos).view(f"<U{ancho}").ravel()
+
+
+def _rasgos_telefonos(textos):
+    """
+    Calcular una sola vez los rasgos que usan todas las reglas de teléfono.
+
+    Los textos se convierten en una matriz de códigos Unicode (una fila por
+    número) y los dígitos se compactan a la izquierda de cada fila con una
+    ordenación estable, de modo que longitud y prefijos salen de operaciones
+    sobre arrays sin recorrer los números uno a uno.
+
+    La matriz tiene tantas columnas como el texto más largo, así que cada
+    texto se recorta a MAX_CARACTERES_TELEFONO: una sola celda con una nota
+    larga no multiplica la memoria y el tiempo de la ordenación. Los rasgos
+    de esas filas no valen y quedan marcadas en 'individual'.
+
+    Args:
+        textos (list): Textos de los campos de teléfono
+
+    Returns:
+        dict: Arrays numpy con dígitos, longitud y prefijos de cada número
+    """
+    longitudes = np.fromiter(map(len, textos), dtype=np.int64, count=len(textos))
+    largos = longitudes > MAX_CARACTERES_TELEFONO
+    if largos.any():
+        textos_recortados = [texto[:MAX_CARACTERES_TELEFONO] for texto in textos]
+    else:
+        textos_recortados = textos
+    texto = np.array(textos_recortados, dtype=str) if textos else np.array([], dtype="<U1")
+    ancho = texto.dtype.itemsize // 4
+    codigos = texto.view(np.uint32).reshape(len(texto), ancho)
+
+    es_digito = (codigos >= _CERO) & (codigos <= _NUEVE)
+    orden = np.argsort(~es_digito, axis=1, kind='stable')
+    compactos = np.where(np.take_along_axis(es_digito, orden, axis=1),
+                         np.take_along_axis(codigos, orden, axis=1), 0).astype(np.uint32)
+
+    # Primeros cuatro dígitos de cada número (0 si no hay tantos)
+    cabeza = np.zeros((len(texto), 4), dtype=np.uint32)
+    cabeza[:, :min(ancho, 4)] = compactos[:, :4]
+    d0, d1, d2, d3 = cabeza.T
+
+    doble_cero = (d0 == _CERO) & (d1 == _CERO)
+    return {
+        'digitos': _como_texto(compactos, ancho),
+        'sin_doble_cero': _como_texto(compactos[:, 2:], max(ancho - 2, 0)),
+        'longitud': es_digito.sum(axis=1),
+        'vacio': (texto == "") | (texto == "nan"),
+        'mas': codigos[:, 0] == _MAS if ancho else np.zeros(len(texto), dtype=bool),
+        'doble_cero': doble_cero,
+        'espanol_00': doble_cero & (d2 == _TRES) & (d3 == _CUATRO),
+        'prefijo_34': (d0 == _TRES) & (d1 == _CUATRO),
+        'movil': (d0 == _SEIS) | (d0 == _SIETE),
+        # Textos recortados o con dígitos no ASCII (str.isdigit los acepta):
+        # esas filas usan las reglas individuales
+        'individual': largos | (codigos > 127).any(axis=1),
+    }
+
+
+def _validar(rasgos, numeros_extranjeros):
+    """Máscara de validez a partir de los rasgos (ver _interpretar_telefono)"""
+    n = rasgos['longitud']
+    nacional = ((n == 9) & rasgos['movil']) | ((n == 11) & rasgos['prefijo_34'])
+    extranjero = (n >= 9) & (n <= 15) if numeros_extranjeros else np.zeros(len(n), dtype=bool)
+
+    return np.select(
+        [rasgos['vacio'], rasgos['mas'], rasgos['doble_cero']],
+        [False, (n >= 10) & (n <= 15), (n >= 12) & (n <= 17)],
+        default=nacional | extranjero
+    ).astype(bool)
+
+
+def _clasificar(rasgos):
+    """Etiqueta de tipo a partir de los rasgos (ver _interpretar_telefono)"""
+    n = rasgos['longitud']
+    mas, doble_cero, prefijo_34 = rasgos['mas'], rasgos['doble_cero'], rasgos['prefijo_34']
+
+    return np.select(
+        [
+            rasgos['vacio'],
+            mas & prefijo_34,
+            mas,
+            doble_cero & rasgos['espanol_00'],
+            doble_cero,
+            (n == 9) & rasgos['movil'],
+            (n == 11) & prefijo_34,
+            (n >= 10) & (n <= 15) & ~prefijo_34,
+            (n >= 9) & (n <= 15),
+        ],
+        [
+            "Inválido",
+            "Español Internacional",
+            "Extranjero Internacional",
+            "Español Internacional (00)",
+            "Extranjero Internacional (00)",
+            "Español Nacional",
+            "Español con Código",
+            "Extranjero",
+            "Formato Especial",
+        ],
+        default="Desconocido"
+    ).astype(object)
+
+
+def _formatear(rasgos):
+    """Número en formato E.164 a partir de los rasgos (ver _interpretar_telefono)"""
+    n = rasgos['longitud']
+    digitos = rasgos['digitos']
+    con_mas = np.char.add("+", digitos)
+    con_34 = np.char.add("+34", digitos)
+
+    return np.select(
+        [
+            rasgos['mas'],
+            rasgos['doble_cero'],
+            rasgos['prefijo_34'],
+            (n == 9) & rasgos['movil'],
+            (n >= 10) & (n <= 15),
+        ],
+        [con_mas, np.char.add("+", rasgos['sin_doble_cero']), con_mas, con_34, con_mas],
+        default=con_34
+    ).astype(object)
+
+
+def _interpretar_telefonos(claves):
+    """
+    Interpretar de una vez una lista de números distintos.
+
+    Las reglas se evalúan como operaciones sobre arrays numpy; las filas con
+    caracteres no ASCII (str.isdigit acepta dígitos de otros alfabetos) o más
+    largas que MAX_CARACTERES_TELEFONO usan la interpretación individual.
+
+    Returns:
+        dict: Un array numpy por campo de TelefonoNormalizado (salvo 'original'),
+            con un valor por clave
+    """
+    rasgos = _rasgos_telefonos(claves)
+    e164 = _formatear(rasgos)
+    validos = _validar(rasgos, True)
+    campos = {
+        'e164': e164,
+        'pais': np.where(validos, np.where(np.char.startswith(e164.astype(str), "+34"), "España", "Extranjero"),
+                         "").astype(object),
+        'tipo': _clasificar(rasgos),
+        'valido': validos,
+        'valido_nacional': _validar(rasgos, False),
+    }
+    for posicion in np.flatnonzero(rasgos['individual']).tolist():
+        registro = _interpretar_telefono(claves[posicion])
+        for campo in _CAMPOS_CACHE:
+            campos[campo][posicion] = getattr(registro, campo)
+    return campos
+
+
+def _columnas_telefonos(telefonos):
+    """
+    Campos normalizados de una columna completa de teléfonos, como arrays numpy.
+
+    Cada texto distinto se busca en la caché compartida y solo los que no
+    están se interpretan, todos juntos con las reglas vectorizadas. Los
+    resultados se quedan en arrays (uno por campo) y se reparten a las filas
+    con los códigos de factorize, sin crear un registro por número.
+
+    Returns:
+        tuple: (claves, campos) con la clave de caché de cada valor y un dict
+            {campo: array numpy} con un valor por fila
+    """
+    valores = telefonos.tolist() if isinstance(telefonos, pd.Series) else list(telefonos)
+    claves = [valor if type(valor) is str else _clave_telefono(valor) for valor in valores]
+    if not claves:
+        return claves, {campo: np.array([], dtype=bool if campo.startswith('valido') else object)
+                        for campo in _CAMPOS_CACHE}
+    codigos, distintos = pd.factorize(pd.Series(claves, dtype=object))
+    distintos = distintos.tolist()
+
+    guardados = _cache_telefonos.obtener(distintos)
+    if len(guardados) == len(distintos):
+        por_codigo = _columnas_guardadas([guardados[clave] for clave in distintos])
+    else:
+        if guardados:
+            faltan_posiciones = [posicion for posicion, clave in enumerate(distintos) if clave not in guardados]
+            faltan = [distintos[posicion] for posicion in faltan_posiciones]
+        else:
+            faltan = distintos
+        nuevos = _interpretar_telefonos(faltan)
+        _cache_telefonos.guardar(dict(zip(faltan, zip(*(nuevos[campo].tolist() for campo in _CAMPOS_CACHE)))))
+        if not guardados:
+            por_codigo = nuevos
+        else:
+            encontrados_posiciones = [posicion for posicion, clave in enumerate(distintos) if clave in guardados]
+            encontrados = _columnas_guardadas([guardados[distintos[posicion]] for posicion in encontrados_posiciones])
+            por_codigo = {}
+            for campo in _CAMPOS_CACHE:
+                columna = np.empty(len(distintos), dtype=nuevos[campo].dtype)
+                columna[faltan_posiciones] = nuevos[campo]
+                columna[encontrados_posiciones] = encontrados[campo]
+                por_codigo[campo] = columna
+
+    return claves, {campo: columna[codigos] for campo, columna in por_codigo.items()}
+
+
+def _columnas_guardadas(guardados):
+    """Arrays por campo a partir de los valores guardados en la caché"""
+    return {campo: np.array(list(map(itemgetter(posicion), guardados)),
+                            dtype=bool if campo.startswith('valido') else object)
+            for posicion, campo in enumerate(_CAMPOS_CACHE)}
+
+
+def normalizar_telefonos(telefonos):
+    """
+    Normalizar una columna completa de teléfonos (ver normalizar_telefono).
+
+    Para validar, clasificar o formatear columnas enteras es mejor usar las
+    funciones de abajo, que trabajan con arrays y no crean un registro por valor.
+
+    Args:
+        telefonos: Series o lista con los valores del campo de teléfono
+
+    Returns:
+        list: Un TelefonoNormalizado por valor, en el mismo orden
+    """
+    claves, campos = _columnas_telefonos(telefonos)
+    return list(map(TelefonoNormalizado._make,
+                    zip(claves, *(campos[campo].tolist() for campo in _CAMPOS_CACHE))))
+
+
+def _indice(telefonos):
+    """Índice del resultado: el de la Series de entrada o uno por posición"""
+    return telefonos.index if isinstance(telefonos, pd.Series) else None
+
+
+def validar_telefonos(telefonos, numeros_extranjeros=True):
+    """
+    Validar una columna completa de teléfonos.
+
+    Args:
+        telefonos: Series o lista con los valores del campo de teléfono
+        numeros_extranjeros (bool): Si se aceptan números extranjeros
+
+    Returns:
+        Series: Máscara booleana, True para los teléfonos válidos
+    """
+    campo = 'valido' if numeros_extranjeros else 'valido_nacional'
+    return pd.Series(_columnas_telefonos(telefonos)[1][campo], index=_indice(telefonos), dtype=bool)
+
+
+def clasificar_telefonos(telefonos):
+    """Tipo de número de una columna completa de teléfonos (ver determinar_tipo_numero)"""
+    return pd.Series(_columnas_telefonos(telefonos)[1]['tipo'], index=_indice(telefonos), dtype=object)
+
+
+def formatear_telefonos_whatsapp(telefonos):
+    """Formato WhatsApp de una columna completa de teléfonos (ver formatear_telefono_whatsapp)"""
+    return pd.Series(_columnas_telefonos(telefonos)[1]['e164'], index=_indice(telefonos), dtype=object)
+
+
+def analizar_telefonos(telefonos, numeros_extranjeros=True):
+    """
+    Validar, clasificar y formatear una columna de teléfonos en una sola pasada.
+
+    Cada número distinto se normaliza una única vez (y queda en la caché para
+    los siguientes análisis y para el envío).
+
+    Args:
+        telefonos: Series o lista con los valores del campo de teléfono
+        numeros_extranjeros (bool): Si se aceptan números extranjeros
+
+    Returns:
+        DataFrame: Columnas 'valido' (bool), 'tipo', 'whatsapp' y 'pais', con el mismo índice
+    """
+    campos = _columnas_telefonos(telefonos)[1]
+    return pd.DataFrame({
+        'valido': campos['valido' if numeros_extranjeros else 'valido_nacional'],
+        'tipo': campos['tipo'],
+        'whatsapp': campos['e164'],
+        'pais': campos['pais'],
+    }, index=_indice(telefonos))
+
+
+def _candidatos_vuelo(valor_limpio):
+    """
+    Secuencias de 9 o más dígitos de un campo de vuelo, en orden de prioridad.
+
+    Da las mismas candidatas que los tres patrones en orden: la secuencia
+    final, la primera precedida por guion o espacio y después todas en orden
+    de aparición (puede haber repetidas). Con una sola secuencia no hay nada
+    que ordenar.
+    """
+    secuencias = PATRON_SECUENCIA_TELEFONO.findall(valor_limpio)
+    if len(secuencias) <= 1:
+        return secuencias
+
+    candidatos = []
+    if valor_limpio.endswith(secuencias[-1]):
+        candidatos.append(secuencias[-1])
+    delimitada = PATRON_TELEFONO_DELIMITADO.search(valor_limpio)
+    if delimitada:
+        candidatos.append(delimitada.group(1))
+    return candidatos + secuencias
+
+
+def extraer_telefonos_vuelo(valores, numeros_extranjeros=True):
+    """
+    Extraer los teléfonos de una columna completa de campos de vuelo.
+
+    Mismo resultado que extraer_telefono_vuelo valor a valor (número al final,
+    luego tras guion o espacio, luego cualquier secuencia de 9 o más dígitos),
+    pero cada valor se recorre una sola vez con el patrón precompilado y todas
+    las candidatas distintas de la columna se validan en una sola pasada.
+
+    Args:
+        valores: Series o lista con los valores del campo de vuelo
+        numeros_extranjeros (bool): Si se aceptan números extranjeros
+
+    Returns:
+        Series: Teléfonos extraídos ("" si no se encuentra ninguno), con el mismo índice
+    """
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores, dtype=object)
+    candidatos = [_candidatos_vuelo(str(valor).strip()) for valor in serie.tolist()]
+
+    distintos = list(dict.fromkeys(numero for numeros in candidatos for numero in numeros))
+    validos = set(compress(distintos, validar_telefonos(distintos, numeros_extranjeros).tolist()))
+
+    telefonos = [next(filter(validos.__contains__, numeros), "") for numeros in candidatos]
+    return pd.Series(telefonos, index=serie.index, dtype=object)